@@ -18,6 +18,10 @@ resource "aws_dynamodb_table" "favorites" {
     type = "S"
   }
 
+  # Feeds the analytics rollups (rollup_interactions)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   tags = merge(var.tags, { Name = "Favorites Table" })
 }
 
@@ -37,7 +41,33 @@ resource "aws_dynamodb_table" "listing_views" {
     type = "S"
   }
 
-  tags = merge(var.tags, { Name = "Listing Views Table" })
+  tags = merge(var.tags, { Name = "Listing Views Table (legacy)" })
+}
+
+# HyperLogLog unique-viewer sketches per listing: period "all" and
+# "day#YYYY-MM-DD" (daily sketches expire via TTL)
+resource "aws_dynamodb_table" "view_sketches" {
+  name         = "${var.project_name}-view-sketches-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "listing_id"
+  range_key    = "period"
+
+  attribute {
+    name = "listing_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "period"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = merge(var.tags, { Name = "View Sketches Table" })
 }
 
 resource "aws_dynamodb_table" "bids" {
@@ -56,9 +86,97 @@ resource "aws_dynamodb_table" "bids" {
     type = "S"
   }
 
+  # Feeds the bid_stats aggregates (aggregate_bids)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   tags = merge(var.tags, { Name = "Bids Table" })
 }
 
+# Per-auction leaderboard / velocity aggregates, one item per listing
+resource "aws_dynamodb_table" "bid_stats" {
+  name           = "${var.project_name}-bid-stats-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "listing_id"
+
+  attribute {
+    name = "listing_id"
+    type = "S"
+  }
+
+  tags = merge(var.tags, { Name = "Bid Stats Table" })
+}
+
+# aggregate_bids dedupe markers ("bid#..." expire, "bidder#..." are kept),
+# so the bid_stats summary stays small
+resource "aws_dynamodb_table" "bid_markers" {
+  name           = "${var.project_name}-bid-markers-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "marker_id"
+
+  attribute {
+    name = "marker_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = merge(var.tags, { Name = "Bid Markers Table" })
+}
+
+# Time-bucketed analytics rollups: series "listing#<id>" / "nb#<neighborhood>",
+# bucket "h#YYYY-MM-DDTHH" (expires) / "d#YYYY-MM-DD"
+resource "aws_dynamodb_table" "listing_stats" {
+  name         = "${var.project_name}-listing-stats-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "series"
+  range_key    = "bucket"
+
+  attribute {
+    name = "series"
+    type = "S"
+  }
+
+  attribute {
+    name = "bucket"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  # Feeds the trending scores (update_trending)
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
+  tags = merge(var.tags, { Name = "Listing Stats Table" })
+}
+
+# Decayed trending scores ("listing#<id>") and top-K boards
+# ("top#all", "top#nb#<neighborhood>")
+resource "aws_dynamodb_table" "trending" {
+  name         = "${var.project_name}-trending-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "key"
+
+  attribute {
+    name = "key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = merge(var.tags, { Name = "Trending Table" })
+}
+
 # =========================================
 # LAMBDA - Favorites
 # =========================================
@@ -80,7 +198,8 @@ resource "aws_lambda_function" "toggle_favorite" {
 
   environment {
     variables = {
-      TABLE_NAME = aws_dynamodb_table.favorites.name
+      TABLE_NAME          = aws_dynamodb_table.favorites.name
+      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
     }
   }
 }
@@ -109,11 +228,13 @@ resource "aws_lambda_function" "get_favorites" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.get_favorites_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 15
 
   environment {
     variables = {
-      TABLE_NAME = aws_dynamodb_table.favorites.name
+      TABLE_NAME          = aws_dynamodb_table.favorites.name
+      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
     }
   }
 }
@@ -150,8 +271,7 @@ resource "aws_lambda_function" "track_view" {
 
   environment {
     variables = {
-      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
-      VIEWS_TABLE_NAME    = aws_dynamodb_table.listing_views.name
+      VIEW_QUEUE_URL = aws_sqs_queue.listing_view_events.url
     }
   }
 }
@@ -167,6 +287,237 @@ resource "aws_lambda_function_url" "track_view_url" {
   }
 }
 
+# View aggregation: track_view enqueues, aggregate_views folds each batch
+# into one counter update per listing
+resource "aws_sqs_queue" "listing_view_events_dlq" {
+  name                      = "${var.project_name}-listing-view-events-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+  tags                      = merge(var.tags, { Name = "Listing View Events DLQ" })
+}
+
+resource "aws_sqs_queue" "listing_view_events" {
+  name                       = "${var.project_name}-listing-view-events-${var.environment}"
+  visibility_timeout_seconds = 360 # >= 6x worker timeout
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.listing_view_events_dlq.arn
+    maxReceiveCount     = 5
+  })
+  tags = merge(var.tags, { Name = "Listing View Events Queue" })
+}
+
+data "archive_file" "aggregate_views_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/aggregate_views"
+  output_path = "${path.module}/aggregate_views.zip"
+}
+
+resource "aws_lambda_function" "aggregate_views" {
+  filename         = data.archive_file.aggregate_views_zip.output_path
+  function_name    = "${var.project_name}-aggregate-views-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.aggregate_views_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 60
+
+  environment {
+    variables = {
+      LISTINGS_TABLE_NAME     = aws_dynamodb_table.listings.name
+      VIEW_SKETCHES_TABLE     = aws_dynamodb_table.view_sketches.name
+      LISTING_STATS_TABLE     = aws_dynamodb_table.listing_stats.name
+      LEGACY_VIEWS_TABLE_NAME = aws_dynamodb_table.listing_views.name
+    }
+  }
+  tags = merge(var.tags, { Name = "Aggregate Views Lambda" })
+}
+
+resource "aws_lambda_event_source_mapping" "aggregate_views_queue" {
+  event_source_arn                   = aws_sqs_queue.listing_view_events.arn
+  function_name                      = aws_lambda_function.aggregate_views.arn
+  batch_size                         = var.view_aggregation_batch_size
+  maximum_batching_window_in_seconds = var.view_aggregation_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # Few concurrent consumers keep per-listing counter writes bounded
+  scaling_config {
+    maximum_concurrency = 2
+  }
+}
+
+# Favorite and bid rollups from the table streams
+data "archive_file" "rollup_interactions_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/rollup_interactions"
+  output_path = "${path.module}/rollup_interactions.zip"
+}
+
+resource "aws_lambda_function" "rollup_interactions" {
+  filename         = data.archive_file.rollup_interactions_zip.output_path
+  function_name    = "${var.project_name}-rollup-interactions-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.rollup_interactions_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 60
+
+  environment {
+    variables = {
+      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
+      BIDS_TABLE_NAME     = aws_dynamodb_table.bids.name
+      LISTING_STATS_TABLE = aws_dynamodb_table.listing_stats.name
+    }
+  }
+  tags = merge(var.tags, { Name = "Rollup Interactions Lambda" })
+}
+
+resource "aws_lambda_event_source_mapping" "rollup_favorites_stream" {
+  event_source_arn                   = aws_dynamodb_table.favorites.stream_arn
+  function_name                      = aws_lambda_function.rollup_interactions.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 500
+  maximum_batching_window_in_seconds = 30
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 5
+}
+
+resource "aws_lambda_event_source_mapping" "rollup_bids_stream" {
+  event_source_arn                   = aws_dynamodb_table.bids.stream_arn
+  function_name                      = aws_lambda_function.rollup_interactions.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 500
+  maximum_batching_window_in_seconds = 30
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 5
+}
+
+# Analytics time series for a listing or neighborhood
+data "archive_file" "get_listing_stats_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/get_listing_stats"
+  output_path = "${path.module}/get_listing_stats.zip"
+}
+
+resource "aws_lambda_function" "get_listing_stats" {
+  filename         = data.archive_file.get_listing_stats_zip.output_path
+  function_name    = "${var.project_name}-get-listing-stats-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.get_listing_stats_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 15
+
+  environment {
+    variables = {
+      LISTING_STATS_TABLE = aws_dynamodb_table.listing_stats.name
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Get Listing Stats Lambda" })
+}
+
+resource "aws_lambda_function_url" "get_listing_stats_url" {
+  function_name      = aws_lambda_function.get_listing_stats.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
+# Trending scores and boards from the hourly listing rollups
+data "archive_file" "update_trending_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/update_trending"
+  output_path = "${path.module}/update_trending.zip"
+}
+
+resource "aws_lambda_function" "update_trending" {
+  filename         = data.archive_file.update_trending_zip.output_path
+  function_name    = "${var.project_name}-update-trending-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.update_trending_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 60
+
+  environment {
+    variables = {
+      LISTINGS_TABLE_NAME      = aws_dynamodb_table.listings.name
+      TRENDING_TABLE           = aws_dynamodb_table.trending.name
+      TRENDING_HALF_LIFE_HOURS = tostring(var.trending_half_life_hours)
+    }
+  }
+  tags = merge(var.tags, { Name = "Update Trending Lambda" })
+}
+
+resource "aws_lambda_event_source_mapping" "update_trending_stream" {
+  event_source_arn                   = aws_dynamodb_table.listing_stats.stream_arn
+  function_name                      = aws_lambda_function.update_trending.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 500
+  maximum_batching_window_in_seconds = 30
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 5
+
+  # Only hourly listing buckets; neighborhood and daily items would double count
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT", "MODIFY"]
+        dynamodb = {
+          Keys = {
+            series = { S = [{ prefix = "listing#" }] }
+            bucket = { S = [{ prefix = "h#" }] }
+          }
+        }
+      })
+    }
+  }
+}
+
+data "archive_file" "get_trending_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/get_trending"
+  output_path = "${path.module}/get_trending.zip"
+}
+
+resource "aws_lambda_function" "get_trending" {
+  filename         = data.archive_file.get_trending_zip.output_path
+  function_name    = "${var.project_name}-get-trending-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.get_trending_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 15
+
+  environment {
+    variables = {
+      TRENDING_TABLE           = aws_dynamodb_table.trending.name
+      TRENDING_HALF_LIFE_HOURS = tostring(var.trending_half_life_hours)
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Get Trending Lambda" })
+}
+
+resource "aws_lambda_function_url" "get_trending_url" {
+  function_name      = aws_lambda_function.get_trending.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
 # =========================================
 # LAMBDA - Auctions
 # =========================================
@@ -184,12 +535,15 @@ resource "aws_lambda_function" "place_bid" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.place_bid_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 15
 
   environment {
     variables = {
-      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
-      BIDS_TABLE_NAME     = aws_dynamodb_table.bids.name
+      LISTINGS_TABLE_NAME      = aws_dynamodb_table.listings.name
+      BIDS_TABLE_NAME          = aws_dynamodb_table.bids.name
+      PUSH_ENDPOINT            = local.push_endpoint
+      PUSH_SUBSCRIPTIONS_TABLE = aws_dynamodb_table.push_subscriptions.name
     }
   }
 }
@@ -205,3 +559,125 @@ resource "aws_lambda_function_url" "place_bid_url" {
   }
 }
 
+# Bid history + leaderboard
+data "archive_file" "get_bids_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/get_bids"
+  output_path = "${path.module}/get_bids.zip"
+}
+
+resource "aws_lambda_function" "get_bids" {
+  filename         = data.archive_file.get_bids_zip.output_path
+  function_name    = "${var.project_name}-get-bids-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.get_bids_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 15
+
+  environment {
+    variables = {
+      BIDS_TABLE_NAME = aws_dynamodb_table.bids.name
+      BID_STATS_TABLE = aws_dynamodb_table.bid_stats.name
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Get Bids Lambda" })
+}
+
+resource "aws_lambda_function_url" "get_bids_url" {
+  function_name      = aws_lambda_function.get_bids.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
+# Folds new bids into bid_stats from the bids stream
+data "archive_file" "aggregate_bids_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/aggregate_bids"
+  output_path = "${path.module}/aggregate_bids.zip"
+}
+
+resource "aws_lambda_function" "aggregate_bids" {
+  filename         = data.archive_file.aggregate_bids_zip.output_path
+  function_name    = "${var.project_name}-aggregate-bids-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.aggregate_bids_zip.output_base64sha256
+  runtime          = "python3.11"
+  timeout          = 60
+
+  environment {
+    variables = {
+      BID_STATS_TABLE   = aws_dynamodb_table.bid_stats.name
+      BID_MARKERS_TABLE = aws_dynamodb_table.bid_markers.name
+      TOP_N             = "10"
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Aggregate Bids Lambda" })
+}
+
+resource "aws_lambda_event_source_mapping" "aggregate_bids_stream" {
+  event_source_arn                   = aws_dynamodb_table.bids.stream_arn
+  function_name                      = aws_lambda_function.aggregate_bids.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 5
+}
+
+# Closes expired auctions from the listings auction_close_index
+data "archive_file" "close_auctions_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/close_auctions"
+  output_path = "${path.module}/close_auctions.zip"
+}
+
+resource "aws_lambda_function" "close_auctions" {
+  filename         = data.archive_file.close_auctions_zip.output_path
+  function_name    = "${var.project_name}-close-auctions-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.close_auctions_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 120
+
+  environment {
+    variables = {
+      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
+      COUNTER_TABLE_NAME  = aws_dynamodb_table.counters.name
+      EVENT_BUS_NAME      = "default"
+    }
+  }
+  tags = merge(var.tags, { Name = "Close Auctions Lambda" })
+}
+
+resource "aws_cloudwatch_event_rule" "close_auctions_schedule" {
+  name                = "${var.project_name}-close-auctions-${var.environment}"
+  description         = "Close auctions whose end time has passed"
+  schedule_expression = var.auction_sweep_schedule_expression
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "close_auctions" {
+  rule      = aws_cloudwatch_event_rule.close_auctions_schedule.name
+  target_id = "CloseAuctions"
+  arn       = aws_lambda_function.close_auctions.arn
+}
+
+resource "aws_lambda_permission" "close_auctions_events" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.close_auctions.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.close_auctions_schedule.arn
+}
@@ -8,6 +8,10 @@ resource "aws_dynamodb_table" "listings" {
   billing_mode   = "PAY_PER_REQUEST"
   hash_key       = "listing_id"
   range_key      = "created_at"
+
+  # Change feed for derived read models (search index, ...)
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
   
   attribute {
     name = "listing_id"
@@ -19,9 +23,139 @@ resource "aws_dynamodb_table" "listings" {
     type = "S"
   }
 
+  attribute {
+    name = "owner_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "geo_cell"
+    type = "S"
+  }
+
+  attribute {
+    name = "geohash"
+    type = "S"
+  }
+
+  attribute {
+    name = "auction_close_bucket"
+    type = "S"
+  }
+
+  attribute {
+    name = "auction_close_at"
+    type = "S"
+  }
+
+  # "My listings" reads: query by owner, newest first
+  global_secondary_index {
+    name            = "owner_id_index"
+    hash_key        = "owner_id"
+    range_key       = "created_at"
+    projection_type = "ALL"
+  }
+
+  # Nearby search: coarse geohash cell + begins_with on the full geohash
+  global_secondary_index {
+    name            = "geo_cell_index"
+    hash_key        = "geo_cell"
+    range_key       = "geohash"
+    projection_type = "ALL"
+  }
+
+  # Auction sweeper: open auctions only (sparse), by UTC end hour then end time
+  global_secondary_index {
+    name               = "auction_close_index"
+    hash_key           = "auction_close_bucket"
+    range_key          = "auction_close_at"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["auction_status", "auction_end_time", "owner_id", "address", "bid_count", "current_highest_bid", "highest_bidder_id"]
+  }
+
   tags = merge(var.tags, { Name = "Listings Table" })
 }
 
+# Listing search index (maintained by index_listings from the listings stream)
+# One compact card per listing per facet: "all#<shard>", "nb#<neighborhood>",
+# "status#<ai status>" (see src/layers/common/python/search_index.py)
+resource "aws_dynamodb_table" "listing_search" {
+  name           = "${var.project_name}-listing-search-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "facet"
+  range_key      = "listing_id"
+
+  attribute {
+    name = "facet"
+    type = "S"
+  }
+
+  attribute {
+    name = "listing_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "price"
+    type = "N"
+  }
+
+  attribute {
+    name = "price_per_sqm"
+    type = "N"
+  }
+
+  attribute {
+    name = "created_at"
+    type = "S"
+  }
+
+  attribute {
+    name = "diff_pct"
+    type = "N"
+  }
+
+  local_secondary_index {
+    name            = "price_index"
+    range_key       = "price"
+    projection_type = "ALL"
+  }
+
+  local_secondary_index {
+    name            = "price_per_sqm_index"
+    range_key       = "price_per_sqm"
+    projection_type = "ALL"
+  }
+
+  local_secondary_index {
+    name            = "created_at_index"
+    range_key       = "created_at"
+    projection_type = "ALL"
+  }
+
+  local_secondary_index {
+    name            = "diff_pct_index"
+    range_key       = "diff_pct"
+    projection_type = "ALL"
+  }
+
+  tags = merge(var.tags, { Name = "Listing Search Index" })
+}
+
+# Atomic counters (e.g. total listings created, used for the retraining trigger)
+resource "aws_dynamodb_table" "counters" {
+  name           = "${var.project_name}-counters-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "counter_id"
+
+  attribute {
+    name = "counter_id"
+    type = "S"
+  }
+
+  tags = merge(var.tags, { Name = "Counters Table" })
+}
+
 # =========================================
 # LAMBDA - Listings Management
 # =========================================
@@ -40,15 +174,17 @@ resource "aws_lambda_function" "create_listing" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.create_listing_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 30
   
   environment {
     variables = {
-      ENVIRONMENT       = var.environment
-      TABLE_NAME        = aws_dynamodb_table.listings.name
-      INFERENCE_FUNC    = aws_lambda_function.inference.function_name
-      STATE_MACHINE_ARN = aws_sfn_state_machine.mlops_pipeline.arn
-      RETRAIN_THRESHOLD = "10"
+      ENVIRONMENT         = var.environment
+      TABLE_NAME          = aws_dynamodb_table.listings.name
+      COUNTER_TABLE_NAME  = aws_dynamodb_table.counters.name
+      VALUATION_QUEUE_URL = aws_sqs_queue.listing_valuation.url
+      STATE_MACHINE_ARN   = aws_sfn_state_machine.mlops_pipeline.arn
+      RETRAIN_THRESHOLD   = "10"
     }
   }
   tags = merge(var.tags, { Name = "Create Listing Lambda" })
@@ -65,6 +201,99 @@ resource "aws_lambda_function_url" "create_listing_url" {
   }
 }
 
+# 10b. Listing Valuation (async worker fed by SQS)
+resource "aws_sqs_queue" "listing_valuation_dlq" {
+  name                      = "${var.project_name}-listing-valuation-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+  tags                      = merge(var.tags, { Name = "Listing Valuation DLQ" })
+}
+
+resource "aws_sqs_queue" "listing_valuation" {
+  name                       = "${var.project_name}-listing-valuation-${var.environment}"
+  visibility_timeout_seconds = 180 # >= 6x worker timeout
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.listing_valuation_dlq.arn
+    maxReceiveCount     = 3
+  })
+  tags = merge(var.tags, { Name = "Listing Valuation Queue" })
+}
+
+data "archive_file" "value_listing_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/value_listing"
+  output_path = "${path.module}/value_listing.zip"
+}
+
+resource "aws_lambda_function" "value_listing" {
+  filename         = data.archive_file.value_listing_zip.output_path
+  function_name    = "${var.project_name}-value-listing-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.value_listing_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 30
+
+  environment {
+    variables = {
+      ENVIRONMENT    = var.environment
+      TABLE_NAME     = aws_dynamodb_table.listings.name
+      INFERENCE_FUNC = aws_lambda_function.inference.function_name
+    }
+  }
+  tags = merge(var.tags, { Name = "Value Listing Lambda" })
+}
+
+resource "aws_lambda_event_source_mapping" "value_listing_queue" {
+  event_source_arn        = aws_sqs_queue.listing_valuation.arn
+  function_name           = aws_lambda_function.value_listing.arn
+  batch_size              = 10
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
+# 10c. Bulk Import Listings
+data "archive_file" "import_listings_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/import_listings"
+  output_path = "${path.module}/import_listings.zip"
+}
+
+resource "aws_lambda_function" "import_listings" {
+  filename         = data.archive_file.import_listings_zip.output_path
+  function_name    = "${var.project_name}-import-listings-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.import_listings_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 120
+  memory_size      = 512
+
+  environment {
+    variables = {
+      ENVIRONMENT        = var.environment
+      TABLE_NAME         = aws_dynamodb_table.listings.name
+      COUNTER_TABLE_NAME = aws_dynamodb_table.counters.name
+      INFERENCE_FUNC     = aws_lambda_function.inference.function_name
+      STATE_MACHINE_ARN  = aws_sfn_state_machine.mlops_pipeline.arn
+      RETRAIN_THRESHOLD  = "10"
+      MAX_BATCH_SIZE     = "500"
+    }
+  }
+  tags = merge(var.tags, { Name = "Import Listings Lambda" })
+}
+
+resource "aws_lambda_function_url" "import_listings_url" {
+  function_name      = aws_lambda_function.import_listings.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
 # 11. Get Listings
 data "archive_file" "get_listings_zip" {
   type        = "zip"
@@ -79,12 +308,14 @@ resource "aws_lambda_function" "get_listings" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.get_listings_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 30
   
   environment {
     variables = {
       ENVIRONMENT = var.environment
       TABLE_NAME  = aws_dynamodb_table.listings.name
+      PAGE_SIZE   = "24"
     }
   }
   tags = merge(var.tags, { Name = "Get Listings Lambda" })
@@ -100,3 +331,171 @@ resource "aws_lambda_function_url" "get_listings_url" {
     allow_headers     = ["*"]
   }
 }
+
+# 12. Search Nearby (geohash index)
+data "archive_file" "search_nearby_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/search_nearby"
+  output_path = "${path.module}/search_nearby.zip"
+}
+
+resource "aws_lambda_function" "search_nearby" {
+  filename         = data.archive_file.search_nearby_zip.output_path
+  function_name    = "${var.project_name}-search-nearby-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.search_nearby_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 30
+
+  environment {
+    variables = {
+      ENVIRONMENT   = var.environment
+      TABLE_NAME    = aws_dynamodb_table.listings.name
+      MAX_RADIUS_KM = "7"
+    }
+  }
+  tags = merge(var.tags, { Name = "Search Nearby Lambda" })
+}
+
+resource "aws_lambda_function_url" "search_nearby_url" {
+  function_name      = aws_lambda_function.search_nearby.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
+# 13. Listing Search Index (stream consumer) + Faceted Search
+data "archive_file" "index_listings_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/index_listings"
+  output_path = "${path.module}/index_listings.zip"
+}
+
+resource "aws_lambda_function" "index_listings" {
+  filename         = data.archive_file.index_listings_zip.output_path
+  function_name    = "${var.project_name}-index-listings-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.index_listings_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 300
+
+  environment {
+    variables = {
+      ENVIRONMENT         = var.environment
+      LISTINGS_TABLE_NAME = aws_dynamodb_table.listings.name
+      SEARCH_INDEX_TABLE  = aws_dynamodb_table.listing_search.name
+      SEARCH_ALL_SHARDS   = tostring(var.search_all_shards)
+      COUNTER_TABLE_NAME  = aws_dynamodb_table.counters.name
+    }
+  }
+  tags = merge(var.tags, { Name = "Index Listings Lambda" })
+}
+
+resource "aws_lambda_event_source_mapping" "index_listings_stream" {
+  event_source_arn                   = aws_dynamodb_table.listings.stream_arn
+  function_name                      = aws_lambda_function.index_listings.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 5
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 5
+}
+
+data "archive_file" "search_listings_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/search_listings"
+  output_path = "${path.module}/search_listings.zip"
+}
+
+resource "aws_lambda_function" "search_listings" {
+  filename         = data.archive_file.search_listings_zip.output_path
+  function_name    = "${var.project_name}-search-listings-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.search_listings_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 30
+
+  environment {
+    variables = {
+      ENVIRONMENT        = var.environment
+      SEARCH_INDEX_TABLE = aws_dynamodb_table.listing_search.name
+      SEARCH_ALL_SHARDS  = tostring(var.search_all_shards)
+    }
+  }
+  tags = merge(var.tags, { Name = "Search Listings Lambda" })
+}
+
+resource "aws_lambda_function_url" "search_listings_url" {
+  function_name      = aws_lambda_function.search_listings.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
+# 14. Static Listing Snapshots (published to the frontend bucket)
+data "archive_file" "publish_snapshots_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/publish_snapshots"
+  output_path = "${path.module}/publish_snapshots.zip"
+}
+
+resource "aws_lambda_function" "publish_snapshots" {
+  filename         = data.archive_file.publish_snapshots_zip.output_path
+  function_name    = "${var.project_name}-publish-snapshots-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.publish_snapshots_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 120
+  memory_size      = 512
+
+  environment {
+    variables = {
+      ENVIRONMENT        = var.environment
+      SEARCH_INDEX_TABLE = aws_dynamodb_table.listing_search.name
+      SEARCH_ALL_SHARDS  = tostring(var.search_all_shards)
+      COUNTER_TABLE_NAME = aws_dynamodb_table.counters.name
+      FRONTEND_BUCKET    = aws_s3_bucket.frontend.id
+      SNAPSHOT_PREFIX    = "data/listings"
+      PAGE_SIZE          = "100"
+    }
+  }
+  tags = merge(var.tags, { Name = "Publish Snapshots Lambda" })
+}
+
+# Debounce: publish at most once per interval, only if listings changed
+resource "aws_cloudwatch_event_rule" "publish_snapshots_schedule" {
+  name                = "${var.project_name}-publish-snapshots-${var.environment}"
+  description         = "Republish static listing snapshots when listings changed"
+  schedule_expression = var.snapshot_schedule_expression
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "publish_snapshots" {
+  rule      = aws_cloudwatch_event_rule.publish_snapshots_schedule.name
+  target_id = "PublishSnapshots"
+  arn       = aws_lambda_function.publish_snapshots.arn
+}
+
+resource "aws_lambda_permission" "publish_snapshots_events" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.publish_snapshots.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.publish_snapshots_schedule.arn
+}
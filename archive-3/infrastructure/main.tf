@@ -15,6 +15,10 @@ terraform {
       source  = "hashicorp/archive"
       version = "~> 2.0"
     }
+    null = {
+      source  = "hashicorp/null"
+      version = "~> 3.0"
+    }
   }
 }
 
@@ -121,9 +125,71 @@ resource "aws_dynamodb_table" "estimates" {
     type = "S"
   }
 
+  attribute {
+    name = "time_bucket"
+    type = "S"
+  }
+
+  attribute {
+    name = "timestamp"
+    type = "S"
+  }
+
+  attribute {
+    name = "owner_key"
+    type = "S"
+  }
+
+  # Newest-first history: one partition per UTC day, sorted by time
+  global_secondary_index {
+    name            = "recent_index"
+    hash_key        = "time_bucket"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+
+  # Per-user history (sparse: only estimates made with a history token).
+  # owner_key is the token's SHA-256, so a user's public id cannot read it.
+  global_secondary_index {
+    name            = "owner_index"
+    hash_key        = "owner_key"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+
+  # Raw estimates expire; compact_estimates folds them into the monthly
+  # aggregates from the stream
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  stream_enabled   = true
+  stream_view_type = "OLD_IMAGE"
+
   tags = merge(var.tags, { Name = "Estimates Table" })
 }
 
+# Long-term estimate aggregates, one item per (neighborhood, "YYYY-MM")
+resource "aws_dynamodb_table" "estimate_aggregates" {
+  name         = "${var.project_name}-estimate-aggregates-${var.environment}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "neighborhood"
+  range_key    = "month"
+
+  attribute {
+    name = "neighborhood"
+    type = "S"
+  }
+
+  attribute {
+    name = "month"
+    type = "S"
+  }
+
+  tags = merge(var.tags, { Name = "Estimate Aggregates Table" })
+}
+
 # =========================================
 # IAM ROLES - AWS ACADEMY VERSION
 # =========================================
@@ -156,6 +222,40 @@ resource "aws_lambda_layer_version" "sklearn_layer" {
   depends_on = [aws_s3_object.layer_zip]
 }
 
+# Small pure-Python helpers shared across lambdas (src/layers/common/python)
+# plus their native dependencies (orjson for ddb_json), installed by
+# scripts/create_common_layer_deps.sh before the layer is zipped. Re-runs
+# when the script changes or the installed package is missing (fresh
+# checkout); needs pip on the machine running terraform.
+resource "null_resource" "common_layer_deps" {
+  triggers = {
+    script    = filemd5("${path.module}/../scripts/create_common_layer_deps.sh")
+    installed = fileexists("${path.module}/../src/layers/common/python/orjson/__init__.py") ? "yes" : "no"
+  }
+
+  provisioner "local-exec" {
+    command     = "bash scripts/create_common_layer_deps.sh"
+    working_dir = "${path.module}/.."
+  }
+}
+
+data "archive_file" "common_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/layers/common"
+  output_path = "${path.module}/common_layer.zip"
+
+  depends_on = [null_resource.common_layer_deps]
+}
+
+resource "aws_lambda_layer_version" "common_layer" {
+  layer_name       = "${var.project_name}-common-layer"
+  filename         = data.archive_file.common_layer_zip.output_path
+  source_code_hash = data.archive_file.common_layer_zip.output_base64sha256
+
+  compatible_runtimes = ["python3.11"]
+  description         = "Shared helpers (geohash, pagination cursors, DynamoDB JSON codec, auction close index, push fan-out, message archive, HyperLogLog, analytics rollups, trending scores, search index facets)"
+}
+
 # =========================================
 # LAMBDA FUNCTIONS
 # =========================================
@@ -311,14 +411,16 @@ resource "aws_lambda_function" "inference" {
   timeout          = 30
   memory_size      = 512
   
-  # Restore layer for scikit-learn
-  layers           = [aws_lambda_layer_version.sklearn_layer.arn]
+  # Restore layer for scikit-learn (+ shared helpers)
+  layers           = [aws_lambda_layer_version.sklearn_layer.arn, aws_lambda_layer_version.common_layer.arn]
 
   environment {
     variables = {
-      ENVIRONMENT  = var.environment
-      MODEL_BUCKET = aws_s3_bucket.model_artifacts.id
-      TABLE_NAME   = aws_dynamodb_table.estimates.name
+      ENVIRONMENT               = var.environment
+      MODEL_BUCKET              = aws_s3_bucket.model_artifacts.id
+      TABLE_NAME                = aws_dynamodb_table.estimates.name
+      ESTIMATE_TTL_DAYS         = tostring(var.estimate_ttl_days)
+      ESTIMATE_COALESCE_SECONDS = tostring(var.estimate_coalesce_seconds)
     }
   }
   tags = merge(var.tags, { Name = "Inference Lambda" })
@@ -425,12 +527,14 @@ resource "aws_lambda_function" "get_history" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.history_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 30
   
   environment {
     variables = {
-      ENVIRONMENT  = var.environment
-      TABLE_NAME   = aws_dynamodb_table.estimates.name
+      ENVIRONMENT       = var.environment
+      TABLE_NAME        = aws_dynamodb_table.estimates.name
+      AGGREGATES_TABLE  = aws_dynamodb_table.estimate_aggregates.name
     }
   }
   tags = merge(var.tags, { Name = "Get History Lambda" })
@@ -447,6 +551,50 @@ resource "aws_lambda_function_url" "history_url" {
   }
 }
 
+# Compacts expired estimates into the monthly aggregates
+data "archive_file" "compact_estimates_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/compact_estimates"
+  output_path = "${path.module}/compact_estimates.zip"
+}
+
+resource "aws_lambda_function" "compact_estimates" {
+  filename         = data.archive_file.compact_estimates_zip.output_path
+  function_name    = "${var.project_name}-compact-estimates-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.compact_estimates_zip.output_base64sha256
+  runtime          = "python3.11"
+  timeout          = 60
+
+  environment {
+    variables = {
+      AGGREGATES_TABLE = aws_dynamodb_table.estimate_aggregates.name
+    }
+  }
+  tags = merge(var.tags, { Name = "Compact Estimates Lambda" })
+}
+
+# Only TTL deletions are compacted
+resource "aws_lambda_event_source_mapping" "compact_estimates_stream" {
+  event_source_arn                   = aws_dynamodb_table.estimates.stream_arn
+  function_name                      = aws_lambda_function.compact_estimates.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 1000
+  maximum_batching_window_in_seconds = 60
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 5
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName    = ["REMOVE"]
+        userIdentity = { type = ["Service"], principalId = ["dynamodb.amazonaws.com"] }
+      })
+    }
+  }
+}
+
 
 # =========================================
 # STEP FUNCTIONS STATE MACHINE
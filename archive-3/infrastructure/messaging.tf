@@ -19,10 +19,75 @@ resource "aws_dynamodb_table" "conversations" {
     type = "S"
   }
 
+  # Hot tier: messages expire after var.message_hot_days and are archived
+  # to S3 from the stream (archive_messages)
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  stream_enabled   = true
+  stream_view_type = "OLD_IMAGE"
+
   tags = merge(var.tags, { Name = "Conversations Table" })
 }
 
+# Cold tier: gzip JSON-lines message segments per conversation
+resource "aws_s3_bucket" "message_archive" {
+  bucket        = "${var.project_name}-message-archive-${var.environment}"
+  tags          = merge(var.tags, { Name = "Message Archive Bucket" })
+  force_destroy = true
+}
+
 # DynamoDB Table: user_conversations (Index)
+# One item per (user, conversation), upserted in the same transaction as the
+# message; last_message_index lists a user's conversations by latest message
+# and updated_index serves delta sync (any change: message, read, receipt).
+resource "aws_dynamodb_table" "user_conversations_v2" {
+  name           = "${var.project_name}-user-conversations-v2-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "user_id"
+  range_key      = "conversation_id"
+
+  attribute {
+    name = "user_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "conversation_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "last_message_timestamp"
+    type = "S"
+  }
+
+  attribute {
+    name = "updated_at"
+    type = "S"
+  }
+
+  global_secondary_index {
+    name            = "last_message_index"
+    hash_key        = "user_id"
+    range_key       = "last_message_timestamp"
+    projection_type = "ALL"
+  }
+
+  global_secondary_index {
+    name            = "updated_index"
+    hash_key        = "user_id"
+    range_key       = "updated_at"
+    projection_type = "ALL"
+  }
+
+  tags = merge(var.tags, { Name = "User Conversations Index" })
+}
+
+# Previous (user_id, last_message_timestamp) index. No longer written; kept
+# until scripts/migrate_user_conversations.py has copied it into v2.
 resource "aws_dynamodb_table" "user_conversations" {
   name           = "${var.project_name}-user-conversations-${var.environment}"
   billing_mode   = "PAY_PER_REQUEST"
@@ -50,7 +115,7 @@ resource "aws_dynamodb_table" "user_conversations" {
     projection_type = "ALL"
   }
 
-  tags = merge(var.tags, { Name = "User Conversations Index" })
+  tags = merge(var.tags, { Name = "User Conversations Index (legacy)" })
 }
 
 # Lambda: send_message
@@ -67,14 +132,19 @@ resource "aws_lambda_function" "send_message" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.send_message_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 30
   memory_size      = 256
 
   environment {
     variables = {
       CONVERSATIONS_TABLE      = aws_dynamodb_table.conversations.name
-      USER_CONVERSATIONS_TABLE = aws_dynamodb_table.user_conversations.name
+      USER_CONVERSATIONS_TABLE = aws_dynamodb_table.user_conversations_v2.name
+      COUNTER_TABLE_NAME       = aws_dynamodb_table.counters.name
+      MESSAGE_HOT_DAYS         = tostring(var.message_hot_days)
       ENVIRONMENT              = var.environment
+      PUSH_ENDPOINT            = local.push_endpoint
+      PUSH_SUBSCRIPTIONS_TABLE = aws_dynamodb_table.push_subscriptions.name
     }
   }
 
@@ -106,12 +176,13 @@ resource "aws_lambda_function" "get_conversations" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.get_conversations_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 30
   memory_size      = 256
 
   environment {
     variables = {
-      USER_CONVERSATIONS_TABLE = aws_dynamodb_table.user_conversations.name
+      USER_CONVERSATIONS_TABLE = aws_dynamodb_table.user_conversations_v2.name
       ENVIRONMENT              = var.environment
     }
   }
@@ -144,12 +215,15 @@ resource "aws_lambda_function" "get_messages" {
   handler          = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.get_messages_zip.output_base64sha256
   runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
   timeout          = 30
   memory_size      = 256
 
   environment {
     variables = {
       CONVERSATIONS_TABLE = aws_dynamodb_table.conversations.name
+      COUNTER_TABLE_NAME  = aws_dynamodb_table.counters.name
+      ARCHIVE_BUCKET      = aws_s3_bucket.message_archive.id
       ENVIRONMENT         = var.environment
     }
   }
@@ -168,3 +242,170 @@ resource "aws_lambda_function_url" "get_messages_url" {
   }
 }
 
+# Lambda: mark_read
+data "archive_file" "mark_read_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/mark_read"
+  output_path = "${path.module}/mark_read.zip"
+}
+
+resource "aws_lambda_function" "mark_read" {
+  filename         = data.archive_file.mark_read_zip.output_path
+  function_name    = "${var.project_name}-mark-read-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.mark_read_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 15
+  memory_size      = 256
+
+  environment {
+    variables = {
+      USER_CONVERSATIONS_TABLE = aws_dynamodb_table.user_conversations_v2.name
+      COUNTER_TABLE_NAME       = aws_dynamodb_table.counters.name
+      ENVIRONMENT              = var.environment
+      PUSH_ENDPOINT            = local.push_endpoint
+      PUSH_SUBSCRIPTIONS_TABLE = aws_dynamodb_table.push_subscriptions.name
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Mark Read Lambda" })
+}
+
+resource "aws_lambda_function_url" "mark_read_url" {
+  function_name      = aws_lambda_function.mark_read.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
+# Lambda: get_unread_count
+data "archive_file" "get_unread_count_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/get_unread_count"
+  output_path = "${path.module}/get_unread_count.zip"
+}
+
+resource "aws_lambda_function" "get_unread_count" {
+  filename         = data.archive_file.get_unread_count_zip.output_path
+  function_name    = "${var.project_name}-get-unread-count-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.get_unread_count_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 10
+  memory_size      = 256
+
+  environment {
+    variables = {
+      COUNTER_TABLE_NAME = aws_dynamodb_table.counters.name
+      ENVIRONMENT        = var.environment
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Get Unread Count Lambda" })
+}
+
+resource "aws_lambda_function_url" "get_unread_count_url" {
+  function_name      = aws_lambda_function.get_unread_count.function_name
+  authorization_type = "NONE"
+  cors {
+    allow_credentials = true
+    allow_origins     = ["*"]
+    allow_methods     = ["*"]
+    allow_headers     = ["*"]
+  }
+}
+
+# Lambda: archive_messages (TTL expiries -> S3 segments)
+data "archive_file" "archive_messages_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/archive_messages"
+  output_path = "${path.module}/archive_messages.zip"
+}
+
+resource "aws_lambda_function" "archive_messages" {
+  filename         = data.archive_file.archive_messages_zip.output_path
+  function_name    = "${var.project_name}-archive-messages-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.archive_messages_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 300
+  memory_size      = 256
+
+  environment {
+    variables = {
+      CONVERSATIONS_TABLE = aws_dynamodb_table.conversations.name
+      COUNTER_TABLE_NAME  = aws_dynamodb_table.counters.name
+      ARCHIVE_BUCKET      = aws_s3_bucket.message_archive.id
+      MESSAGE_HOT_DAYS    = tostring(var.message_hot_days)
+      ENVIRONMENT         = var.environment
+    }
+  }
+
+  tags = merge(var.tags, { Name = "Archive Messages Lambda" })
+}
+
+# Failed archive batches: the stream mapping's on-failure destination. Each
+# message holds a batch's stream coordinates; archive_messages replays them
+# from the stream (retained 24h), so the queue is drained well within that.
+resource "aws_sqs_queue" "archive_messages_failures_dlq" {
+  name                      = "${var.project_name}-archive-messages-failures-dlq-${var.environment}"
+  message_retention_seconds = 1209600
+  tags                      = merge(var.tags, { Name = "Archive Messages Failures DLQ" })
+}
+
+resource "aws_sqs_queue" "archive_messages_failures" {
+  name                       = "${var.project_name}-archive-messages-failures-${var.environment}"
+  visibility_timeout_seconds = 1800 # >= 6x worker timeout
+  message_retention_seconds  = 1209600
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.archive_messages_failures_dlq.arn
+    maxReceiveCount     = 5
+  })
+  tags = merge(var.tags, { Name = "Archive Messages Failures Queue" })
+}
+
+# Only TTL deletions (not user deletes) are archived. The messages are
+# already deleted, so a failing batch is split to isolate bad records,
+# retried a few times, then handed to the failures queue for replay instead
+# of blocking the shard until the records expire.
+resource "aws_lambda_event_source_mapping" "archive_messages_stream" {
+  event_source_arn                   = aws_dynamodb_table.conversations.stream_arn
+  function_name                      = aws_lambda_function.archive_messages.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 1000
+  maximum_batching_window_in_seconds = 60
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 3
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.archive_messages_failures.arn
+    }
+  }
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName    = ["REMOVE"]
+        userIdentity = { type = ["Service"], principalId = ["dynamodb.amazonaws.com"] }
+      })
+    }
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "archive_messages_replay" {
+  event_source_arn        = aws_sqs_queue.archive_messages_failures.arn
+  function_name           = aws_lambda_function.archive_messages.arn
+  batch_size              = 1
+  function_response_types = ["ReportBatchItemFailures"]
+}
@@ -18,3 +18,38 @@ output "place_bid_url" {
   description = "Public URL for placing bids"
   value       = aws_lambda_function_url.place_bid_url.function_url
 }
+
+output "import_listings_url" {
+  description = "Public URL for bulk listing imports"
+  value       = aws_lambda_function_url.import_listings_url.function_url
+}
+
+output "search_nearby_url" {
+  description = "Public URL for geospatial listing search"
+  value       = aws_lambda_function_url.search_nearby_url.function_url
+}
+
+output "search_listings_url" {
+  description = "Public URL for faceted listing search"
+  value       = aws_lambda_function_url.search_listings_url.function_url
+}
+
+output "push_websocket_url" {
+  description = "WebSocket URL for live bid and message updates"
+  value       = "${aws_apigatewayv2_api.push.api_endpoint}/${aws_apigatewayv2_stage.push.name}"
+}
+
+output "get_bids_url" {
+  description = "Public URL for bid history and auction leaderboards"
+  value       = aws_lambda_function_url.get_bids_url.function_url
+}
+
+output "get_listing_stats_url" {
+  description = "Public URL for listing and neighborhood analytics time series"
+  value       = aws_lambda_function_url.get_listing_stats_url.function_url
+}
+
+output "get_trending_url" {
+  description = "Public URL for trending listings (citywide or per neighborhood)"
+  value       = aws_lambda_function_url.get_trending_url.function_url
+}
@@ -0,0 +1,100 @@
+# =========================================
+# LIVE PUSH CHANNEL - WebSocket API
+# =========================================
+
+# Subscriptions: one item per (topic, connection)
+resource "aws_dynamodb_table" "push_subscriptions" {
+  name           = "${var.project_name}-push-subscriptions-${var.environment}"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "topic"
+  range_key      = "connection_id"
+
+  attribute {
+    name = "topic"
+    type = "S"
+  }
+
+  attribute {
+    name = "connection_id"
+    type = "S"
+  }
+
+  # $disconnect cleanup
+  global_secondary_index {
+    name            = "connection_id_index"
+    hash_key        = "connection_id"
+    projection_type = "KEYS_ONLY"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = merge(var.tags, { Name = "Push Subscriptions Table" })
+}
+
+resource "aws_apigatewayv2_api" "push" {
+  name                       = "${var.project_name}-push-${var.environment}"
+  protocol_type              = "WEBSOCKET"
+  route_selection_expression = "$request.body.action"
+  tags                       = var.tags
+}
+
+resource "aws_apigatewayv2_stage" "push" {
+  api_id      = aws_apigatewayv2_api.push.id
+  name        = var.environment
+  auto_deploy = true
+  tags        = var.tags
+}
+
+locals {
+  push_endpoint = "https://${aws_apigatewayv2_api.push.id}.execute-api.${var.aws_region}.amazonaws.com/${aws_apigatewayv2_stage.push.name}"
+}
+
+# Lambda: push_connections (connect / subscribe / disconnect)
+data "archive_file" "push_connections_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../src/lambdas/push_connections"
+  output_path = "${path.module}/push_connections.zip"
+}
+
+resource "aws_lambda_function" "push_connections" {
+  filename         = data.archive_file.push_connections_zip.output_path
+  function_name    = "${var.project_name}-push-connections-${var.environment}"
+  role             = data.aws_iam_role.lab_role.arn
+  handler          = "lambda_function.lambda_handler"
+  source_code_hash = data.archive_file.push_connections_zip.output_base64sha256
+  runtime          = "python3.11"
+  layers           = [aws_lambda_layer_version.common_layer.arn]
+  timeout          = 10
+
+  environment {
+    variables = {
+      PUSH_SUBSCRIPTIONS_TABLE = aws_dynamodb_table.push_subscriptions.name
+    }
+  }
+  tags = merge(var.tags, { Name = "Push Connections Lambda" })
+}
+
+resource "aws_apigatewayv2_integration" "push_connections" {
+  api_id             = aws_apigatewayv2_api.push.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.push_connections.invoke_arn
+  integration_method = "POST"
+}
+
+resource "aws_apigatewayv2_route" "push" {
+  for_each  = toset(["$connect", "$disconnect", "$default", "subscribe", "unsubscribe"])
+  api_id    = aws_apigatewayv2_api.push.id
+  route_key = each.value
+  target    = "integrations/${aws_apigatewayv2_integration.push_connections.id}"
+}
+
+resource "aws_lambda_permission" "push_connections_apigw" {
+  statement_id  = "AllowWebSocketInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.push_connections.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.push.execution_arn}/*/*"
+}
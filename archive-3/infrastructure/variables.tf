@@ -30,6 +30,60 @@ variable "schedule_expression" {
   # "cron(0 2 * * ? *)" - daily at 2 AM UTC
 }
 
+variable "snapshot_schedule_expression" {
+  description = "How often changed listings are republished as static snapshots"
+  type        = string
+  default     = "rate(1 minute)"
+}
+
+variable "message_hot_days" {
+  description = "Days a chat message stays in DynamoDB before moving to the S3 archive"
+  type        = number
+  default     = 90
+}
+
+variable "auction_sweep_schedule_expression" {
+  description = "How often expired auctions are closed"
+  type        = string
+  default     = "rate(5 minutes)"
+}
+
+variable "view_aggregation_batch_size" {
+  description = "Max page views folded into the listing counters per aggregate_views invocation"
+  type        = number
+  default     = 1000
+}
+
+variable "view_aggregation_window_seconds" {
+  description = "How long SQS buffers page views before invoking aggregate_views"
+  type        = number
+  default     = 30
+}
+
+variable "trending_half_life_hours" {
+  description = "Hours for a listing's trending score to halve without new activity"
+  type        = number
+  default     = 6
+}
+
+variable "estimate_ttl_days" {
+  description = "Days a valuation estimate is kept after its last request before compaction"
+  type        = number
+  default     = 90
+}
+
+variable "estimate_coalesce_seconds" {
+  description = "Window in which identical valuation requests share one estimate item"
+  type        = number
+  default     = 3600
+}
+
+variable "search_all_shards" {
+  description = "Partitions the listing search index spreads its every-listing facet over (changing it requires a rebuild)"
+  type        = number
+  default     = 8
+}
+
 variable "tags" {
   description = "Common tags to apply to all resources"
   type        = map(string)
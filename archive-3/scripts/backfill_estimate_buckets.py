@@ -0,0 +1,55 @@
+import argparse
+import boto3
+from datetime import datetime, timedelta
+
+# Give estimates written before the recent_index GSI existed their
+# time_bucket (UTC day of the timestamp), so get_history can find them.
+# With --expire-days, items without a TTL also get expires_at (timestamp +
+# N days), so legacy estimates age out into the monthly aggregates too.
+# Items that already have both are skipped; safe to re-run.
+#
+#   python scripts/backfill_estimate_buckets.py --table <project>-estimates-<env> \
+#       [--expire-days 90] [--dry-run]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--table', required=True)
+    parser.add_argument('--expire-days', type=int, help='set expires_at on items without one')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    table = boto3.resource('dynamodb').Table(args.table)
+    updated = skipped = 0
+    kwargs = {
+        'ProjectionExpression': 'estimate_id, #ts, time_bucket, expires_at',
+        'ExpressionAttributeNames': {'#ts': 'timestamp'}
+    }
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            sets, values = [], {}
+            if item.get('timestamp') and not item.get('time_bucket'):
+                sets.append('time_bucket = :bucket')
+                values[':bucket'] = item['timestamp'][:10]
+            if item.get('timestamp') and args.expire_days and not item.get('expires_at'):
+                expires = datetime.fromisoformat(item['timestamp']) + timedelta(days=args.expire_days)
+                sets.append('expires_at = :exp')
+                values[':exp'] = int((expires - datetime(1970, 1, 1)).total_seconds())
+            if not sets:
+                skipped += 1
+                continue
+            if not args.dry_run:
+                table.update_item(
+                    Key={'estimate_id': item['estimate_id']},
+                    UpdateExpression='SET ' + ', '.join(sets),
+                    ExpressionAttributeValues=values
+                )
+            updated += 1
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f"{'Would update' if args.dry_run else 'Updated'} {updated}, skipped {skipped}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import boto3
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+# Seed the "listings" counter item (retraining threshold, see create_listing
+# and import_listings) with the listings that existed before it. The counter
+# only ADDs one per create, so without this it counts from the day it was
+# introduced. The listings it already counted are in the table too, so the
+# seed is the table count minus the counter's current value, applied with
+# ADD so creates during the run still land. Listings created while the scan
+# runs can be counted twice or not at all: run it at a quiet time. The item
+# records seeded_at, and a second run is refused unless --force.
+#
+#   python scripts/backfill_listing_counter.py --listings <project>-listings-<env> \
+#       --counters <project>-counters-<env> [--dry-run] [--force]
+
+COUNTER_ID = 'listings'
+
+def count_items(table):
+    total = 0
+    kwargs = {'Select': 'COUNT'}
+    while True:
+        response = table.scan(**kwargs)
+        total += response['Count']
+        if 'LastEvaluatedKey' not in response:
+            return total
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--listings', required=True)
+    parser.add_argument('--counters', required=True)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--force', action='store_true', help='seed again even if seeded_at is set')
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb')
+    listings_table = dynamodb.Table(args.listings)
+    counter_table = dynamodb.Table(args.counters)
+
+    total = count_items(listings_table)
+    counter = counter_table.get_item(Key={'counter_id': COUNTER_ID}, ConsistentRead=True).get('Item') or {}
+    counted = int(counter.get('listing_count', 0))
+    seed = max(total - counted, 0)
+    print(f"{total} listings, counter at {counted}: seeding {seed}")
+    if args.dry_run or seed == 0:
+        return
+
+    update = {
+        'Key': {'counter_id': COUNTER_ID},
+        'UpdateExpression': 'ADD listing_count :seed SET seeded_at = :now',
+        'ExpressionAttributeValues': {':seed': seed, ':now': datetime.utcnow().isoformat()}
+    }
+    if not args.force:
+        update['ConditionExpression'] = 'attribute_not_exists(seeded_at)'
+    try:
+        counter_table.update_item(**update)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print("Counter already seeded; use --force to seed again")
+        return
+    print(f"Seeded listing_count with {seed}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import uuid
+
+# Accuracy check for the shared HyperLogLog sketch (unique listing viewers)
+# against exact set counts. For each cardinality it builds T sketches from
+# random viewer ids and reports the mean/max relative error and the stored
+# (compressed) size. It also checks the properties aggregate_views relies on:
+#   - re-adding the same viewers leaves the sketch unchanged (SQS redelivery)
+#   - merging per-batch sketches equals sketching the union (daily + all-time)
+#   - to_bytes/from_bytes round-trips
+# Exits non-zero if the mean error exceeds --max-error.
+#
+#   python scripts/bench_hll_accuracy.py [--trials 20] [--max-error 0.03]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'layers', 'common', 'python'))
+
+import hll  # noqa: E402
+
+CARDINALITIES = [1, 10, 100, 1000, 5000, 20000, 100000]
+
+def sketch_of(values):
+    sketch = hll.new()
+    for value in values:
+        hll.add(sketch, value)
+    return sketch
+
+def check_properties():
+    viewers = [f"user-{uuid.uuid4()}" for _ in range(5000)]
+    batches = [viewers[i:i + 700] for i in range(0, len(viewers), 700)]
+    whole = sketch_of(viewers)
+
+    redelivered = hll.merge(whole)
+    changed = any(hll.add(redelivered, v) for v in viewers[:1000])
+    merged = hll.merge(*[sketch_of(b) for b in batches])
+    round_trip = hll.from_bytes(hll.to_bytes(whole))
+
+    checks = {
+        'idempotent re-add': not changed and redelivered == whole,
+        'merge == union': merged == whole,
+        'bytes round-trip': round_trip == whole,
+    }
+    for name, ok in checks.items():
+        print(f"  {name:<18} {'ok' if ok else 'FAILED'}")
+    return all(checks.values())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trials', type=int, default=20)
+    parser.add_argument('--max-error', type=float, default=0.03, help='allowed mean relative error')
+    args = parser.parse_args()
+
+    print(f"HyperLogLog p={hll.PRECISION} ({hll.REGISTERS} registers), "
+          f"expected std error {1.04 / hll.REGISTERS ** 0.5:.2%}")
+    print(f"{'exact':>8} {'mean est':>10} {'mean err':>9} {'max err':>8} {'stored':>8}")
+
+    ok = True
+    for exact in CARDINALITIES:
+        estimates, errors, sizes = [], [], []
+        for _ in range(args.trials):
+            seed = random.getrandbits(64)
+            sketch = sketch_of(f"viewer-{seed}-{i}" for i in range(exact))
+            estimate = hll.count(sketch)
+            estimates.append(estimate)
+            errors.append(abs(estimate - exact) / exact)
+            sizes.append(len(hll.to_bytes(sketch)))
+        mean_error = statistics.mean(errors)
+        ok = ok and mean_error <= args.max_error
+        print(f"{exact:>8} {statistics.mean(estimates):>10.0f} {mean_error:>9.2%} "
+              f"{max(errors):>8.2%} {statistics.mean(sizes):>7.0f}B")
+
+    print("Properties:")
+    ok = check_properties() and ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import importlib.util
+import json
+import os
+import random
+import timeit
+import uuid
+from decimal import Decimal
+
+# Micro-benchmark for the shared ddb_json codec on realistic listing pages.
+#  1. Resource-API items (Decimal numbers): the per-lambda helpers vs dumps().
+#  2. Low-level AttributeValue items (client API / streams): boto3's
+#     TypeDeserializer + DecimalEncoder vs from_dynamodb() + dumps().
+#
+#   python scripts/bench_json_codec.py [--items 100] [--repeat 200]
+
+LAYER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'layers', 'common', 'python')
+
+def load_codec(backend):
+    """Import a private copy of ddb_json pinned to one backend."""
+    os.environ['JSON_BACKEND'] = backend
+    spec = importlib.util.spec_from_file_location(f'ddb_json_{backend}', os.path.join(LAYER_DIR, 'ddb_json.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    os.environ.pop('JSON_BACKEND')
+    return module
+
+def make_listing(i):
+    price = random.randint(150, 2500) * 1000
+    sqm = random.randint(35, 250)
+    estimated = Decimal(str(round(price * random.uniform(0.8, 1.2), 2)))
+    return {
+        'listing_id': str(uuid.uuid4()),
+        'created_at': f'2026-10-{1 + i % 28:02d}T12:00:00.{i:06d}',
+        'owner_id': f'user_{i % 50}',
+        'address': f'Carrer de Mallorca {i}',
+        'neighborhood': random.choice(["la Dreta de l'Eixample", 'Gràcia', 'El Born', 'Sants']),
+        'price': Decimal(price),
+        'features': {
+            'sqm': Decimal(sqm), 'bedrooms': Decimal(random.randint(1, 5)),
+            'bathrooms': Decimal(random.randint(1, 3)), 'has_elevator': True,
+            'has_pool': False, 'has_ac': True, 'has_terrace': bool(i % 2)
+        },
+        'contact': {'name': 'Agent', 'email': 'agent@example.com', 'phone': '+34 600 000 000'},
+        'description': 'Bright flat with original features, close to metro. ' * 4,
+        'coordinates': {'lat': Decimal('41.3840209'), 'lon': Decimal('2.1751218')},
+        'sale_type': 'fixed',
+        'view_count': Decimal(random.randint(0, 5000)),
+        'ai_valuation': {
+            'estimated_price': estimated,
+            'status': 'Fair Price',
+            'diff_pct': Decimal(str(round(random.uniform(-20, 20), 4)))
+        }
+    }
+
+# --- Current per-lambda approaches ---
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            if obj % 1 == 0:
+                return int(obj)
+            return float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def clean_decimal(obj):
+    if isinstance(obj, list):
+        return [clean_decimal(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: clean_decimal(v) for k, v in obj.items()}
+    elif hasattr(obj, 'to_eng_string'):
+        return float(obj)
+    else:
+        return obj
+
+def to_attribute_values(obj):
+    """Encode a resource-style value as a low-level AttributeValue."""
+    if isinstance(obj, str):
+        return {'S': obj}
+    if isinstance(obj, bool):
+        return {'BOOL': obj}
+    if isinstance(obj, Decimal):
+        return {'N': str(obj)}
+    if isinstance(obj, dict):
+        return {'M': {k: to_attribute_values(v) for k, v in obj.items()}}
+    if isinstance(obj, list):
+        return {'L': [to_attribute_values(v) for v in obj]}
+    return {'NULL': True}
+
+def load_type_deserializer():
+    try:
+        from boto3.dynamodb.types import TypeDeserializer
+        return TypeDeserializer(), 'boto3 TypeDeserializer'
+    except ImportError:
+        # Same Decimal context boto3 uses, for machines without boto3
+        from decimal import Context, Inexact, Rounded
+        context = Context(Emin=-128, Emax=126, prec=38, traps=[Inexact, Rounded])
+
+        class StandInDeserializer:
+            def deserialize(self, av):
+                (kind, value), = av.items()
+                if kind == 'N':
+                    return context.create_decimal(value)
+                if kind == 'M':
+                    return {k: self.deserialize(v) for k, v in value.items()}
+                if kind == 'L':
+                    return [self.deserialize(v) for v in value]
+                if kind == 'NULL':
+                    return None
+                return value
+        return StandInDeserializer(), 'TypeDeserializer stand-in (no boto3)'
+
+def run(candidates, repeat):
+    baseline = None
+    for name, fn in candidates.items():
+        best = min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat
+        baseline = baseline or best
+        print(f"  {name:<42} {best * 1e3:8.3f} ms/page   {baseline / best:5.1f}x")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(7)
+    payload = {'listings': [make_listing(i) for i in range(args.items)], 'count': args.items}
+
+    stdlib_codec = load_codec('json')
+    candidates = {
+        'DecimalEncoder (get_listings)': lambda: json.dumps(payload, cls=DecimalEncoder),
+        'clean_decimal + json (get_history)': lambda: json.dumps(clean_decimal(payload)),
+        'default=str (messaging, lossy)': lambda: json.dumps(payload, default=str),
+        'ddb_json [json]': lambda: stdlib_codec.dumps(payload),
+    }
+    fast_codec = load_codec('auto')
+    if fast_codec.BACKEND == 'orjson':
+        candidates['ddb_json [orjson]'] = lambda: fast_codec.dumps(payload)
+    else:
+        print('orjson not installed: skipping the orjson backend')
+
+    # Same output as the reference encoder (modulo whitespace)
+    reference = json.loads(json.dumps(payload, cls=DecimalEncoder))
+    assert json.loads(stdlib_codec.dumps(payload)) == reference
+    assert json.loads(fast_codec.dumps(payload)) == reference
+
+    print(f"Resource items: {args.items} listings/page, {len(json.dumps(payload, cls=DecimalEncoder))} bytes")
+    run(candidates, args.repeat)
+
+    # Low-level items, as delivered by the client API and DynamoDB streams
+    raw_items = [to_attribute_values(item)['M'] for item in payload['listings']]
+    deserializer, label = load_type_deserializer()
+
+    def current_low_level():
+        items = [{k: deserializer.deserialize(v) for k, v in item.items()} for item in raw_items]
+        return json.dumps({'listings': items}, cls=DecimalEncoder)
+
+    assert json.loads(fast_codec.dumps({'listings': [fast_codec.from_dynamodb(i) for i in raw_items]})) == {'listings': reference['listings']}
+
+    print(f"AttributeValue items ({label}):")
+    run({
+        'deserialize + DecimalEncoder': current_low_level,
+        'from_dynamodb + ddb_json [json]': lambda: stdlib_codec.dumps({'listings': [stdlib_codec.from_dynamodb(i) for i in raw_items]}),
+        f'from_dynamodb + ddb_json [{fast_codec.BACKEND}]': lambda: fast_codec.dumps({'listings': [fast_codec.from_dynamodb(i) for i in raw_items]}),
+    }, args.repeat)
+
+if __name__ == "__main__":
+    main()
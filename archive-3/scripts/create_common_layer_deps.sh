@@ -0,0 +1,21 @@
+#!/bin/bash
+set -e
+
+# Install native dependencies into the common layer.
+# Terraform runs this before zipping src/layers/common (null_resource
+# common_layer_deps); run it by hand only to use orjson locally. ddb_json
+# falls back to the stdlib json module without it.
+
+TARGET=src/layers/common/python
+
+pip install \
+    --platform manylinux2014_x86_64 \
+    --target $TARGET \
+    --implementation cp \
+    --python-version 3.11 \
+    --only-binary=:all: \
+    --upgrade \
+    orjson==3.9.10
+
+find $TARGET -type d -name "__pycache__" -exec rm -rf {} +
+echo "orjson installed into $TARGET"
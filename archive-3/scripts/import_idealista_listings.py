@@ -0,0 +1,83 @@
+import argparse
+import csv
+import os
+import time
+import requests
+
+# Bulk-load the Idealista sample into the marketplace through the import
+# endpoint and compare per-listing latency against single create_listing calls.
+#
+#   python scripts/import_idealista_listings.py --import-url <import_listings_url>
+#   python scripts/import_idealista_listings.py --import-url <url> --create-url <url> --compare 10
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'idealista_listings_barcelona.csv')
+
+def to_bool(value):
+    return str(value).strip().lower() == 'true'
+
+def row_to_listing(row, owner_id):
+    """Map an Idealista CSV row onto the create_listing payload."""
+    return {
+        'owner_id': owner_id,
+        'address': row['address'],
+        'neighborhood': row['neighborhood'],
+        'price': float(row['price']),
+        'description': row.get('description', ''),
+        'features': {
+            'sqm': float(row['size'] or 0),
+            'bedrooms': int(row['rooms'] or 0),
+            'bathrooms': int(row['bathrooms'] or 0),
+            'has_elevator': to_bool(row.get('hasLift')),
+        },
+        'coordinates': {'lat': float(row['latitude']), 'lon': float(row['longitude'])},
+        'contact': {'name': 'Idealista import', 'email': '', 'phone': ''},
+    }
+
+def load_listings(owner_id):
+    with open(DATA_FILE, newline='', encoding='utf-8') as f:
+        return [row_to_listing(row, owner_id) for row in csv.DictReader(f)]
+
+def bulk_import(url, listings, batch_size):
+    created, invalid = 0, 0
+    start = time.perf_counter()
+    for i in range(0, len(listings), batch_size):
+        resp = requests.post(url, json={'listings': listings[i:i + batch_size]}, timeout=300)
+        resp.raise_for_status()
+        data = resp.json()
+        created += data['created']
+        invalid += data['invalid']
+        for result in data['results']:
+            if result['status'] != 'created':
+                print(f"  row {i + result['row']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+    return created, invalid, elapsed
+
+def single_creates(url, listings):
+    start = time.perf_counter()
+    for listing in listings:
+        requests.post(url, json=listing, timeout=60).raise_for_status()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--import-url', required=True, help='import_listings function URL')
+    parser.add_argument('--create-url', help='create_listing function URL (for --compare)')
+    parser.add_argument('--compare', type=int, default=0, help='also time N single creates')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--owner-id', default='idealista_import')
+    args = parser.parse_args()
+
+    listings = load_listings(args.owner_id)
+    print(f"Loaded {len(listings)} listings from {DATA_FILE}")
+
+    created, invalid, elapsed = bulk_import(args.import_url, listings, args.batch_size)
+    per_listing_ms = elapsed / max(created, 1) * 1000
+    print(f"Bulk import: {created} created, {invalid} invalid in {elapsed:.2f}s ({per_listing_ms:.1f} ms/listing)")
+
+    if args.compare and args.create_url:
+        sample = listings[:args.compare]
+        elapsed = single_creates(args.create_url, sample)
+        print(f"Single creates: {len(sample)} in {elapsed:.2f}s ({elapsed / len(sample) * 1000:.1f} ms/listing)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import importlib.util
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Contention load test for place_bid against DynamoDB Local
+# (docker run -p 8000:8000 amazon/dynamodb-local).
+#
+# Many bidders hammer one hot auction, first through the previous
+# get_item -> put_item -> update_item flow, then through the transactional
+# place_bid lambda. For each run it reports latency percentiles and checks
+# for lost updates:
+#   - the listing's current_highest_bid must equal the highest accepted bid
+#   - bid_count must equal the number of accepted bids
+#   - no accepted bid may be lower than one accepted before it
+#
+#   python scripts/load_test_bids.py --bidders 20 --bids 25
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LISTINGS_TABLE = 'loadtest-listings'
+BIDS_TABLE = 'loadtest-bids'
+
+def configure_local_env(endpoint):
+    os.environ.setdefault('AWS_ENDPOINT_URL_DYNAMODB', endpoint)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ['LISTINGS_TABLE_NAME'] = LISTINGS_TABLE
+    os.environ['BIDS_TABLE_NAME'] = BIDS_TABLE
+
+def load_place_bid():
+    sys.path.insert(0, os.path.join(ROOT, 'src', 'layers', 'common', 'python'))
+    spec = importlib.util.spec_from_file_location('place_bid', os.path.join(ROOT, 'src', 'lambdas', 'place_bid', 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def create_tables(dynamodb):
+    existing = {t.name for t in dynamodb.tables.all()}
+    for name, range_key in ((LISTINGS_TABLE, 'created_at'), (BIDS_TABLE, 'timestamp')):
+        if name in existing:
+            continue
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{'AttributeName': 'listing_id', 'KeyType': 'HASH'},
+                       {'AttributeName': range_key, 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'listing_id', 'AttributeType': 'S'},
+                                  {'AttributeName': range_key, 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        ).wait_until_exists()
+
+def create_auction(listings_table):
+    listing = {
+        'listing_id': str(uuid.uuid4()),
+        'created_at': datetime.utcnow().isoformat(),
+        'sale_type': 'auction',
+        'price': Decimal(300000),
+        'starting_bid': Decimal(300000),
+        'current_highest_bid': Decimal(300000),
+        'bid_count': 0,
+        'auction_end_time': (datetime.utcnow() + timedelta(hours=1)).isoformat()
+    }
+    listings_table.put_item(Item=listing)
+    return listing
+
+def legacy_place_bid(listings_table, bids_table, listing_id, created_at, bidder_id, amount):
+    """The pre-transaction flow: read, compare, then two independent writes."""
+    item = listings_table.get_item(Key={'listing_id': listing_id, 'created_at': created_at})['Item']
+    current_price = item.get('current_highest_bid') or item.get('starting_bid') or item.get('price', 0)
+    if amount <= current_price:
+        return False
+    bids_table.put_item(Item={
+        'listing_id': listing_id, 'timestamp': datetime.utcnow().isoformat(),
+        'bidder_id': bidder_id, 'amount': amount
+    })
+    listings_table.update_item(
+        Key={'listing_id': listing_id, 'created_at': created_at},
+        UpdateExpression="SET current_highest_bid = :amt, highest_bidder_id = :uid, bid_count = if_not_exists(bid_count, :start) + :inc",
+        ExpressionAttributeValues={':amt': amount, ':uid': bidder_id, ':start': 0, ':inc': 1}
+    )
+    return True
+
+def run(name, place, listings_table, bids_table, bidders, bids_per_bidder):
+    listing = create_auction(listings_table)
+    latencies, accepted = [], []
+    lock = threading.Lock()
+    step = [0]
+
+    def bidder(n):
+        for _ in range(bids_per_bidder):
+            with lock:
+                step[0] += 1
+                # Bids trend upwards but overlap, as on a contested auction
+                amount = Decimal(300000 + step[0] * 1000 + random.randint(-5, 5) * 1000)
+            start = time.perf_counter()
+            ok = place(listing['listing_id'], listing['created_at'], f'bidder_{n}', amount)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if ok:
+                    accepted.append(amount)
+
+    threads = [threading.Thread(target=bidder, args=(n,)) for n in range(bidders)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    from boto3.dynamodb.conditions import Key
+    final = listings_table.get_item(Key={'listing_id': listing['listing_id'], 'created_at': listing['created_at']})['Item']
+    bids = bids_table.query(
+        KeyConditionExpression=Key('listing_id').eq(listing['listing_id']),
+        ConsistentRead=True
+    )['Items']
+    bids.sort(key=lambda b: b['timestamp'])
+
+    running_max, out_of_order = Decimal(0), 0
+    for bid in bids:
+        if bid['amount'] <= running_max:
+            out_of_order += 1
+        running_max = max(running_max, bid['amount'])
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    lost = int(final['current_highest_bid'] != max(accepted, default=Decimal(300000)))
+    print(f"{name}:")
+    print(f"  requests={len(latencies)} accepted={len(accepted)} bid_items={len(bids)} bid_count={final.get('bid_count')}")
+    print(f"  latency ms  p50={pct(0.50):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f} mean={statistics.mean(latencies) * 1000:.1f}")
+    print(f"  highest accepted={max(accepted, default=0)} listing current_highest_bid={final['current_highest_bid']}")
+    print(f"  lost highest bid={lost}  bid_count mismatch={int(final.get('bid_count', 0)) != len(accepted)}  out-of-order accepts={out_of_order}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--endpoint', default='http://localhost:8000')
+    parser.add_argument('--bidders', type=int, default=20)
+    parser.add_argument('--bids', type=int, default=25, help='bids per bidder')
+    args = parser.parse_args()
+
+    configure_local_env(args.endpoint)
+    import boto3
+    dynamodb = boto3.resource('dynamodb')
+    create_tables(dynamodb)
+    listings_table = dynamodb.Table(LISTINGS_TABLE)
+    bids_table = dynamodb.Table(BIDS_TABLE)
+
+    run('legacy (get -> put -> update)',
+        lambda lid, cat, uid, amt: legacy_place_bid(listings_table, bids_table, lid, cat, uid, amt),
+        listings_table, bids_table, args.bidders, args.bids)
+
+    place_bid = load_place_bid()
+
+    def transactional(lid, cat, uid, amt):
+        response = place_bid.lambda_handler({'body': json.dumps({
+            'listing_id': lid, 'created_at': cat, 'bidder_id': uid, 'amount': str(amt)
+        })}, None)
+        return response['statusCode'] == 200
+
+    run('transactional place_bid', transactional, listings_table, bids_table, args.bidders, args.bids)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+# Fan-out load test for the live push channel, using the in-process hub that
+# push.publish falls back to without PUSH_ENDPOINT (no AWS needed).
+#
+# T open tabs each watch one of L hot auctions. Bids arrive at R per second
+# for D seconds and are published exactly as place_bid does. The script
+# reports fan-out latency (publish -> subscriber callback) and compares the
+# reads the same tabs would issue by polling every P seconds.
+#
+#   python scripts/load_test_push.py --tabs 2000 --listings 20 --rate 50 --duration 10 --poll 10 --session 30
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'layers', 'common', 'python'))
+os.environ.pop('PUSH_ENDPOINT', None)
+
+import push  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tabs', type=int, default=2000)
+    parser.add_argument('--listings', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=50, help='bids per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds')
+    parser.add_argument('--poll', type=float, default=10, help='polling interval being replaced (seconds)')
+    parser.add_argument('--session', type=float, default=30, help='minutes a tab stays open, for the read comparison')
+    args = parser.parse_args()
+
+    hub = push.get_hub()
+    listing_ids = [f"listing-{i}" for i in range(args.listings)]
+    latencies, received = [], [0]
+    lock = threading.Lock()
+
+    def on_message(payload):
+        delay = time.time() - json.loads(payload)['sent_at']
+        with lock:
+            latencies.append(delay)
+            received[0] += 1
+
+    watchers = {lid: 0 for lid in listing_ids}
+    for _ in range(args.tabs):
+        lid = random.choice(listing_ids)
+        hub.subscribe(push.listing_topic(lid), on_message)
+        watchers[lid] += 1
+
+    published, delivered = 0, 0
+    interval = 1.0 / args.rate
+    start = time.time()
+    next_at = start
+    while time.time() - start < args.duration:
+        lid = random.choice(listing_ids)
+        delivered += push.publish(push.listing_topic(lid), 'bid', {
+            'listing_id': lid, 'amount': 300000 + published * 1000, 'bidder_id': 'load-test'
+        })
+        published += 1
+        next_at += interval
+        time.sleep(max(0, next_at - time.time()))
+    elapsed = time.time() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0
+
+    # Polling: every tab re-reads its listing every P seconds for the whole
+    # session, whether or not anything changed; updates are seen on average
+    # P/2 late. Push: one initial load per tab, then updates arrive by push.
+    poll_reads = args.tabs * (1 + int(args.session * 60 / args.poll))
+    push_reads = args.tabs
+
+    print(f"tabs={args.tabs} listings={args.listings} bids={published} over {elapsed:.1f}s "
+          f"(max watchers on one listing: {max(watchers.values())})")
+    print(f"push:    delivered={delivered} received={received[0]} "
+          f"fan-out latency ms p50={pct(0.50):.2f} p99={pct(0.99):.2f} "
+          f"mean={statistics.mean(latencies) * 1000 if latencies else 0:.2f}")
+    print(f"reads per {args.session:g} min session: polling every {args.poll:g}s={poll_reads}  push={push_reads}  "
+          f"reduction={100 * (1 - push_reads / poll_reads) if poll_reads else 0:.1f}%")
+    print(f"staleness: polling ~{args.poll / 2 * 1000:.0f} ms average vs push {pct(0.50):.2f} ms median")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import boto3
+
+# Copy the legacy user_conversations index (user_id, last_message_timestamp)
+# into the v2 table keyed by (user_id, conversation_id). The legacy table
+# could hold several entries per conversation; the newest one wins. Items
+# already present in v2 (written by send_message since the switch) are newer
+# and are left alone.
+#
+#   python scripts/migrate_user_conversations.py \
+#       --source <project>-user-conversations-<env> --target <project>-user-conversations-v2-<env> \
+#       --counters <project>-counters-<env>
+
+def latest_entries(table):
+    latest = {}
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            key = (item['user_id'], item['conversation_id'])
+            if key not in latest or item['last_message_timestamp'] > latest[key]['last_message_timestamp']:
+                latest[key] = item
+        if 'LastEvaluatedKey' not in response:
+            return latest
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', required=True)
+    parser.add_argument('--target', required=True)
+    parser.add_argument('--counters', help='counters table, to seed the unread badge totals')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb')
+    target = dynamodb.Table(args.target)
+    entries = latest_entries(dynamodb.Table(args.source))
+    print(f"{len(entries)} conversations to migrate")
+    if args.dry_run:
+        return
+
+    copied = skipped = 0
+    unread_totals = {}
+    for item in entries.values():
+        try:
+            target.put_item(Item=item, ConditionExpression='attribute_not_exists(user_id)')
+            copied += 1
+            unread_totals[item['user_id']] = unread_totals.get(item['user_id'], 0) + int(item.get('unread_count', 0))
+        except target.meta.client.exceptions.ConditionalCheckFailedException:
+            skipped += 1
+    print(f"Copied {copied}, skipped {skipped} already in {args.target}")
+
+    # Seed the unread badge counters with the copied unread counts
+    if args.counters:
+        counters = dynamodb.Table(args.counters)
+        for user_id, total in unread_totals.items():
+            if total:
+                counters.update_item(
+                    Key={'counter_id': f"unread#{user_id}"},
+                    UpdateExpression="ADD unread_total :n",
+                    ExpressionAttributeValues={':n': total}
+                )
+        print(f"Seeded unread totals for {sum(1 for t in unread_totals.values() if t)} users")
+
+if __name__ == "__main__":
+    main()
@@ -56,15 +56,15 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
   useEffect(() => {
     const fetchListings = async () => {
       try {
-        let API_URL = "https://esi7gy463qji75j7qf53jhmyku0flswq.lambda-url.us-east-1.on.aws/";
+        let API_URL = "https://esi7gy463qji75j7qf53jhmyku0flswq.lambda-url.us-east-1.on.aws/?limit=100";
         if (ownerId) {
-          API_URL += `?owner_id=${encodeURIComponent(ownerId)}`;
+          API_URL += `&owner_id=${encodeURIComponent(ownerId)}`;
         }
         
         const response = await fetch(API_URL);
         if (!response.ok) throw new Error("Failed to fetch listings");
         const data = await response.json();
-        setListings(data);
+        setListings(data.listings);
       } catch (error) {
         console.error("Error:", error);
         toast.error("Could not load listings");
@@ -194,7 +194,7 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
                           className="text-slate-400 hover:text-red-500 hover:bg-red-50 -mt-1 -mr-2"
                           onClick={(e) => {
                             e.stopPropagation();
-                            toggleFavorite(listing.listing_id);
+                            toggleFavorite(listing.listing_id, listing.created_at);
                           }}
                        >
                           <Heart className={`w-5 h-5 ${favorites.has(listing.listing_id) ? "fill-red-500 text-red-500" : ""}`} />
@@ -272,7 +272,7 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
           onClose={() => setDetailOpen(false)}
           onMessageOwner={onNavigateToMessages}
           isFavorite={favorites.has(selectedListing.listing_id)}
-          onToggleFavorite={() => toggleFavorite(selectedListing.listing_id)}
+          onToggleFavorite={() => toggleFavorite(selectedListing.listing_id, selectedListing.created_at)}
         />
       )}
     </>
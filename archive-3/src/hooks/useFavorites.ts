@@ -23,15 +23,17 @@ export const useFavorites = (userId: string) => {
     }
   }, [userId]);
 
-  const toggleFavorite = async (listingId: string) => {
+  // createdAt (the listing's sort key) lets the backend hydrate favorites in one batch read
+  const toggleFavorite = async (listingId: string, createdAt?: string) => {
     if (!userId) return;
     
     // Optimistic update
+    const favorited = !favorites.has(listingId);
     const newFavorites = new Set(favorites);
-    if (newFavorites.has(listingId)) {
-      newFavorites.delete(listingId);
-    } else {
+    if (favorited) {
       newFavorites.add(listingId);
+    } else {
+      newFavorites.delete(listingId);
     }
     setFavorites(newFavorites);
 
@@ -44,12 +46,21 @@ export const useFavorites = (userId: string) => {
         body: JSON.stringify({
           user_id: userId,
           listing_id: listingId,
+          created_at: createdAt,
+          // Desired state rather than a blind toggle, so double clicks are idempotent
+          favorited,
         }),
       });
       
       const data = await response.json();
-      // If server disagrees, revert (optional, but good practice)
-      // For now, relying on optimistic update being mostly right
+      // If server disagrees, take its state
+      if (typeof data.is_favorited === 'boolean' && data.is_favorited !== favorited) {
+        setFavorites((current) => {
+          const next = new Set(current);
+          if (data.is_favorited) next.add(listingId); else next.delete(listingId);
+          return next;
+        });
+      }
     } catch (error) {
       console.error("Error toggling favorite:", error);
       // Revert on error
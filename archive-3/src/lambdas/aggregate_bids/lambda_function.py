@@ -0,0 +1,177 @@
+import os
+import time
+import boto3
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# Maintains one bid_stats item per auction from the bids table stream:
+#   top_bids          - the TOP_N highest bids (amount, bidder_id, timestamp)
+#   bid_count         - bids seen
+#   bidder_count      - distinct bidders
+#   bids_per_minute   - {"YYYY-MM-DDTHH:MM": n} for the last hour (velocity)
+#   first_bid_at / last_bid_at
+# so get_bids serves a hot auction page from a single small GetItem instead
+# of querying the whole bid partition.
+#
+# Retried batches and late records can deliver a bid again or out of
+# timestamp order, so deduplication lives in the bid markers table, not in
+# the summary: one marker per bid ("bid#<listing>#<timestamp>#<bidder>",
+# expiring after MARKER_TTL_DAYS, well past stream retention) and one per
+# distinct bidder ("bidder#<listing>#<bidder>"). A batch's markers are put
+# with attribute_not_exists in the same transaction as the summary update
+# (ADD the counts, SET the small derived fields under a version check), so
+# a bid is counted exactly once; a marker that already exists cancels the
+# transaction, and the batch is retried without that bid (or bidder).
+
+TOP_N = int(os.environ.get('TOP_N', 10))
+VELOCITY_WINDOW = timedelta(minutes=60)
+MARKER_TTL_DAYS = int(os.environ.get('BID_MARKER_TTL_DAYS', 7))
+# Bid + bidder marker per bid, plus the summary, within the 100-item
+# transaction limit
+BIDS_PER_TRANSACTION = 45
+MAX_ATTEMPTS = 5
+SUMMARY_FIELDS = 'top_bids, bids_per_minute, first_bid_at, last_bid_at, version, bidders, recent_bid_keys'
+
+dynamodb = boto3.resource('dynamodb')
+dynamodb_client = boto3.client('dynamodb')
+deserializer = TypeDeserializer()
+serializer = TypeSerializer()
+
+def typed(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def minute_of(timestamp):
+    return timestamp[:16]
+
+def bid_marker(bid):
+    return f"bid#{bid['listing_id']}#{bid['timestamp']}#{bid['bidder_id']}"
+
+def bidder_marker(listing_id, bidder_id):
+    return f"bidder#{listing_id}#{bidder_id}"
+
+def group_new_bids(records):
+    by_listing = {}
+    for record in records:
+        if record.get('eventName') != 'INSERT':
+            continue
+        image = record['dynamodb'].get('NewImage') or {}
+        bid = {k: deserializer.deserialize(v) for k, v in image.items()}
+        by_listing.setdefault(bid['listing_id'], []).append(bid)
+    for bids in by_listing.values():
+        bids.sort(key=lambda b: b['timestamp'])
+    return by_listing
+
+def summary_update(listing_id, stats, bids, new_bidders):
+    """Update of the summary item: counts by ADD, derived fields by SET under the version read."""
+    top_bids = list(stats.get('top_bids', []))
+    top_bids += [{'amount': b['amount'], 'bidder_id': b['bidder_id'], 'timestamp': b['timestamp']} for b in bids]
+    top_bids.sort(key=lambda b: b['amount'], reverse=True)
+
+    first_bid_at = min([b['timestamp'] for b in bids] + ([stats['first_bid_at']] if stats.get('first_bid_at') else []))
+    last_bid_at = max([b['timestamp'] for b in bids] + [stats.get('last_bid_at', '')])
+    cutoff = minute_of((datetime.fromisoformat(last_bid_at) - VELOCITY_WINDOW).isoformat())
+    per_minute = {m: n for m, n in stats.get('bids_per_minute', {}).items() if m > cutoff}
+    for bid in bids:
+        minute = minute_of(bid['timestamp'])
+        if minute > cutoff:
+            per_minute[minute] = per_minute.get(minute, 0) + 1
+
+    update = (
+        "SET top_bids = :top, bids_per_minute = :pm, first_bid_at = :first, last_bid_at = :last, "
+        "version = :next ADD bid_count :bids, bidder_count :bidders"
+    )
+    if 'bidders' in stats or 'recent_bid_keys' in stats:
+        # Pre-marker items (see migrate_legacy)
+        update += " REMOVE bidders, recent_bid_keys"
+    return {
+        'Update': {
+            'TableName': os.environ['BID_STATS_TABLE'],
+            'Key': typed({'listing_id': listing_id}),
+            'UpdateExpression': update,
+            'ConditionExpression': "attribute_not_exists(listing_id) OR version = :v",
+            'ExpressionAttributeValues': typed({
+                ':top': top_bids[:TOP_N],
+                ':pm': per_minute,
+                ':first': first_bid_at,
+                ':last': last_bid_at,
+                ':bids': len(bids),
+                ':bidders': len(new_bidders),
+                ':v': stats.get('version', 0),
+                ':next': stats.get('version', 0) + 1
+            })
+        }
+    }
+
+def marker_put(marker_id, expires_at=None):
+    item = {'marker_id': marker_id}
+    if expires_at:
+        item['expires_at'] = expires_at
+    return {
+        'Put': {
+            'TableName': os.environ['BID_MARKERS_TABLE'],
+            'Item': typed(item),
+            'ConditionExpression': "attribute_not_exists(marker_id)"
+        }
+    }
+
+def migrate_legacy(stats):
+    """
+    Summary items written before markers hold the bidder set and recent bid
+    keys inline: give those bidders markers, so they are not counted again,
+    and treat the recent keys as seen. The next update removes both fields.
+    """
+    bidders = stats.get('bidders') or set()
+    if bidders:
+        markers = dynamodb.Table(os.environ['BID_MARKERS_TABLE'])
+        with markers.batch_writer() as batch:
+            for bidder_id in bidders:
+                batch.put_item(Item={'marker_id': bidder_marker(stats['listing_id'], bidder_id)})
+    return set(stats.get('recent_bid_keys') or [])
+
+def apply_chunk(table, listing_id, bids):
+    expires_at = int(time.time()) + MARKER_TTL_DAYS * 86400
+    counted_bidders = set()
+    for _ in range(MAX_ATTEMPTS + 2 * len(bids)):
+        stats = table.get_item(
+            Key={'listing_id': listing_id},
+            ProjectionExpression=SUMMARY_FIELDS,
+            ConsistentRead=True
+        ).get('Item') or {}
+        if stats.get('bidders') or stats.get('recent_bid_keys'):
+            seen = migrate_legacy({**stats, 'listing_id': listing_id})
+            bids = [b for b in bids if f"{b['timestamp']}#{b['bidder_id']}" not in seen]
+        if not bids:
+            return
+
+        new_bidders = sorted({b['bidder_id'] for b in bids} - counted_bidders)
+        transaction = [marker_put(bid_marker(b), expires_at) for b in bids]
+        transaction += [marker_put(bidder_marker(listing_id, bidder_id)) for bidder_id in new_bidders]
+        transaction.append(summary_update(listing_id, stats, bids, new_bidders))
+        try:
+            dynamodb_client.transact_write_items(TransactItems=transaction)
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            failed = {i for i, r in enumerate(reasons) if r.get('Code') == 'ConditionalCheckFailed'}
+            # Items are the bid markers, then the bidder markers, then the
+            # summary. Already counted bids and bidders drop out; a summary
+            # version conflict (or a transient failure) re-reads and retries
+            counted_bidders |= {b for j, b in enumerate(new_bidders) if len(bids) + j in failed}
+            bids = [b for i, b in enumerate(bids) if i not in failed]
+    raise RuntimeError(f"Could not update bid stats for {listing_id}")
+
+def apply_bids(table, listing_id, bids):
+    # A transaction may touch each marker once
+    bids = list({bid_marker(b): b for b in bids}.values())
+    for i in range(0, len(bids), BIDS_PER_TRANSACTION):
+        apply_chunk(table, listing_id, bids[i:i + BIDS_PER_TRANSACTION])
+
+def lambda_handler(event, context):
+    table = dynamodb.Table(os.environ['BID_STATS_TABLE'])
+    by_listing = group_new_bids(event.get('Records', []))
+    for listing_id, bids in by_listing.items():
+        apply_bids(table, listing_id, bids)
+    return {'listings': len(by_listing), 'processed': len(event.get('Records', []))}
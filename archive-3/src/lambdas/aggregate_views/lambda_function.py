@@ -0,0 +1,230 @@
+import json
+import os
+import time
+import boto3
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+
+# Provided by the common layer
+import hll
+from rollups import Rollup
+
+# Folds queued page views (from track_view) into the listing counters.
+# A batch of up to 1000 views becomes, per listing, one update_item with an
+# ADD view_count delta instead of one write per view. The queue's batching
+# window and this consumer's capped concurrency bound the write rate on any
+# single listing row, however hot it is.
+#
+# Unique viewers are HyperLogLog sketches in the view sketches table, one per
+# (listing_id, period): "all" plus "day#YYYY-MM-DD". A batch's viewers are
+# merged into each sketch with one versioned read-modify-write, skipped when
+# no register changes (returning viewers), and the listing's
+# unique_view_count is set to the "all" estimate. No per-viewer items.
+# The listing also stores the sketch version its count came from and only
+# takes a count from a newer version, so a consumer that merged earlier but
+# writes later cannot put back a lower count.
+#
+# Views also feed the hourly/daily analytics rollups (listing and
+# neighborhood series), flushed once per batch.
+
+ALL_TIME = 'all'
+DAILY_RETENTION_DAYS = int(os.environ.get('DAILY_SKETCH_RETENTION_DAYS', 400))
+MAX_ATTEMPTS = 5
+
+dynamodb = boto3.resource('dynamodb')
+
+def day_period(viewed_at):
+    return f"day#{viewed_at[:10]}"
+
+def group_views(messages):
+    """{listing_id: {'views', 'viewers', 'viewed_at', 'message_ids'}} for a batch of view messages."""
+    groups = {}
+    for message in messages:
+        group = groups.setdefault(message['listing_id'], {
+            'views': 0, 'viewers': {}, 'viewed_at': [], 'message_ids': []
+        })
+        group['views'] += 1
+        group['viewed_at'].append(message['viewed_at'])
+        if message.get('viewer_id'):
+            group['viewers'].setdefault(day_period(message['viewed_at']), set()).add(message['viewer_id'])
+        if message.get('message_id'):
+            group['message_ids'].append(message['message_id'])
+    return groups
+
+def batch_sketches(viewers_by_day):
+    """{period: sketch} for one listing's viewers in this batch."""
+    sketches = {}
+    for period, viewers in viewers_by_day.items():
+        sketch = hll.new()
+        for viewer_id in viewers:
+            hll.add(sketch, viewer_id)
+        sketches[period] = sketch
+    sketches[ALL_TIME] = hll.merge(*sketches.values())
+    return sketches
+
+def merge_sketch(sketch_table, listing_id, period, sketch):
+    """Merge into the stored sketch; returns (unique estimate, sketch version)."""
+    for _ in range(MAX_ATTEMPTS):
+        item = sketch_table.get_item(
+            Key={'listing_id': listing_id, 'period': period}, ConsistentRead=True
+        ).get('Item') or {}
+        current = hll.from_bytes(item.get('sketch'))
+        merged = hll.merge(current, sketch)
+        if item and merged == current:
+            return int(item['unique_viewers']), int(item.get('version', 0))
+
+        estimate = hll.count(merged)
+        updated = {
+            'listing_id': listing_id,
+            'period': period,
+            'sketch': hll.to_bytes(merged),
+            'unique_viewers': estimate,
+            'version': item.get('version', 0) + 1
+        }
+        if period != ALL_TIME:
+            updated['expires_at'] = int(time.time()) + DAILY_RETENTION_DAYS * 86400
+        try:
+            sketch_table.put_item(
+                Item=updated,
+                ConditionExpression="attribute_not_exists(listing_id) OR version = :v",
+                ExpressionAttributeValues={':v': item.get('version', 0)}
+            )
+            return estimate, updated['version']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    raise RuntimeError(f"Could not merge view sketch {period} for {listing_id}")
+
+def resolve_listing(listings_table, listing_id):
+    """The listing's key and neighborhood (for the rollups), or None if it doesn't exist."""
+    resp = listings_table.query(
+        KeyConditionExpression=Key('listing_id').eq(listing_id),
+        ProjectionExpression='created_at, neighborhood',
+        Limit=1
+    )
+    return resp['Items'][0] if resp['Items'] else None
+
+def update_listing(listings_table, listing_id, created_at, views=0, unique=None):
+    """ADD the views; unique is (estimate, sketch version) of the "all" sketch, or None."""
+    key = {'listing_id': listing_id, 'created_at': created_at}
+    try:
+        if views:
+            listings_table.update_item(
+                Key=key,
+                UpdateExpression="ADD view_count :views",
+                ConditionExpression="attribute_exists(listing_id)",
+                ExpressionAttributeValues={':views': views}
+            )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"Dropping views for deleted listing {listing_id}")
+        return
+
+    if unique is None:
+        return
+    estimate, version = unique
+    try:
+        listings_table.update_item(
+            Key=key,
+            UpdateExpression="SET unique_view_count = :unique, unique_view_version = :version",
+            ConditionExpression=(
+                "attribute_exists(listing_id) AND "
+                "(attribute_not_exists(unique_view_version) OR unique_view_version < :version)"
+            ),
+            ExpressionAttributeValues={':unique': estimate, ':version': version}
+        )
+    except ClientError as e:
+        # Deleted, or already holds the count of this or a newer sketch
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+def apply_views(listings_table, sketch_table, rollup, listing_id, group):
+    listing = resolve_listing(listings_table, listing_id)
+    if not listing:
+        print(f"Dropping {group['views']} views for unknown listing {listing_id}")
+        return
+    created_at = listing['created_at']
+
+    unique = None
+    if group['viewers']:
+        for period, sketch in batch_sketches(group['viewers']).items():
+            merged = merge_sketch(sketch_table, listing_id, period, sketch)
+            if period == ALL_TIME:
+                unique = merged
+    update_listing(listings_table, listing_id, created_at, group['views'], unique)
+
+    for viewed_at in group['viewed_at']:
+        rollup.add(listing_id, listing.get('neighborhood'), viewed_at, 'views')
+
+def backfill(listings_table, sketch_table):
+    """Seed the sketches from the legacy per-viewer views table (one-off)."""
+    views_table = dynamodb.Table(os.environ['LEGACY_VIEWS_TABLE_NAME'])
+    viewers = {}
+    kwargs = {}
+    while True:
+        response = views_table.scan(**kwargs)
+        for item in response.get('Items', []):
+            # anon_<timestamp> ids were one per view, not per visitor
+            if item['viewer_id'].startswith('anon_') or not item.get('timestamp'):
+                continue
+            viewers.setdefault(item['listing_id'], {}).setdefault(
+                day_period(item['timestamp']), set()
+            ).add(item['viewer_id'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    for listing_id, by_day in viewers.items():
+        listing = resolve_listing(listings_table, listing_id)
+        unique = None
+        for period, sketch in batch_sketches(by_day).items():
+            merged = merge_sketch(sketch_table, listing_id, period, sketch)
+            if period == ALL_TIME:
+                unique = merged
+        if listing:
+            update_listing(listings_table, listing_id, listing['created_at'], unique=unique)
+    return len(viewers)
+
+def lambda_handler(event, context):
+    listings_table = dynamodb.Table(os.environ['LISTINGS_TABLE_NAME'])
+    sketch_table = dynamodb.Table(os.environ['VIEW_SKETCHES_TABLE'])
+    stats_table = dynamodb.Table(os.environ['LISTING_STATS_TABLE'])
+    rollup = Rollup()
+
+    if event.get('backfill'):
+        return {'listings': backfill(listings_table, sketch_table)}
+
+    # Direct invoke (local stand-in / fire-and-forget fallback)
+    if 'Records' not in event:
+        for listing_id, group in group_views(event.get('views', [])).items():
+            apply_views(listings_table, sketch_table, rollup, listing_id, group)
+        try:
+            rollup.flush(stats_table)
+        except Exception as e:
+            print(f"Rollup flush failed: {e}")
+        return {'processed': len(event.get('views', []))}
+
+    messages = []
+    for record in event['Records']:
+        message = json.loads(record['body'])
+        message['message_id'] = record['messageId']
+        messages.append(message)
+
+    # SQS batch: a failing listing only retries its own messages (sketch
+    # merges are idempotent, so retried viewers are never counted twice)
+    failures = []
+    for listing_id, group in group_views(messages).items():
+        try:
+            apply_views(listings_table, sketch_table, rollup, listing_id, group)
+        except Exception as e:
+            print(f"View aggregation failed for {listing_id}: {e}")
+            failures += [{'itemIdentifier': mid} for mid in group['message_ids']]
+
+    # Rollups are best effort: the counters above are already applied
+    try:
+        rollup.flush(stats_table)
+    except Exception as e:
+        print(f"Rollup flush failed: {e}")
+
+    return {'batchItemFailures': failures}
@@ -0,0 +1,184 @@
+import json
+import os
+import time
+import boto3
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer
+
+# Provided by the common layer
+from message_archive import segment_key, encode_segment, marker_key, parse_segment_key, SUFFIX
+
+# Moves expired chat messages to S3. send_message stamps every message with
+# expires_at (MESSAGE_HOT_DAYS after it is sent); the conversations table TTL
+# deletes it, and the resulting stream REMOVE record (filtered to TTL deletes
+# by the event source mapping) lands here. Each batch becomes one compressed
+# segment per conversation (see message_archive), and the conversation's
+# archive marker is advanced so get_messages knows to look in S3.
+#
+# The messages are already gone from the table, so a batch must not be lost:
+# the stream mapping bisects failing batches, retries a bounded number of
+# times and then sends the batch's stream coordinates to the failures queue.
+# That queue invokes this function again (replay): it re-reads the records
+# from the stream while they are retained (24h) and archives them; a record
+# that cannot be decoded is logged in full instead of blocking its batch.
+# Replays that keep failing end up in the queue's DLQ with the coordinates.
+#
+# {"backfill": true} stamps expires_at on messages written before tiering;
+# {"backfill_markers": true} sets the archive markers for segments written
+# before markers existed.
+
+HOT_DAYS = int(os.environ.get('MESSAGE_HOT_DAYS', 90))
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'archive/messages')
+ARCHIVED_FIELDS = ['conversation_id', 'timestamp', 'sender_id', 'message', 'listing_id', 'listing_address', 'listing_neighborhood']
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
+streams = boto3.client('dynamodbstreams')
+deserializer = TypeDeserializer()
+
+def expiry_for(timestamp):
+    sent = datetime.fromisoformat(timestamp.rstrip('Z'))
+    return int(max(time.time(), (sent + timedelta(days=HOT_DAYS) - datetime(1970, 1, 1)).total_seconds()))
+
+def is_ttl_remove(record):
+    identity = record.get('userIdentity') or {}
+    return record.get('eventName') == 'REMOVE' and identity.get('principalId') == 'dynamodb.amazonaws.com'
+
+def expired_messages(records, skip_invalid=False):
+    by_conversation = {}
+    for record in records:
+        if record.get('eventName') != 'REMOVE':
+            continue
+        try:
+            image = record['dynamodb'].get('OldImage') or {}
+            message = {k: deserializer.deserialize(v) for k, v in image.items() if k in ARCHIVED_FIELDS}
+            if 'conversation_id' not in message or 'timestamp' not in message:
+                raise ValueError('missing conversation_id or timestamp')
+        except Exception as e:
+            if not skip_invalid:
+                raise
+            print(f"Unarchivable record {json.dumps(record, default=str)}: {e}")
+            continue
+        by_conversation.setdefault(message['conversation_id'], []).append(message)
+    for messages in by_conversation.values():
+        messages.sort(key=lambda m: m['timestamp'])
+    return by_conversation
+
+def backfill(table):
+    stamped = 0
+    scan = {'ProjectionExpression': 'conversation_id, #ts, expires_at', 'ExpressionAttributeNames': {'#ts': 'timestamp'}}
+    while True:
+        resp = table.scan(**scan)
+        for item in resp['Items']:
+            if 'expires_at' in item:
+                continue
+            try:
+                table.update_item(
+                    Key={'conversation_id': item['conversation_id'], 'timestamp': item['timestamp']},
+                    UpdateExpression="SET expires_at = :exp",
+                    ConditionExpression="attribute_exists(conversation_id)",
+                    ExpressionAttributeValues={':exp': expiry_for(item['timestamp'])}
+                )
+                stamped += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        if 'LastEvaluatedKey' not in resp:
+            return stamped
+        scan['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def mark_archived(counter_table, conversation_id, until):
+    try:
+        counter_table.update_item(
+            Key=marker_key(conversation_id),
+            UpdateExpression="SET archived_until = :ts",
+            ConditionExpression="attribute_not_exists(archived_until) OR archived_until < :ts",
+            ExpressionAttributeValues={':ts': until}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+def archive(by_conversation):
+    bucket = os.environ['ARCHIVE_BUCKET']
+    counter_table = dynamodb.Table(os.environ['COUNTER_TABLE_NAME'])
+    for conversation_id, messages in by_conversation.items():
+        s3.put_object(
+            Bucket=bucket,
+            Key=segment_key(conversation_id, messages, ARCHIVE_PREFIX),
+            Body=encode_segment(messages),
+            ContentType='application/x-ndjson',
+            ContentEncoding='gzip'
+        )
+        mark_archived(counter_table, conversation_id, messages[-1]['timestamp'])
+    return sum(len(m) for m in by_conversation.values())
+
+def backfill_markers():
+    counter_table = dynamodb.Table(os.environ['COUNTER_TABLE_NAME'])
+    newest = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=os.environ['ARCHIVE_BUCKET'], Prefix=f"{ARCHIVE_PREFIX}/"):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].endswith(SUFFIX):
+                continue
+            conversation_id = obj['Key'][len(ARCHIVE_PREFIX) + 1:].split('/', 1)[0]
+            last = parse_segment_key(obj['Key'])[1]
+            newest[conversation_id] = max(newest.get(conversation_id, ''), last)
+    for conversation_id, until in newest.items():
+        mark_archived(counter_table, conversation_id, until)
+    return len(newest)
+
+def stream_records(batch_info):
+    """The records of a failed stream batch (from its on-failure coordinates)."""
+    start, end = int(batch_info['startSequenceNumber']), int(batch_info['endSequenceNumber'])
+    iterator = streams.get_shard_iterator(
+        StreamArn=batch_info['streamArn'],
+        ShardId=batch_info['shardId'],
+        ShardIteratorType='AT_SEQUENCE_NUMBER',
+        SequenceNumber=batch_info['startSequenceNumber']
+    )['ShardIterator']
+    records = []
+    while iterator:
+        resp = streams.get_records(ShardIterator=iterator, Limit=1000)
+        for record in resp.get('Records', []):
+            if int(record['dynamodb']['SequenceNumber']) > end:
+                return records
+            if int(record['dynamodb']['SequenceNumber']) >= start:
+                records.append(record)
+        if not resp.get('Records'):
+            # Caught up with the shard without reaching the end of the batch
+            return records
+        iterator = resp.get('NextShardIterator')
+    return records
+
+def replay(sqs_records):
+    failures = []
+    for message in sqs_records:
+        try:
+            batch_info = json.loads(message['body'])['DDBStreamBatchInfo']
+            records = [r for r in stream_records(batch_info) if is_ttl_remove(r)]
+            archived = archive(expired_messages(records, skip_invalid=True))
+            print(f"Replayed {archived} messages from {batch_info['shardId']}")
+        except Exception as e:
+            print(f"Replay failed for {message['messageId']}: {e}")
+            failures.append({'itemIdentifier': message['messageId']})
+    return {'batchItemFailures': failures}
+
+def lambda_handler(event, context):
+    if event.get('backfill'):
+        stamped = backfill(dynamodb.Table(os.environ['CONVERSATIONS_TABLE']))
+        print(f"Stamped expires_at on {stamped} messages")
+        return {'stamped': stamped}
+
+    if event.get('backfill_markers'):
+        return {'conversations': backfill_markers()}
+
+    records = event.get('Records', [])
+    if records and records[0].get('eventSource') == 'aws:sqs':
+        return replay(records)
+
+    by_conversation = expired_messages(records)
+    archived = archive(by_conversation)
+    print(f"Archived {archived} messages from {len(by_conversation)} conversations")
+    return {'archived': archived, 'conversations': len(by_conversation)}
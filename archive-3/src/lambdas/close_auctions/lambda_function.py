@@ -0,0 +1,185 @@
+import os
+import boto3
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key, Attr
+
+# Provided by the common layer
+from auctions import auction_attributes, bucket_for, buckets_between
+from ddb_json import dumps
+
+# Scheduled auction sweeper. Open auctions sit in the sparse listings
+# "auction_close_index" (hour bucket -> close time), so each run queries only
+# the buckets between the last swept one and now: cost follows the number of
+# auctions ending, not the size of the listings table.
+#
+# Each expired auction is closed with a conditional update (still open, end
+# time passed, bid count unchanged) that records the outcome and drops the
+# listing out of the index; an "Auction Closed" event is then published to
+# EventBridge for notifications.
+
+SWEEPER_ID = 'auction_sweeper'
+INDEX_NAME = 'auction_close_index'
+BATCH_SIZE = int(os.environ.get('BATCH_SIZE', 25))
+LOOKBACK_HOURS = int(os.environ.get('LOOKBACK_HOURS', 24))
+MAX_BUCKETS_PER_SWEEP = int(os.environ.get('MAX_BUCKETS_PER_SWEEP', 168))
+EVENT_SOURCE = 'barcelona-housing.auctions'
+MIN_REMAINING_MS = 10000
+
+dynamodb = boto3.resource('dynamodb')
+events = boto3.client('events')
+
+def load_watermark(counter_table, now):
+    item = counter_table.get_item(Key={'counter_id': SWEEPER_ID}, ConsistentRead=True).get('Item')
+    if item and item.get('swept_through'):
+        return item['swept_through']
+    return bucket_for(now - timedelta(hours=LOOKBACK_HOURS))
+
+def save_watermark(counter_table, bucket, closed):
+    counter_table.update_item(
+        Key={'counter_id': SWEEPER_ID},
+        UpdateExpression="SET swept_through = :b, swept_at = :now ADD closed_count :n",
+        ExpressionAttributeValues={':b': bucket, ':now': datetime.utcnow().isoformat(), ':n': closed}
+    )
+
+def close_auction(table, listing, now_iso):
+    """
+    Close one auction. Returns the close event detail, or None if it was
+    already closed or its end time moved. The index is eventually consistent,
+    so a stale bid count fails the condition and the item is re-read.
+    """
+    key = {'listing_id': listing['listing_id'], 'created_at': listing['created_at']}
+    for _ in range(3):
+        bid_count = int(listing.get('bid_count') or 0)
+        sold = bid_count > 0 and listing.get('highest_bidder_id') is not None
+        values = {
+            ':open': 'open', ':closed': 'closed', ':now': now_iso,
+            ':outcome': 'sold' if sold else 'unsold', ':bids': bid_count
+        }
+        update = "SET auction_status = :closed, auction_outcome = :outcome, closed_at = :now"
+        if sold:
+            update += ", winner_id = :winner, winning_bid = :bid"
+            values[':winner'] = listing['highest_bidder_id']
+            values[':bid'] = listing['current_highest_bid']
+
+        try:
+            table.update_item(
+                Key=key,
+                UpdateExpression=update + " REMOVE auction_close_bucket, auction_close_at",
+                ConditionExpression="auction_status = :open AND auction_close_at <= :now AND "
+                                    "(attribute_not_exists(bid_count) OR bid_count = :bids)",
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            listing = table.get_item(Key=key, ConsistentRead=True).get('Item')
+            if not listing or listing.get('auction_status') != 'open' or listing.get('auction_close_at', '') > now_iso:
+                return None
+            continue
+
+        return {
+            'listing_id': listing['listing_id'],
+            'created_at': listing['created_at'],
+            'owner_id': listing.get('owner_id'),
+            'address': listing.get('address'),
+            'outcome': values[':outcome'],
+            'winner_id': values.get(':winner'),
+            'winning_bid': values.get(':bid'),
+            'bid_count': bid_count,
+            'auction_end_time': listing.get('auction_end_time'),
+            'closed_at': now_iso
+        }
+
+    print(f"Gave up closing {key} after repeated bid races")
+    return None
+
+def publish_events(details):
+    bus = os.environ.get('EVENT_BUS_NAME', 'default')
+    for i in range(0, len(details), 10):
+        entries = [{
+            'Source': EVENT_SOURCE,
+            'DetailType': 'Auction Closed',
+            'Detail': dumps(detail),
+            'EventBusName': bus
+        } for detail in details[i:i + 10]]
+        resp = events.put_events(Entries=entries)
+        if resp.get('FailedEntryCount'):
+            failed = [d['listing_id'] for d, r in zip(details[i:i + 10], resp['Entries']) if r.get('ErrorCode')]
+            print(f"Failed to publish close events for {failed}")
+
+def sweep_bucket(table, bucket, now_iso):
+    """Close every auction in one bucket whose end time has passed."""
+    closed = 0
+    query = {
+        'IndexName': INDEX_NAME,
+        'KeyConditionExpression': Key('auction_close_bucket').eq(bucket) & Key('auction_close_at').lte(now_iso),
+        'Limit': BATCH_SIZE
+    }
+    while True:
+        resp = table.query(**query)
+        details = [d for d in (close_auction(table, item, now_iso) for item in resp['Items']) if d]
+        if details:
+            publish_events(details)
+            closed += len(details)
+        if 'LastEvaluatedKey' not in resp:
+            return closed
+        query['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def backfill(table):
+    """Add close-index attributes to auctions created before the index existed."""
+    added = 0
+    scan = {
+        'FilterExpression': Attr('sale_type').eq('auction') & Attr('auction_status').not_exists(),
+        'ProjectionExpression': 'listing_id, created_at, sale_type, auction_end_time'
+    }
+    while True:
+        resp = table.scan(**scan)
+        for item in resp['Items']:
+            attrs = auction_attributes(item['sale_type'], item.get('auction_end_time'))
+            if not attrs:
+                continue
+            try:
+                table.update_item(
+                    Key={'listing_id': item['listing_id'], 'created_at': item['created_at']},
+                    UpdateExpression="SET auction_status = :s, auction_close_bucket = :b, auction_close_at = :t",
+                    ConditionExpression="attribute_not_exists(auction_status)",
+                    ExpressionAttributeValues={
+                        ':s': attrs['auction_status'], ':b': attrs['auction_close_bucket'], ':t': attrs['auction_close_at']
+                    }
+                )
+                added += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        if 'LastEvaluatedKey' not in resp:
+            return added
+        scan['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def lambda_handler(event, context):
+    table = dynamodb.Table(os.environ['LISTINGS_TABLE_NAME'])
+    counter_table = dynamodb.Table(os.environ['COUNTER_TABLE_NAME'])
+
+    if event.get('backfill'):
+        added = backfill(table)
+        print(f"Backfilled close index for {added} auctions")
+        return {'backfilled': added}
+
+    now = datetime.utcnow()
+    now_iso = now.isoformat()
+    buckets = buckets_between(load_watermark(counter_table, now), bucket_for(now))[:MAX_BUCKETS_PER_SWEEP]
+
+    closed, swept_through = 0, None
+    for bucket in buckets:
+        if context and context.get_remaining_time_in_millis() < MIN_REMAINING_MS:
+            break
+        closed += sweep_bucket(table, bucket, now_iso)
+        swept_through = bucket
+
+    # The current bucket still holds auctions ending later this hour, so the
+    # next run starts from (and re-reads) the last bucket swept here.
+    if swept_through:
+        save_watermark(counter_table, swept_through, closed)
+
+    print(f"Swept {len(buckets)} buckets up to {swept_through}: closed {closed} auctions")
+    return {'closed': closed, 'buckets': len(buckets), 'swept_through': swept_through}
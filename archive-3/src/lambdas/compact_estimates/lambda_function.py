@@ -0,0 +1,49 @@
+import os
+import boto3
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer
+
+# Folds estimates expired by the estimates table TTL into the long-term
+# monthly aggregate, one item per (neighborhood, month):
+#   estimates        distinct (coalesced) estimates
+#   requests         valuation requests they answered (sum of hit_count)
+#   price_sum        sum of estimated prices
+#   sqm_sum          sum of surfaces (avg price/m2 = price_sum / sqm_sum)
+# A batch is accumulated in memory and written as one ADD per aggregate
+# item. get_history ?view=monthly reads them.
+
+dynamodb = boto3.resource('dynamodb')
+deserializer = TypeDeserializer()
+
+def deserialize(image):
+    return {k: deserializer.deserialize(v) for k, v in image.items()} if image else {}
+
+def accumulate(records):
+    totals = {}
+    for record in records:
+        if record.get('eventName') != 'REMOVE':
+            continue
+        estimate = deserialize(record['dynamodb'].get('OldImage'))
+        if not estimate.get('timestamp') or estimate.get('estimated_price') is None:
+            continue
+        key = (estimate.get('neighborhood') or 'Unknown', estimate['timestamp'][:7])
+        sums = totals.setdefault(key, {'estimates': 0, 'requests': 0, 'price_sum': 0, 'sqm_sum': Decimal(0)})
+        sums['estimates'] += 1
+        sums['requests'] += int(estimate.get('hit_count', 1))
+        sums['price_sum'] += int(estimate['estimated_price'])
+        sums['sqm_sum'] += Decimal(str((estimate.get('input_features') or {}).get('sqm', 0)))
+    return totals
+
+def lambda_handler(event, context):
+    table = dynamodb.Table(os.environ['AGGREGATES_TABLE'])
+    totals = accumulate(event.get('Records', []))
+    for (neighborhood, month), sums in totals.items():
+        table.update_item(
+            Key={'neighborhood': neighborhood, 'month': month},
+            UpdateExpression="ADD estimates :e, requests :r, price_sum :p, sqm_sum :s",
+            ExpressionAttributeValues={
+                ':e': sums['estimates'], ':r': sums['requests'],
+                ':p': sums['price_sum'], ':s': sums['sqm_sum']
+            }
+        )
+    return {'processed': len(event.get('Records', [])), 'aggregates': len(totals)}
@@ -3,7 +3,53 @@ import os
 import boto3
 import uuid
 import datetime
-from decimal import Decimal
+
+# Provided by the common layer
+from geo import geo_attributes
+from auctions import auction_attributes
+from ddb_json import to_dynamo
+
+def build_valuation_request(body, listing_id, created_at):
+    """Message consumed by the value_listing worker."""
+    return {
+        'listing_id': listing_id,
+        'created_at': created_at,
+        'asking_price': float(body['price']),
+        # Forms usually omit coordinates; the worker stores the geocoded ones
+        'needs_geocode': not geo_attributes(body.get('coordinates')),
+        # Payload for the inference lambda (it expects a similar structure)
+        'inference_payload': {
+            'address': body['address'],
+            'neighborhood': body['neighborhood'],
+            'sqm': body['features']['sqm'],
+            'bedrooms': body['features']['bedrooms'],
+            'bathrooms': body['features']['bathrooms'],
+            # Pass through other features if available in UI
+            'has_elevator': body['features'].get('has_elevator', False),
+            'has_pool': body['features'].get('has_pool', False),
+            'has_ac': body['features'].get('has_ac', False),
+            'has_terrace': body['features'].get('has_terrace', False),
+        }
+    }
+
+def enqueue_valuation(message):
+    """
+    Hand the valuation off so the seller never waits on inference.
+    Uses the SQS queue in AWS; without one (local/dev) it falls back to a
+    fire-and-forget invoke of the worker function.
+    """
+    queue_url = os.environ.get('VALUATION_QUEUE_URL')
+    if queue_url:
+        boto3.client('sqs').send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
+        return
+
+    worker_func = os.environ.get('VALUATION_FUNC')
+    if worker_func:
+        boto3.client('lambda').invoke(
+            FunctionName=worker_func,
+            InvocationType='Event',
+            Payload=json.dumps(message)
+        )
 
 def lambda_handler(event, context):
     # Handle OPTIONS (CORS preflight)
@@ -36,115 +82,83 @@ def lambda_handler(event, context):
                     'body': json.dumps({'error': f"Missing required field: {field}"})
                 }
 
-        # --- 1. Get AI Valuation ---
-        ai_price = None
-        valuation_status = "Unknown"
-        
-        try:
-            lambda_client = boto3.client('lambda')
-            inference_func = os.environ.get('INFERENCE_FUNC')
-            
-            if inference_func:
-                # Prepare payload for inference lambda (it expects a similar structure)
-                inference_payload = {
-                    'address': body['address'],
-                    'neighborhood': body['neighborhood'],
-                    'sqm': body['features']['sqm'],
-                    'bedrooms': body['features']['bedrooms'],
-                    'bathrooms': body['features']['bathrooms'],
-                    # Pass through other features if available in UI
-                    'has_elevator': body['features'].get('has_elevator', False),
-                    'has_pool': body['features'].get('has_pool', False),
-                    'has_ac': body['features'].get('has_ac', False),
-                    'has_terrace': body['features'].get('has_terrace', False),
-                }
-                
-                response = lambda_client.invoke(
-                    FunctionName=inference_func,
-                    InvocationType='RequestResponse',
-                    Payload=json.dumps(inference_payload)
-                )
-                
-                inference_result = json.loads(response['Payload'].read())
-                if 'body' in inference_result:
-                    body_content = json.loads(inference_result['body'])
-                    ai_price = body_content.get('estimated_price')
-                    
-                    if ai_price:
-                        asking_price = float(body['price'])
-                        diff_pct = ((asking_price - ai_price) / ai_price) * 100
-                        
-                        if diff_pct > 10:
-                            valuation_status = "Overpriced"
-                        elif diff_pct < -10:
-                            valuation_status = "Good Deal"
-                        else:
-                            valuation_status = "Fair Price"
-                            
-        except Exception as e:
-            print(f"Inference failed: {e}")
-
-        # --- 2. Prepare Item for DynamoDB ---
+        # --- 1. Prepare Item for DynamoDB ---
         listing_id = str(uuid.uuid4())
         timestamp = datetime.datetime.utcnow().isoformat()
         
-        # Helper to convert floats to Decimal
-        def float_to_decimal(obj):
-            if isinstance(obj, float):
-                return Decimal(str(obj))
-            if isinstance(obj, dict):
-                return {k: float_to_decimal(v) for k, v in obj.items()}
-            if isinstance(obj, list):
-                return [float_to_decimal(v) for v in obj]
-            return obj
-
         item = {
             'listing_id': listing_id,
             'owner_id': body.get('owner_id', 'anonymous'),  # Capture owner_id
             'created_at': timestamp,
             'address': body['address'],
             'neighborhood': body['neighborhood'],
-            'price': float_to_decimal(body['price']),
-            'features': float_to_decimal(body['features']),
+            'price': to_dynamo(body['price']),
+            'features': to_dynamo(body['features']),
             'contact': body['contact'],
             'description': body.get('description', ''),
-            'coordinates': float_to_decimal(body.get('coordinates', {})),
+            'coordinates': to_dynamo(body.get('coordinates', {})),
             # Auction Fields
             'sale_type': body.get('sale_type', 'fixed'), # fixed or auction
             'auction_end_time': body.get('auction_end_time'),
-            'starting_bid': float_to_decimal(body.get('starting_bid', 0)) if body.get('sale_type') == 'auction' else None,
-            'current_highest_bid': float_to_decimal(body.get('starting_bid', 0)) if body.get('sale_type') == 'auction' else None,
+            'starting_bid': to_dynamo(body.get('starting_bid', 0)) if body.get('sale_type') == 'auction' else None,
+            'current_highest_bid': to_dynamo(body.get('starting_bid', 0)) if body.get('sale_type') == 'auction' else None,
             'bid_count': 0 if body.get('sale_type') == 'auction' else None,
-            # New AI Fields
+            # New AI Fields (filled in asynchronously by the value_listing worker)
             'ai_valuation': {
-                'estimated_price': float_to_decimal(ai_price) if ai_price else None,
-                'status': valuation_status,
-                'diff_pct': float_to_decimal(diff_pct) if ai_price else None
+                'estimated_price': None,
+                'status': 'Pending',
+                'diff_pct': None
             }
         }
+        # Geo index keys (sparse: only listings with known coordinates)
+        item.update(geo_attributes(body.get('coordinates')))
+        # Auction close index keys (sparse: only open timed auctions)
+        item.update(auction_attributes(item['sale_type'], item['auction_end_time']))
 
-        # --- 3. Save to DynamoDB ---
+        # --- 2. Save to DynamoDB ---
         table_name = os.environ.get('TABLE_NAME')
         if table_name:
             dynamodb = boto3.resource('dynamodb')
             table = dynamodb.Table(table_name)
             table.put_item(Item=item)
-            
+
+            # --- 3. Request AI Valuation (async) ---
+            try:
+                enqueue_valuation(build_valuation_request(body, listing_id, timestamp))
+            except Exception as e:
+                # The listing stays "Pending"; it can be re-queued later
+                print(f"Valuation enqueue failed: {e}")
+
             # --- 4. Check Retraining Trigger ---
             try:
-                # Simplified counter check: scan count (in prod, use a separate counter item)
-                count = table.scan(Select='COUNT')['Count']
-                threshold = int(os.environ.get('RETRAIN_THRESHOLD', 50))
-                
-                if count % threshold == 0:
-                    sfn = boto3.client('stepfunctions')
-                    sfn_arn = os.environ.get('STATE_MACHINE_ARN')
-                    if sfn_arn:
-                        sfn.start_execution(
-                            stateMachineArn=sfn_arn,
-                            input=json.dumps({'trigger': 'listing_threshold', 'count': count})
-                        )
-                        print(f"Triggered retraining at {count} listings")
+                # Atomic ADD on a dedicated counter item: every create sees a unique
+                # count, so exactly one writer observes each threshold crossing.
+                # Listings from before the counter are seeded by
+                # scripts/backfill_listing_counter.py.
+                counter_table_name = os.environ.get('COUNTER_TABLE_NAME')
+                if counter_table_name:
+                    counter_table = dynamodb.Table(counter_table_name)
+                    resp = counter_table.update_item(
+                        Key={'counter_id': 'listings'},
+                        UpdateExpression="ADD listing_count :inc",
+                        ExpressionAttributeValues={':inc': 1},
+                        ReturnValues='UPDATED_NEW'
+                    )
+                    count = int(resp['Attributes']['listing_count'])
+                    threshold = int(os.environ.get('RETRAIN_THRESHOLD', 50))
+
+                    if count % threshold == 0:
+                        sfn = boto3.client('stepfunctions')
+                        sfn_arn = os.environ.get('STATE_MACHINE_ARN')
+                        if sfn_arn:
+                            # Execution name is derived from the count, so a retried
+                            # invocation cannot start a second run for the same crossing.
+                            sfn.start_execution(
+                                stateMachineArn=sfn_arn,
+                                name=f"listing-threshold-{count}",
+                                input=json.dumps({'trigger': 'listing_threshold', 'count': count})
+                            )
+                            print(f"Triggered retraining at {count} listings")
             except Exception as e:
                 print(f"Retraining trigger failed: {e}")
 
@@ -153,9 +167,10 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'message': 'Listing created successfully',
                 'listing_id': listing_id,
+                'created_at': timestamp,
                 'ai_valuation': {
-                    'status': valuation_status,
-                    'estimated_price': ai_price
+                    'status': 'Pending',
+                    'estimated_price': None
                 }
             })
         }
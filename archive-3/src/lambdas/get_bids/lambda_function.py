@@ -0,0 +1,97 @@
+import json
+import os
+import boto3
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key
+
+# Provided by the common layer
+from pagination import encode_cursor, decode_cursor
+from ddb_json import dumps
+
+# Bid history and leaderboard for one auction.
+#   ?listing_id=...                    summary + newest bids (first page)
+#   ?listing_id=...&cursor=...         next page of bids only
+#   ?listing_id=...&view=summary       summary only (one GetItem)
+# The summary comes from the bid_stats item kept by aggregate_bids.
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 20))
+MAX_PAGE_SIZE = 100
+VELOCITY_WINDOW = timedelta(minutes=60)
+SUMMARY_FIELDS = 'top_bids, bid_count, bidder_count, bids_per_minute, first_bid_at, last_bid_at'
+
+dynamodb = boto3.resource('dynamodb')
+
+def parse_page_size(value):
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def load_summary(listing_id):
+    stats = dynamodb.Table(os.environ['BID_STATS_TABLE']).get_item(
+        Key={'listing_id': listing_id}, ProjectionExpression=SUMMARY_FIELDS
+    ).get('Item')
+    if not stats:
+        return {'top_bids': [], 'bid_count': 0, 'bidder_count': 0, 'highest_bid': None, 'bids_last_hour': 0}
+
+    # Velocity relative to now, so a quiet auction reads as quiet
+    cutoff = (datetime.utcnow() - VELOCITY_WINDOW).isoformat()[:16]
+    bids_last_hour = sum(n for m, n in stats.get('bids_per_minute', {}).items() if m > cutoff)
+    top_bids = stats.get('top_bids', [])
+    return {
+        'top_bids': top_bids,
+        'bid_count': stats.get('bid_count', 0),
+        'bidder_count': stats.get('bidder_count', 0),
+        'highest_bid': top_bids[0]['amount'] if top_bids else None,
+        'first_bid_at': stats.get('first_bid_at'),
+        'last_bid_at': stats.get('last_bid_at'),
+        'bids_last_hour': bids_last_hour
+    }
+
+def lambda_handler(event, context):
+    if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Allow-Headers': '*'
+            },
+            'body': ''
+        }
+
+    try:
+        query_params = event.get('queryStringParameters', {}) or {}
+        listing_id = query_params.get('listing_id')
+        if not listing_id:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'listing_id is required'})}
+
+        if query_params.get('view') == 'summary':
+            return {'statusCode': 200, 'body': dumps({'listing_id': listing_id, 'summary': load_summary(listing_id)})}
+
+        try:
+            query = {
+                'KeyConditionExpression': Key('listing_id').eq(listing_id),
+                'ScanIndexForward': False,
+                'Limit': parse_page_size(query_params.get('limit'))
+            }
+            if query_params.get('cursor'):
+                query['ExclusiveStartKey'] = decode_cursor(query_params['cursor'])
+        except ValueError as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+        response = dynamodb.Table(os.environ['BIDS_TABLE_NAME']).query(**query)
+        payload = {
+            'listing_id': listing_id,
+            'bids': response.get('Items', []),
+            'next_cursor': encode_cursor(response.get('LastEvaluatedKey'))
+        }
+        if not query_params.get('cursor'):
+            payload['summary'] = load_summary(listing_id)
+
+        return {'statusCode': 200, 'body': dumps(payload)}
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
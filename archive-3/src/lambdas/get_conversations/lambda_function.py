@@ -1,11 +1,54 @@
-import json
 import os
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+# Provided by the common layer
+from pagination import encode_cursor, decode_cursor, sync_token
+from ddb_json import dumps
+
+# A user's conversations, newest message first (last_message_index).
+#   ?user_id=...                  first page; next_cursor for older ones
+#   ?user_id=...&since=<ts>       delta sync: only conversations changed
+#                                 (new message, read, read receipt) after
+#                                 <ts>, oldest change first (updated_index);
+#                                 follow next_cursor (with the same `since`)
+#                                 to the last page
+# sync_token is the newest updated_at delivered (see pagination.sync_token);
+# passing it back as `since` makes an idle poll a single empty query. A
+# delta hands it out on its last page only, since the pages before it
+# leave newer changes undelivered.
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 100
+LAST_MESSAGE_INDEX = 'last_message_index'
+UPDATED_INDEX = 'updated_index'
+KEY_FIELDS = ['user_id', 'conversation_id']
 
 dynamodb = boto3.resource('dynamodb')
 user_conversations_table = dynamodb.Table(os.environ['USER_CONVERSATIONS_TABLE'])
 
+def parse_page_size(value):
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def parse_cursor(cursor, user_id, index_key):
+    """ExclusiveStartKey from a cursor; it must be a key of the index being read, for this user."""
+    key = decode_cursor(cursor)
+    expected = set(KEY_FIELDS) | {index_key}
+    if not isinstance(key, dict) or set(key) != expected or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('Invalid cursor')
+    if key['user_id'] != user_id:
+        raise ValueError('Invalid cursor')
+    return key
+
+def updated_at(conversation):
+    # Entries untouched since updated_at was introduced only have the message time
+    return conversation.get('updated_at') or conversation['last_message_timestamp']
+
 def lambda_handler(event, context):
     try:
         # Handle CORS preflight
@@ -15,24 +58,61 @@ def lambda_handler(event, context):
         # Get user_id from query parameters
         query_params = event.get("queryStringParameters", {}) or {}
         user_id = query_params.get("user_id")
-        
+        since = query_params.get("since")
+
         if not user_id:
             return build_response({"error": "user_id is required"}, 400)
-        
-        # Query all conversations for this user
-        response = user_conversations_table.query(
-            KeyConditionExpression=Key('user_id').eq(user_id),
-            ScanIndexForward=False,  # Sort by timestamp descending (newest first)
-            Limit=50  # Limit to 50 most recent conversations
-        )
-        
+
+        try:
+            query = {'Limit': parse_page_size(query_params.get('limit'))}
+            if query_params.get('cursor'):
+                index_key = 'updated_at' if since else 'last_message_timestamp'
+                query['ExclusiveStartKey'] = parse_cursor(query_params['cursor'], user_id, index_key)
+        except ValueError as e:
+            return build_response({"error": str(e)}, 400)
+
+        try:
+            if since:
+                # Changes since the client's last sync, oldest first
+                response = user_conversations_table.query(
+                    IndexName=UPDATED_INDEX,
+                    KeyConditionExpression=Key('user_id').eq(user_id) & Key('updated_at').gt(since),
+                    ScanIndexForward=True,
+                    **query
+                )
+            else:
+                # This user's conversations by latest message, newest first
+                response = user_conversations_table.query(
+                    IndexName=LAST_MESSAGE_INDEX,
+                    KeyConditionExpression=Key('user_id').eq(user_id),
+                    ScanIndexForward=False,
+                    **query
+                )
+        except ClientError as e:
+            # A well-formed cursor DynamoDB still rejects as a start key
+            if 'ExclusiveStartKey' in query and e.response['Error']['Code'] == 'ValidationException':
+                return build_response({"error": "Invalid cursor"}, 400)
+            raise
+
         conversations = response.get('Items', [])
-        
+        next_cursor = encode_cursor(response.get('LastEvaluatedKey'))
+        if since:
+            token = None if next_cursor else sync_token(
+                updated_at(conversations[-1]) if conversations else None, since
+            )
+        elif query_params.get('cursor'):
+            # Older pages don't move the client's sync position
+            token = None
+        else:
+            token = sync_token(max((updated_at(c) for c in conversations), default=None))
+
         return build_response({
             'conversations': conversations,
-            'count': len(conversations)
+            'count': len(conversations),
+            'next_cursor': next_cursor,
+            'sync_token': token
         })
-        
+
     except Exception as e:
         print(f"Error: {e}")
         return build_response({'error': str(e)}, 500)
@@ -40,6 +120,5 @@ def lambda_handler(event, context):
 def build_response(payload, status_code=200):
     return {
         'statusCode': status_code,
-        'body': json.dumps(payload, default=str)
+        'body': dumps(payload)
     }
-
@@ -1,7 +1,90 @@
 import json
 import os
+import time
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+# Provided by the common layer
+from pagination import encode_cursor, decode_cursor
+from ddb_json import dumps
+
+# ?user_id=...                     every favorited listing_id (heart icons)
+# ?user_id=...&hydrate=true        a page of favorites with their listing
+#                                  cards, loaded with BatchGetItem (100 keys
+#                                  per call); next_cursor for the next page
+# ?user_id=...&listing_ids=a,b,c   {"favorited": {id: bool}} for up to 100
+#                                  listings in one BatchGetItem
+# Favorites store the listing's full key (listing_id + created_at). Older
+# favorites without created_at are resolved once and repaired in place.
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 100
+BATCH_GET_SIZE = 100
+MAX_BATCH_ATTEMPTS = 5
+MAX_CHECK_IDS = 100
+KEY_FIELDS = ['user_id', 'listing_id']
+CARD_FIELDS = [
+    'listing_id', 'created_at', 'owner_id', 'address', 'neighborhood', 'price',
+    'features', 'sale_type', 'auction_end_time', 'current_highest_bid', 'bid_count',
+    'ai_valuation', 'favorite_count'
+]
+
+dynamodb = boto3.resource('dynamodb')
+
+def parse_page_size(value):
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def parse_cursor(cursor, user_id):
+    """ExclusiveStartKey from a cursor; it must be a favorites key of this user."""
+    key = decode_cursor(cursor)
+    if not isinstance(key, dict) or set(key) != set(KEY_FIELDS) or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('Invalid cursor')
+    if key['user_id'] != user_id:
+        raise ValueError('Invalid cursor')
+    return key
+
+def resolve_created_at(favorites_table, listings_table, favorite):
+    """Listing key for a favorite saved before created_at was recorded."""
+    response = listings_table.query(
+        KeyConditionExpression=Key('listing_id').eq(favorite['listing_id']),
+        ProjectionExpression='created_at',
+        Limit=1
+    )
+    if not response['Items']:
+        return None
+    created_at = response['Items'][0]['created_at']
+    favorites_table.update_item(
+        Key={'user_id': favorite['user_id'], 'listing_id': favorite['listing_id']},
+        UpdateExpression="SET created_at = :c",
+        ExpressionAttributeValues={':c': created_at}
+    )
+    return created_at
+
+def batch_get(table_name, keys, fields):
+    """Items by key, 100 per BatchGetItem, retrying unprocessed keys with backoff."""
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    items = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table_name: {
+            'Keys': keys[start:start + BATCH_GET_SIZE],
+            'ProjectionExpression': ', '.join(names),
+            'ExpressionAttributeNames': names
+        }}
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items += response['Responses'].get(table_name, [])
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                break
+            time.sleep(min(1.0, 0.05 * 2 ** attempt))
+        else:
+            raise RuntimeError('BatchGetItem left unprocessed keys after retries')
+    return items
 
 def lambda_handler(event, context):
     # CORS Preflight
@@ -18,7 +101,6 @@ def lambda_handler(event, context):
 
     try:
         table_name = os.environ.get('TABLE_NAME')
-        dynamodb = boto3.resource('dynamodb')
         table = dynamodb.Table(table_name)
 
         query_params = event.get('queryStringParameters', {}) or {}
@@ -27,19 +109,71 @@ def lambda_handler(event, context):
         if not user_id:
             return {'statusCode': 400, 'body': json.dumps({'error': 'Missing user_id'})}
 
-        response = table.query(
-            KeyConditionExpression=Key('user_id').eq(user_id)
-        )
+        if query_params.get('listing_ids'):
+            # Bulk "is favorited?" for a page of listings: one BatchGetItem
+            listing_ids = list(dict.fromkeys(i for i in query_params['listing_ids'].split(',') if i))
+            if len(listing_ids) > MAX_CHECK_IDS:
+                return {'statusCode': 400, 'body': json.dumps({'error': f'At most {MAX_CHECK_IDS} listing_ids'})}
+            keys = [{'user_id': user_id, 'listing_id': listing_id} for listing_id in listing_ids]
+            favorited = {item['listing_id'] for item in batch_get(table_name, keys, ['listing_id'])}
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'favorited': {i: i in favorited for i in listing_ids}})
+            }
+
+        if query_params.get('hydrate') != 'true':
+            response = table.query(
+                KeyConditionExpression=Key('user_id').eq(user_id),
+                ProjectionExpression='listing_id'
+            )
+            # Return list of listing IDs
+            favorites = [item['listing_id'] for item in response.get('Items', [])]
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'favorites': favorites})
+            }
+
+        try:
+            query = {
+                'KeyConditionExpression': Key('user_id').eq(user_id),
+                'Limit': parse_page_size(query_params.get('limit'))
+            }
+            if query_params.get('cursor'):
+                query['ExclusiveStartKey'] = parse_cursor(query_params['cursor'], user_id)
+        except ValueError as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
 
-        items = response.get('Items', [])
-        # Return list of listing IDs
-        favorites = [item['listing_id'] for item in items]
+        try:
+            response = table.query(**query)
+        except ClientError as e:
+            # A well-formed cursor DynamoDB still rejects as a start key
+            if 'ExclusiveStartKey' in query and e.response['Error']['Code'] == 'ValidationException':
+                return {'statusCode': 400, 'body': json.dumps({'error': 'Invalid cursor'})}
+            raise
+        page = response.get('Items', [])
+
+        listings_table_name = os.environ['LISTINGS_TABLE_NAME']
+        listings_table = dynamodb.Table(listings_table_name)
+        keys = []
+        for favorite in page:
+            created_at = favorite.get('created_at') or resolve_created_at(table, listings_table, favorite)
+            if created_at:
+                keys.append({'listing_id': favorite['listing_id'], 'created_at': created_at})
+
+        found = {item['listing_id']: item for item in batch_get(listings_table_name, keys, CARD_FIELDS)}
+        # Keep the favorites order; listings deleted since are skipped
+        listings = [found[f['listing_id']] for f in page if f['listing_id'] in found]
 
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'favorites': favorites
+            'body': dumps({
+                'favorites': [f['listing_id'] for f in page],
+                'listings': listings,
+                'count': len(listings),
+                'next_cursor': encode_cursor(response.get('LastEvaluatedKey'))
             })
         }
 
@@ -49,4 +183,3 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
-
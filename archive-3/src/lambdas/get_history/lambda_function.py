@@ -1,43 +1,149 @@
 import json
 import boto3
+import hashlib
 import os
+from datetime import datetime, timedelta
 from boto3.dynamodb.conditions import Key
 
+# Provided by the common layer
+from ddb_json import dumps
+from pagination import encode_cursor, decode_cursor
+
+# Newest-first valuation history.
+#   GET                    most recent estimates (all users)
+#   GET ?history_token=... the estimates made with this (private) token
+#   &limit=10&cursor=...   page size / next page
+#   GET ?view=monthly&neighborhood=...
+#                          long-term monthly aggregates (compact_estimates)
+# Recent estimates come from the "recent_index" GSI, partitioned by UTC day
+# (time_bucket) and sorted by timestamp: a page queries today's bucket
+# newest first and walks back a day at a time until it is full. Buckets
+# older than LOOKBACK_DAYS are not visited, and MAX_EMPTY_BUCKETS empty days
+# in a row end the feed (next_cursor null) instead of walking the whole
+# lookback.
+#
+# User ids are public (listings, bids, messages), so they never select or
+# appear in history: a user's estimates are keyed by the SHA-256 of a
+# random token only their browser holds (owner_index).
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+LOOKBACK_DAYS = int(os.environ.get('HISTORY_LOOKBACK_DAYS', 30))
+MAX_EMPTY_BUCKETS = int(os.environ.get('HISTORY_MAX_EMPTY_BUCKETS', 7))
+MIN_TOKEN_LENGTH = 32
+RECENT_INDEX = 'recent_index'
+OWNER_INDEX = 'owner_index'
+PRIVATE_FIELDS = ('user_id', 'owner_key')
+
+def parse_page_size(value):
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def previous_bucket(bucket):
+    return (datetime.strptime(bucket, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+
+def query_recent(table, limit, cursor):
+    today = datetime.utcnow()
+    oldest = (today - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    state = decode_cursor(cursor) if cursor else {'bucket': today.strftime('%Y-%m-%d')}
+    if not isinstance(state, dict) or not isinstance(state.get('bucket'), str):
+        raise ValueError('Invalid cursor')
+    bucket, start_key = state['bucket'], state.get('key')
+
+    items, empty_buckets = [], 0
+    while len(items) < limit and bucket >= oldest:
+        if empty_buckets >= MAX_EMPTY_BUCKETS:
+            return items, None
+        query = {
+            'IndexName': RECENT_INDEX,
+            'KeyConditionExpression': Key('time_bucket').eq(bucket),
+            'ScanIndexForward': False,
+            'Limit': limit - len(items)
+        }
+        if start_key:
+            query['ExclusiveStartKey'] = start_key
+        response = table.query(**query)
+        items += response.get('Items', [])
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            # A bucket read from a cursor had items on an earlier page
+            empty = not response.get('Items') and 'ExclusiveStartKey' not in query
+            empty_buckets = empty_buckets + 1 if empty else 0
+            bucket = previous_bucket(bucket)
+
+    next_cursor = encode_cursor({'bucket': bucket, 'key': start_key}) if bucket >= oldest else None
+    return items, next_cursor
+
+def query_owner(table, history_token, limit, cursor):
+    if len(history_token) < MIN_TOKEN_LENGTH:
+        raise ValueError('Invalid history_token')
+    query = {
+        'IndexName': OWNER_INDEX,
+        'KeyConditionExpression': Key('owner_key').eq(hashlib.sha256(history_token.encode('utf-8')).hexdigest()),
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    if cursor:
+        query['ExclusiveStartKey'] = decode_cursor(cursor)
+    response = table.query(**query)
+    return response.get('Items', []), encode_cursor(response.get('LastEvaluatedKey'))
+
+def query_monthly(neighborhood):
+    table = boto3.resource('dynamodb').Table(os.environ['AGGREGATES_TABLE'])
+    response = table.query(KeyConditionExpression=Key('neighborhood').eq(neighborhood), ScanIndexForward=False)
+    months = []
+    for item in response.get('Items', []):
+        months.append({
+            'month': item['month'],
+            'estimates': item.get('estimates', 0),
+            'requests': item.get('requests', 0),
+            'avg_price': round(item['price_sum'] / item['estimates']) if item.get('estimates') else None,
+            'avg_price_per_sqm': round(item['price_sum'] / item['sqm_sum']) if item.get('sqm_sum') else None
+        })
+    return months
+
 def lambda_handler(event, context):
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Methods': 'OPTIONS,GET'
+    }
     try:
         table_name = os.environ.get('TABLE_NAME')
         dynamodb = boto3.resource('dynamodb')
         table = dynamodb.Table(table_name)
 
-        # Fetch last 10 items (Scan is okay for small demo tables, Query is better for prod)
-        # For a real app, we'd query by User ID. Here we just show global recent activity.
-        response = table.scan(Limit=10)
-        items = response.get('Items', [])
-
-        # Sort by timestamp descending
-        items.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-
-        # Decimal to float/int for JSON serialization
-        def clean_decimal(obj):
-            if isinstance(obj, list):
-                return [clean_decimal(i) for i in obj]
-            elif isinstance(obj, dict):
-                return {k: clean_decimal(v) for k, v in obj.items()}
-            elif hasattr(obj, 'to_eng_string'): # check for Decimal
-                return float(obj)
+        query_params = event.get('queryStringParameters', {}) or {}
+        if query_params.get('view') == 'monthly':
+            if not query_params.get('neighborhood'):
+                return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': 'neighborhood is required'})}
+            months = query_monthly(query_params['neighborhood'])
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': dumps({'neighborhood': query_params['neighborhood'], 'months': months})
+            }
+
+        try:
+            limit = parse_page_size(query_params.get('limit'))
+            if query_params.get('history_token'):
+                items, next_cursor = query_owner(table, query_params['history_token'], limit, query_params.get('cursor'))
             else:
-                return obj
+                items, next_cursor = query_recent(table, limit, query_params.get('cursor'))
+        except ValueError as e:
+            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': str(e)})}
 
-        cleaned_items = clean_decimal(items)
+        for item in items:
+            for field in PRIVATE_FIELDS:
+                item.pop(field, None)
 
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'OPTIONS,GET'
-            },
-            'body': json.dumps(cleaned_items)
+            'headers': headers,
+            'body': dumps({'estimates': items, 'next_cursor': next_cursor})
         }
 
     except Exception as e:
@@ -45,4 +151,3 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
-
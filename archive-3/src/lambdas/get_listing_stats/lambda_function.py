@@ -0,0 +1,111 @@
+import json
+import os
+import boto3
+from datetime import datetime, timedelta, timezone
+from boto3.dynamodb.conditions import Key
+
+# Provided by the common layer
+from ddb_json import dumps
+from rollups import GRANULARITIES, HOURLY_RETENTION_DAYS, bucket_range, listing_series, neighborhood_series
+
+# Time series of listing interactions from the precomputed rollups
+# (aggregate_views, rollup_interactions). One Query per request, never a
+# scan of raw events.
+#   ?listing_id=...|neighborhood=...   which series
+#   &granularity=day|hour              default day
+#   &from=...&to=...                   ISO dates/times (UTC unless they
+#                                      carry an offset), default the last
+#                                      30 days (day) or 48 hours (hour)
+# Buckets without activity are returned as zeros.
+
+METRICS = ['views', 'favorites', 'unfavorites', 'bids']
+DEFAULT_SPAN = {'day': timedelta(days=30), 'hour': timedelta(hours=48)}
+MAX_SPAN = {'day': timedelta(days=366), 'hour': timedelta(days=HOURLY_RETENTION_DAYS)}
+
+dynamodb = boto3.resource('dynamodb')
+
+def parse_moment(value, name):
+    """Naive UTC datetime, like the rollup buckets and utcnow()."""
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def parse_range(query_params, granularity):
+    end = parse_moment(query_params['to'], 'to') if query_params.get('to') else datetime.utcnow()
+    start = parse_moment(query_params['from'], 'from') if query_params.get('from') else end - DEFAULT_SPAN[granularity]
+    if start > end:
+        raise ValueError('from must be before to')
+    if end - start > MAX_SPAN[granularity]:
+        raise ValueError(f"Range too large for {granularity} granularity (max {MAX_SPAN[granularity].days} days)")
+    return start, end
+
+def load_buckets(series, first, last):
+    table = dynamodb.Table(os.environ['LISTING_STATS_TABLE'])
+    items = {}
+    kwargs = {'KeyConditionExpression': Key('series').eq(series) & Key('bucket').between(first, last)}
+    while True:
+        response = table.query(**kwargs)
+        for item in response.get('Items', []):
+            items[item['bucket']] = item
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def lambda_handler(event, context):
+    if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Allow-Headers': '*'
+            },
+            'body': ''
+        }
+
+    try:
+        query_params = event.get('queryStringParameters', {}) or {}
+        listing_id = query_params.get('listing_id')
+        neighborhood = query_params.get('neighborhood')
+        if not listing_id and not neighborhood:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'listing_id or neighborhood is required'})}
+
+        granularity = query_params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'granularity must be day or hour'})}
+        try:
+            start, end = parse_range(query_params, granularity)
+        except ValueError as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+        series = listing_series(listing_id) if listing_id else neighborhood_series(neighborhood)
+        keys = bucket_range(granularity, start, end)
+        stored = load_buckets(series, keys[0], keys[-1])
+
+        points = []
+        totals = {m: 0 for m in METRICS}
+        for key in keys:
+            item = stored.get(key, {})
+            point = {'bucket': key[2:]}
+            for metric in METRICS:
+                point[metric] = item.get(metric, 0)
+                totals[metric] += point[metric]
+            points.append(point)
+
+        return {
+            'statusCode': 200,
+            'body': dumps({
+                'series': series,
+                'granularity': granularity,
+                'points': points,
+                'totals': totals
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
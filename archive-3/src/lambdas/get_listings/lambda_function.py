@@ -1,16 +1,126 @@
 import json
 import os
+import base64
+import gzip
+import hashlib
 import boto3
-from decimal import Decimal
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
 
-# Helper to convert Decimal to float/int for JSON serialization
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            if obj % 1 == 0:
-                return int(obj)
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Provided by the common layer
+from pagination import encode_cursor, decode_cursor
+from ddb_json import dumps_bytes
+
+try:
+    import brotli  # optional: only used when packaged with the function
+except ImportError:
+    brotli = None
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 24))
+MAX_PAGE_SIZE = 100
+OWNER_INDEX = 'owner_id_index'
+MIN_COMPRESS_BYTES = int(os.environ.get('MIN_COMPRESS_BYTES', 1024))
+
+# Sparse fieldsets: ?fields=price,ai_valuation.status or ?view=card
+ALLOWED_FIELDS = {
+    'listing_id', 'created_at', 'owner_id', 'address', 'neighborhood', 'price',
+    'features', 'contact', 'description', 'coordinates', 'sale_type',
+    'auction_end_time', 'starting_bid', 'current_highest_bid', 'bid_count',
+    'highest_bidder_id', 'ai_valuation', 'view_count', 'unique_view_count',
+    'favorite_count'
+}
+KEY_FIELDS = ['listing_id', 'created_at']
+VIEWS = {
+    'card': [
+        'listing_id', 'created_at', 'owner_id', 'address', 'neighborhood', 'price',
+        'features.sqm', 'features.bedrooms', 'features.bathrooms', 'sale_type',
+        'auction_end_time', 'current_highest_bid', 'bid_count',
+        'ai_valuation.status', 'ai_valuation.estimated_price', 'ai_valuation.diff_pct',
+        'favorite_count'
+    ]
+}
+
+def parse_page_size(value):
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def parse_cursor(cursor, owner_id=None):
+    """ExclusiveStartKey from a cursor; it must be a key of the table/index being read."""
+    key = decode_cursor(cursor)
+    expected = set(KEY_FIELDS) | ({'owner_id'} if owner_id else set())
+    if not isinstance(key, dict) or set(key) != expected or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('Invalid cursor')
+    if owner_id and key['owner_id'] != owner_id:
+        raise ValueError('Invalid cursor')
+    return key
+
+def build_projection(query_params):
+    """ProjectionExpression kwargs for the requested fields, or {} for full items."""
+    if query_params.get('view'):
+        if query_params['view'] not in VIEWS:
+            raise ValueError(f"view must be one of {sorted(VIEWS)}")
+        fields = VIEWS[query_params['view']]
+    elif query_params.get('fields'):
+        fields = [f.strip() for f in query_params['fields'].split(',') if f.strip()]
+    else:
+        return {}
+
+    placeholders, paths = {}, []
+    for field in KEY_FIELDS + [f for f in fields if f not in KEY_FIELDS]:
+        parts = field.split('.')
+        if parts[0] not in ALLOWED_FIELDS or len(parts) > 2:
+            raise ValueError(f'Unknown field: {field}')
+        for part in parts:
+            placeholders.setdefault(part, f"#f{len(placeholders)}")
+        path = '.'.join(placeholders[part] for part in parts)
+        if path not in paths:
+            paths.append(path)
+
+    return {
+        'ProjectionExpression': ', '.join(paths),
+        'ExpressionAttributeNames': {v: k for k, v in placeholders.items()}
+    }
+
+def build_body_response(payload, event):
+    """200 with ETag (or 304 on If-None-Match), compressed when the client allows it."""
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    raw = dumps_bytes(payload)
+    etag = f'W/"{hashlib.sha1(raw).hexdigest()}"'
+
+    response_headers = {
+        'Content-Type': 'application/json',
+        'ETag': etag,
+        'Cache-Control': 'no-cache',  # always revalidate; 304s are cheap
+        'Vary': 'Accept-Encoding'
+    }
+
+    if_none_match = headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return {'statusCode': 304, 'headers': response_headers, 'body': ''}
+
+    accept_encoding = headers.get('accept-encoding', '')
+    if len(raw) >= MIN_COMPRESS_BYTES:
+        if brotli and 'br' in accept_encoding:
+            response_headers['Content-Encoding'] = 'br'
+            compressed = brotli.compress(raw, quality=5)
+        elif 'gzip' in accept_encoding:
+            response_headers['Content-Encoding'] = 'gzip'
+            compressed = gzip.compress(raw, compresslevel=6)
+        else:
+            compressed = None
+
+        if compressed is not None:
+            return {
+                'statusCode': 200,
+                'headers': response_headers,
+                'body': base64.b64encode(compressed).decode('ascii'),
+                'isBase64Encoded': True
+            }
+
+    return {'statusCode': 200, 'headers': response_headers, 'body': raw.decode('utf-8')}
 
 def lambda_handler(event, context):
     # Handle OPTIONS (CORS preflight)
@@ -33,26 +143,42 @@ def lambda_handler(event, context):
         dynamodb = boto3.resource('dynamodb')
         table = dynamodb.Table(table_name)
 
-        # Check for owner_id filter
         query_params = event.get("queryStringParameters", {}) or {}
         owner_id_filter = query_params.get("owner_id")
 
-        scan_kwargs = {
-            'Limit': 100
-        }
-        
-        if owner_id_filter:
-            from boto3.dynamodb.conditions import Attr
-            scan_kwargs['FilterExpression'] = Attr('owner_id').eq(owner_id_filter)
+        try:
+            read_kwargs = {'Limit': parse_page_size(query_params.get('limit'))}
+            read_kwargs.update(build_projection(query_params))
+            if query_params.get('cursor'):
+                read_kwargs['ExclusiveStartKey'] = parse_cursor(query_params['cursor'], owner_id_filter)
+        except ValueError as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+        try:
+            if owner_id_filter:
+                # Owner listings come from the GSI, newest first: cost scales
+                # with the owner's listings, not with the table.
+                response = table.query(
+                    IndexName=OWNER_INDEX,
+                    KeyConditionExpression=Key('owner_id').eq(owner_id_filter),
+                    ScanIndexForward=False,
+                    **read_kwargs
+                )
+            else:
+                response = table.scan(**read_kwargs)
+        except ClientError as e:
+            # A well-formed cursor DynamoDB still rejects as a start key
+            if 'ExclusiveStartKey' in read_kwargs and e.response['Error']['Code'] == 'ValidationException':
+                return {'statusCode': 400, 'body': json.dumps({'error': 'Invalid cursor'})}
+            raise
 
-        # Scan table
-        response = table.scan(**scan_kwargs)
         items = response.get('Items', [])
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps(items, cls=DecimalEncoder)
-        }
+        return build_body_response({
+            'listings': items,
+            'count': len(items),
+            'next_cursor': encode_cursor(response.get('LastEvaluatedKey'))
+        }, event)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -60,4 +186,3 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
-
@@ -1,10 +1,62 @@
-import json
 import os
 import boto3
 from boto3.dynamodb.conditions import Key
 
+# Provided by the common layer
+from pagination import encode_cursor, decode_cursor, sync_token
+from ddb_json import dumps
+from message_archive import read_before, marker_key
+
+# Messages of one conversation, always returned oldest first.
+#   ?conversation_id=...                 latest page; next_cursor pages back
+#                                        through older messages
+#   ?conversation_id=...&since=<ts>      delta sync: only messages newer than
+#                                        <ts>; next_cursor continues forward
+# sync_token is the newest timestamp the client now has, held back by the
+# commit lag (see pagination.sync_token) so a message stamped before one
+# already served but committed after it is still delivered; passing it
+# back as `since` makes an idle poll a single empty query.
+#
+# Messages past MESSAGE_HOT_DAYS live in S3 (archive_messages). Paging back
+# past the oldest hot message switches the cursor to the archive, so
+# segments are only read by clients that scroll that far, and only for
+# conversations whose archive marker says something was archived.
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 200
+
+ARCHIVE_BUCKET = os.environ.get('ARCHIVE_BUCKET')
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'archive/messages')
+# Sorts after any ISO timestamp: "everything" when nothing is hot
+LATEST = '\uffff'
+
 dynamodb = boto3.resource('dynamodb')
 conversations_table = dynamodb.Table(os.environ['CONVERSATIONS_TABLE'])
+counter_table = dynamodb.Table(os.environ['COUNTER_TABLE_NAME']) if os.environ.get('COUNTER_TABLE_NAME') else None
+s3 = boto3.client('s3') if ARCHIVE_BUCKET else None
+
+def parse_page_size(value):
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def has_archive(conversation_id):
+    """Whether archive_messages has written any segment for this conversation."""
+    if not counter_table:
+        return True
+    item = counter_table.get_item(Key=marker_key(conversation_id), ProjectionExpression='archived_until').get('Item')
+    return bool(item and item.get('archived_until'))
+
+def archive_page(conversation_id, before, limit):
+    messages, more = read_before(s3, ARCHIVE_BUCKET, conversation_id, before, limit, ARCHIVE_PREFIX) if ARCHIVE_BUCKET else ([], False)
+    return build_response({
+        'messages': messages,
+        'count': len(messages),
+        'next_cursor': encode_cursor({'archive_before': messages[0]['timestamp']}) if more else None,
+        'sync_token': None
+    })
 
 def lambda_handler(event, context):
     try:
@@ -15,23 +67,68 @@ def lambda_handler(event, context):
         # Get conversation_id from query parameters
         query_params = event.get("queryStringParameters", {}) or {}
         conversation_id = query_params.get("conversation_id")
-        
+        since = query_params.get("since")
+
         if not conversation_id:
             return build_response({"error": "conversation_id is required"}, 400)
-        
-        # Query all messages for this conversation
-        response = conversations_table.query(
-            KeyConditionExpression=Key('conversation_id').eq(conversation_id),
-            ScanIndexForward=True  # Sort by timestamp ascending (oldest first)
-        )
-        
-        messages = response.get('Items', [])
-        
+
+        try:
+            limit = parse_page_size(query_params.get('limit'))
+            query = {'Limit': limit}
+            cursor = decode_cursor(query_params['cursor']) if query_params.get('cursor') else None
+        except ValueError as e:
+            return build_response({"error": str(e)}, 400)
+
+        if cursor and 'archive_before' in cursor:
+            return archive_page(conversation_id, cursor['archive_before'], limit)
+        if cursor:
+            query['ExclusiveStartKey'] = cursor
+
+        if since:
+            # Forward from the client's last seen message
+            response = conversations_table.query(
+                KeyConditionExpression=Key('conversation_id').eq(conversation_id) & Key('timestamp').gt(since),
+                ScanIndexForward=True,
+                **query
+            )
+            messages = response.get('Items', [])
+        else:
+            # Newest page first, then flipped to reading order
+            response = conversations_table.query(
+                KeyConditionExpression=Key('conversation_id').eq(conversation_id),
+                ScanIndexForward=False,
+                **query
+            )
+            messages = list(reversed(response.get('Items', [])))
+
+        next_cursor = encode_cursor(response.get('LastEvaluatedKey'))
+        if not since and not next_cursor and ARCHIVE_BUCKET and has_archive(conversation_id):
+            # Hot messages exhausted: fill the page from the archive, or hand
+            # out an archive cursor for the next page back
+            oldest = messages[0]['timestamp'] if messages else LATEST
+            if len(messages) < limit:
+                archived, more = read_before(s3, ARCHIVE_BUCKET, conversation_id, oldest, limit - len(messages), ARCHIVE_PREFIX)
+                messages = archived + messages
+                if more:
+                    next_cursor = encode_cursor({'archive_before': messages[0]['timestamp']})
+            else:
+                next_cursor = encode_cursor({'archive_before': oldest})
+
+        if since:
+            token = sync_token(messages[-1]['timestamp'] if messages else None, since)
+        elif query_params.get('cursor'):
+            # Older pages don't move the client's sync position
+            token = None
+        else:
+            token = sync_token(messages[-1]['timestamp'] if messages else None)
+
         return build_response({
             'messages': messages,
-            'count': len(messages)
+            'count': len(messages),
+            'next_cursor': next_cursor,
+            'sync_token': token
         })
-        
+
     except Exception as e:
         print(f"Error: {e}")
         return build_response({'error': str(e)}, 500)
@@ -39,6 +136,5 @@ def lambda_handler(event, context):
 def build_response(payload, status_code=200):
     return {
         'statusCode': status_code,
-        'body': json.dumps(payload, default=str)
+        'body': dumps(payload)
     }
-
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+import boto3
+
+# Provided by the common layer
+from ddb_json import dumps
+from trending import TOP_K, board_key, decayed
+
+# "Trending now" listings, citywide or for one neighborhood, from the boards
+# kept by update_trending: a single GetItem, no scan.
+#   ?neighborhood=Gràcia   per-neighborhood board (default: citywide)
+#   &limit=10              up to TOP_K listings
+# Scores are decayed to the time of the request.
+
+dynamodb = boto3.resource('dynamodb')
+
+def lambda_handler(event, context):
+    if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Allow-Headers': '*'
+            },
+            'body': ''
+        }
+
+    try:
+        query_params = event.get('queryStringParameters', {}) or {}
+        neighborhood = query_params.get('neighborhood')
+        try:
+            limit = max(1, min(int(query_params.get('limit') or TOP_K), TOP_K))
+        except ValueError:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'limit must be an integer'})}
+
+        board = dynamodb.Table(os.environ['TRENDING_TABLE']).get_item(
+            Key={'key': board_key(neighborhood)}
+        ).get('Item') or {}
+
+        now = time.time()
+        listings = [
+            {**entry.get('card', {}), 'listing_id': entry['listing_id'],
+             'trending_score': round(decayed(entry['score'], board['scored_at'], now), 2)}
+            for entry in board.get('entries', [])[:limit]
+        ]
+
+        return {
+            'statusCode': 200,
+            'body': dumps({
+                'neighborhood': neighborhood,
+                'listings': listings,
+                'updated_at': board.get('scored_at')
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
@@ -0,0 +1,43 @@
+import os
+import boto3
+
+# Provided by the common layer
+from ddb_json import dumps
+
+# Total-unread badge: one get_item on the unread#<user_id> counter that
+# send_message increments and mark_read decrements.
+
+dynamodb = boto3.resource('dynamodb')
+counter_table = dynamodb.Table(os.environ['COUNTER_TABLE_NAME'])
+
+def lambda_handler(event, context):
+    try:
+        # Handle CORS preflight
+        if event.get("requestContext", {}).get("http", {}).get("method") == "OPTIONS":
+            return build_response({"message": "ok"})
+
+        query_params = event.get("queryStringParameters", {}) or {}
+        user_id = query_params.get("user_id")
+
+        if not user_id:
+            return build_response({"error": "user_id is required"}, 400)
+
+        item = counter_table.get_item(
+            Key={'counter_id': f"unread#{user_id}"},
+            ProjectionExpression='unread_total'
+        ).get('Item') or {}
+
+        return build_response({
+            'user_id': user_id,
+            'unread_total': max(0, int(item.get('unread_total', 0)))
+        })
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return build_response({'error': str(e)}, 500)
+
+def build_response(payload, status_code=200):
+    return {
+        'statusCode': status_code,
+        'body': dumps(payload)
+    }
@@ -0,0 +1,239 @@
+import json
+import math
+import os
+import boto3
+import uuid
+import datetime
+
+# Provided by the common layer
+from geo import geo_attributes
+from auctions import auction_attributes
+from ddb_json import to_dynamo
+
+# Bulk listing import for agencies: validate a batch, value it with one
+# batched inference call and write it with a DynamoDB batch_writer.
+
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 500))
+REQUIRED_FIELDS = ['address', 'neighborhood', 'price', 'features', 'contact']
+REQUIRED_FEATURES = ['sqm', 'bedrooms', 'bathrooms']
+
+def validate_row(row):
+    """Return an error message for an invalid row, or None."""
+    if not isinstance(row, dict):
+        return "Row must be an object"
+    for field in REQUIRED_FIELDS:
+        if field not in row:
+            return f"Missing required field: {field}"
+    if not isinstance(row['features'], dict):
+        return "features must be an object"
+    for field in REQUIRED_FEATURES:
+        if field not in row['features']:
+            return f"Missing required feature: {field}"
+    for field, value in (('price', row['price']), ('sqm', row['features']['sqm'])):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return f"{field} must be a number"
+        # float() accepts "nan" and "inf"
+        if not math.isfinite(number) or number <= 0:
+            return f"{field} must be a positive number"
+    return None
+
+def build_inference_payload(row):
+    features = row['features']
+    coords = row.get('coordinates') or {}
+    return {
+        'address': row['address'],
+        'neighborhood': row['neighborhood'],
+        'sqm': features['sqm'],
+        'bedrooms': features['bedrooms'],
+        'bathrooms': features['bathrooms'],
+        'has_elevator': features.get('has_elevator', False),
+        'has_pool': features.get('has_pool', False),
+        'has_ac': features.get('has_ac', False),
+        'has_terrace': features.get('has_terrace', False),
+        # Known coordinates let inference skip geocoding
+        'latitude': coords.get('lat'),
+        'longitude': coords.get('lng', coords.get('lon')),
+    }
+
+def value_batch(rows):
+    """One inference invoke for the whole batch; returns estimated prices in order."""
+    inference_func = os.environ.get('INFERENCE_FUNC')
+    if not inference_func:
+        return [None] * len(rows)
+
+    response = boto3.client('lambda').invoke(
+        FunctionName=inference_func,
+        InvocationType='RequestResponse',
+        Payload=json.dumps({'batch': [build_inference_payload(r) for r in rows]})
+    )
+    inference_result = json.loads(response['Payload'].read())
+    # Error payloads ({'statusCode': 500, ...}) leave the batch unvalued
+    if inference_result.get('statusCode', 200) != 200 or 'body' not in inference_result:
+        print(f"Batch inference returned an error: {inference_result}")
+        return [None] * len(rows)
+
+    results = json.loads(inference_result['body']).get('results', [])
+    return [r.get('estimated_price') if r else None for r in results]
+
+def build_valuation(asking_price, ai_price):
+    if not ai_price:
+        return {'estimated_price': None, 'status': 'Unknown', 'diff_pct': None}
+
+    diff_pct = ((asking_price - ai_price) / ai_price) * 100
+    if diff_pct > 10:
+        status = "Overpriced"
+    elif diff_pct < -10:
+        status = "Good Deal"
+    else:
+        status = "Fair Price"
+    return {'estimated_price': ai_price, 'status': status, 'diff_pct': diff_pct}
+
+def build_item(row, owner_id, valuation):
+    is_auction = row.get('sale_type') == 'auction'
+    item = {
+        'listing_id': str(uuid.uuid4()),
+        'owner_id': row.get('owner_id', owner_id),
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'address': row['address'],
+        'neighborhood': row['neighborhood'],
+        'price': to_dynamo(float(row['price'])),
+        'features': to_dynamo(row['features']),
+        'contact': row['contact'],
+        'description': row.get('description', ''),
+        'coordinates': to_dynamo(row.get('coordinates', {})),
+        'sale_type': row.get('sale_type', 'fixed'),
+        'auction_end_time': row.get('auction_end_time'),
+        'starting_bid': to_dynamo(row.get('starting_bid', 0)) if is_auction else None,
+        'current_highest_bid': to_dynamo(row.get('starting_bid', 0)) if is_auction else None,
+        'bid_count': 0 if is_auction else None,
+        'ai_valuation': to_dynamo(valuation)
+    }
+    item.update(geo_attributes(row.get('coordinates')))
+    item.update(auction_attributes(item['sale_type'], item['auction_end_time']))
+    return item
+
+def bump_listing_counter(dynamodb, created):
+    """Advance the shared listing counter and trigger retraining once if a threshold was crossed."""
+    counter_table_name = os.environ.get('COUNTER_TABLE_NAME')
+    if not counter_table_name or not created:
+        return
+
+    resp = dynamodb.Table(counter_table_name).update_item(
+        Key={'counter_id': 'listings'},
+        UpdateExpression="ADD listing_count :inc",
+        ExpressionAttributeValues={':inc': created},
+        ReturnValues='UPDATED_NEW'
+    )
+    count = int(resp['Attributes']['listing_count'])
+    threshold = int(os.environ.get('RETRAIN_THRESHOLD', 50))
+
+    # The atomic ADD hands this batch the range (count - created, count];
+    # trigger once (for the highest multiple) if a multiple of the threshold
+    # falls inside it.
+    crossing = (count // threshold) * threshold
+    sfn_arn = os.environ.get('STATE_MACHINE_ARN')
+    if crossing > count - created and sfn_arn:
+        boto3.client('stepfunctions').start_execution(
+            stateMachineArn=sfn_arn,
+            name=f"listing-threshold-{crossing}",
+            input=json.dumps({'trigger': 'listing_threshold', 'count': crossing})
+        )
+        print(f"Triggered retraining at {crossing} listings")
+
+def lambda_handler(event, context):
+    # Handle OPTIONS (CORS preflight)
+    if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Allow-Headers': '*'
+            },
+            'body': ''
+        }
+
+    try:
+        if 'body' in event:
+            body = event['body']
+            if isinstance(body, str):
+                body = json.loads(body)
+        else:
+            body = event
+
+        rows = body.get('listings')
+        if not isinstance(rows, list) or not rows:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'listings must be a non-empty list'})}
+        if len(rows) > MAX_BATCH_SIZE:
+            return {'statusCode': 400, 'body': json.dumps({'error': f'At most {MAX_BATCH_SIZE} listings per request'})}
+
+        owner_id = body.get('owner_id', 'anonymous')
+
+        # --- 1. Validate ---
+        results = [None] * len(rows)
+        valid = []
+        for i, row in enumerate(rows):
+            error = validate_row(row)
+            if error:
+                results[i] = {'row': i, 'status': 'invalid', 'error': error}
+            else:
+                valid.append(i)
+
+        # --- 2. Batched AI Valuation ---
+        try:
+            ai_prices = value_batch([rows[i] for i in valid])
+        except Exception as e:
+            print(f"Batch inference failed: {e}")
+            ai_prices = [None] * len(valid)
+        if len(ai_prices) != len(valid):
+            print(f"Batch inference returned {len(ai_prices)} results for {len(valid)} rows")
+            ai_prices = [None] * len(valid)
+
+        # --- 3. Batched Write ---
+        # batch_writer groups puts into BatchWriteItem calls of 25 and
+        # re-sends any UnprocessedItems until they are accepted.
+        table_name = os.environ.get('TABLE_NAME')
+        dynamodb = boto3.resource('dynamodb')
+        table = dynamodb.Table(table_name)
+
+        created = 0
+        with table.batch_writer() as batch:
+            for i, ai_price in zip(valid, ai_prices):
+                valuation = build_valuation(float(rows[i]['price']), ai_price)
+                item = build_item(rows[i], owner_id, valuation)
+                batch.put_item(Item=item)
+                results[i] = {
+                    'row': i,
+                    'status': 'created',
+                    'listing_id': item['listing_id'],
+                    'created_at': item['created_at'],
+                    'ai_valuation': {
+                        'status': valuation['status'],
+                        'estimated_price': valuation['estimated_price']
+                    }
+                }
+                created += 1
+
+        # --- 4. Retraining Trigger ---
+        try:
+            bump_listing_counter(dynamodb, created)
+        except Exception as e:
+            print(f"Retraining trigger failed: {e}")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'created': created,
+                'invalid': len(rows) - len(valid),
+                'results': results
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
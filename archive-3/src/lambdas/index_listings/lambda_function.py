@@ -0,0 +1,133 @@
+import os
+import boto3
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+
+# Provided by the common layer
+from search_index import all_facet, index_number, LEGACY_ALL
+
+# Maintains the listing search index from the listings table stream.
+# Every listing is projected as a compact "card" into one partition per facet
+# (see search_index): its "all" shard, its neighborhood and its AI status.
+# Each partition has LSIs on the sortable fields, so a search reads only the
+# matching facet, already in the requested order. LSI sort keys (price,
+# price_per_sqm, diff_pct) are only written when they are valid numbers, so
+# one bad listing cannot fail the whole batch write.
+
+dynamodb = boto3.resource('dynamodb')
+deserializer = TypeDeserializer()
+
+CARD_FIELDS = [
+    'listing_id', 'created_at', 'owner_id', 'address', 'neighborhood', 'price',
+    'sale_type', 'auction_end_time', 'auction_status', 'current_highest_bid', 'bid_count'
+]
+
+def facets(listing):
+    keys = [all_facet(listing['listing_id'])]
+    if listing.get('neighborhood'):
+        keys.append(f"nb#{listing['neighborhood']}")
+    status = (listing.get('ai_valuation') or {}).get('status')
+    if status:
+        keys.append(f"status#{status}")
+    return keys
+
+def build_card(listing):
+    card = {k: listing[k] for k in CARD_FIELDS if listing.get(k) is not None}
+    features = listing.get('features') or {}
+    for k in ('sqm', 'bedrooms', 'bathrooms'):
+        if features.get(k) is not None:
+            card[k] = features[k]
+
+    valuation = listing.get('ai_valuation') or {}
+    card['status'] = valuation.get('status', 'Unknown')
+    # Sort keys of sparse LSIs: only written when known and numeric
+    price = index_number(card.pop('price', None))
+    if price is not None:
+        card['price'] = price
+    diff_pct = index_number(valuation.get('diff_pct'))
+    if diff_pct is not None:
+        card['diff_pct'] = diff_pct
+    if valuation.get('estimated_price') is not None:
+        card['estimated_price'] = valuation['estimated_price']
+    sqm = index_number(card.get('sqm'))
+    if price and sqm:
+        card['price_per_sqm'] = (price / sqm).quantize(Decimal('0.01'))
+    return card
+
+def apply_change(batch, old, new):
+    """Write the new facet cards and drop cards for facets the listing left."""
+    new_facets = facets(new) if new else []
+    if new:
+        card = build_card(new)
+        for facet in new_facets:
+            batch.put_item(Item={'facet': facet, **card})
+    if old:
+        for facet in facets(old):
+            if facet not in new_facets:
+                batch.delete_item(Key={'facet': facet, 'listing_id': old['listing_id']})
+
+def card_changed(old, new):
+    """False for updates the index doesn't show (view/favorite counters)."""
+    if not old or not new:
+        return True
+    return build_card(old) != build_card(new) or facets(old) != facets(new)
+
+def deserialize(image):
+    return {k: deserializer.deserialize(v) for k, v in image.items()} if image else None
+
+def drop_legacy_all(batch, index_table):
+    """Delete the cards of the old single "all" partition."""
+    kwargs = {'KeyConditionExpression': Key('facet').eq(LEGACY_ALL), 'ProjectionExpression': 'listing_id'}
+    while True:
+        response = index_table.query(**kwargs)
+        for item in response.get('Items', []):
+            batch.delete_item(Key={'facet': LEGACY_ALL, 'listing_id': item['listing_id']})
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def backfill(index_table):
+    """Index every existing listing (one-off, e.g. after first deploy or re-sharding)."""
+    listings_table = dynamodb.Table(os.environ['LISTINGS_TABLE_NAME'])
+    indexed = 0
+    kwargs = {}
+    with index_table.batch_writer(overwrite_by_pkeys=['facet', 'listing_id']) as batch:
+        drop_legacy_all(batch, index_table)
+        while True:
+            response = listings_table.scan(**kwargs)
+            for listing in response.get('Items', []):
+                apply_change(batch, None, listing)
+                indexed += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return indexed
+
+def lambda_handler(event, context):
+    index_table = dynamodb.Table(os.environ['SEARCH_INDEX_TABLE'])
+
+    if event.get('backfill'):
+        return {'indexed': backfill(index_table)}
+
+    # overwrite_by_pkeys de-duplicates several changes to one listing in a batch
+    changed = 0
+    with index_table.batch_writer(overwrite_by_pkeys=['facet', 'listing_id']) as batch:
+        for record in event.get('Records', []):
+            change = record['dynamodb']
+            old, new = deserialize(change.get('OldImage')), deserialize(change.get('NewImage'))
+            if card_changed(old, new):
+                apply_change(batch, old, new)
+                changed += 1
+
+    # Flag the static snapshots for the next publish_snapshots run
+    counter_table_name = os.environ.get('COUNTER_TABLE_NAME')
+    if counter_table_name and changed:
+        dynamodb.Table(counter_table_name).update_item(
+            Key={'counter_id': 'listing_snapshot'},
+            UpdateExpression="SET dirty = :t, changed_at = :now",
+            ExpressionAttributeValues={':t': True, ':now': datetime.utcnow().isoformat()}
+        )
+
+    return {'processed': len(event.get('Records', []))}
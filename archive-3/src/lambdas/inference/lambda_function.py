@@ -1,3 +1,4 @@
+import hashlib
 import json
 import math
 import urllib.request
@@ -5,11 +6,14 @@ import urllib.parse
 import os
 import boto3
 import joblib
+import shutil
 import tempfile
 import numpy as np
-import uuid
 from datetime import datetime
 
+# Provided by the common layer
+from ddb_json import to_dynamo
+
 # --- 1. Static Data Loading (For Geocoding & Basic Lookups) ---
 
 def load_json(filename):
@@ -35,9 +39,10 @@ except Exception as e:
 
 model = None
 metadata = None
+model_version = 'rule-based'
 
 def load_model_resources():
-    global model, metadata
+    global model, metadata, model_version
     if model and metadata:
         return
         
@@ -47,11 +52,15 @@ def load_model_resources():
         print("MODEL_BUCKET not set")
         return
 
-    # Load Model
+    # Load Model. The version (used for estimate coalescing) is the ETag of
+    # the very object loaded, so the two can never disagree.
     try:
+        obj = s3.get_object(Bucket=bucket, Key="production/model.joblib")
         with tempfile.NamedTemporaryFile() as tf:
-            s3.download_file(bucket, "production/model.joblib", tf.name)
-            model = joblib.load(tf.name)
+            shutil.copyfileobj(obj['Body'], tf)
+            tf.flush()
+            loaded = joblib.load(tf.name)
+        model, model_version = loaded, obj['ETag'].strip('"')[:12]
     except Exception as e:
         print(f"Error loading model from S3: {e}")
         
@@ -131,7 +140,26 @@ def get_heuristics(dist_center_km, district):
 
 # --- 5. Database Persistence ---
 
-def save_to_dynamodb(prediction, input_data, neighborhood, lat, lon):
+# Identical requests (same features, neighborhood and user, same model)
+# within one coalescing window share one estimate item and bump its
+# hit_count instead of adding a row each. A hit only records last_seen_at:
+# timestamp and time_bucket stay those of the first request, so the item
+# never moves within the history GSIs while clients page through them.
+# Items expire ESTIMATE_TTL_DAYS after their last hit; compact_estimates
+# folds expired ones into the monthly per-neighborhood aggregates.
+COALESCE_WINDOW_SECONDS = int(os.environ.get('ESTIMATE_COALESCE_SECONDS', 3600))
+ESTIMATE_TTL_DAYS = int(os.environ.get('ESTIMATE_TTL_DAYS', 90))
+
+def feature_hash(input_data, neighborhood, user_id, owner_key=None):
+    # owner_key is part of the identity: two history sessions asking the same
+    # question must not coalesce into one row owned by whichever came last
+    canonical = json.dumps(
+        {'features': input_data, 'neighborhood': neighborhood, 'user_id': user_id, 'owner_key': owner_key},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+def save_to_dynamodb(prediction, input_data, neighborhood, lat, lon, user_id=None, history_token=None):
     table_name = os.environ.get('TABLE_NAME')
     if not table_name:
         return
@@ -139,32 +167,194 @@ def save_to_dynamodb(prediction, input_data, neighborhood, lat, lon):
     try:
         dynamodb = boto3.resource('dynamodb')
         table = dynamodb.Table(table_name)
-        
-        # Create numeric timestamps and string ID
-        item = {
-            'estimate_id': str(uuid.uuid4()),
-            'timestamp': datetime.utcnow().isoformat(),
-            'estimated_price': int(prediction),
-            'neighborhood': neighborhood,
-            'input_features': json.loads(json.dumps(input_data, default=str)), # Sanitize float/decimals
-            'coordinates': {'lat': str(lat), 'lon': str(lon)}
+
+        now = datetime.utcnow()
+        timestamp = now.isoformat()
+        owner_key = None
+        if isinstance(history_token, str) and history_token:
+            owner_key = hashlib.sha256(history_token.encode('utf-8')).hexdigest()
+        digest = feature_hash(input_data, neighborhood, user_id, owner_key)
+        epoch = int((now - datetime(1970, 1, 1)).total_seconds())
+        window = epoch // COALESCE_WINDOW_SECONDS
+
+        values = {
+            ':ts': timestamp,
+            ':bucket': timestamp[:10],  # UTC day, partition of the recent_index GSI
+            ':price': int(prediction),
+            ':nb': neighborhood,
+            ':features': input_data,
+            ':coords': {'lat': str(lat), 'lon': str(lon)},
+            ':hash': digest,
+            ':model': model_version,
+            ':exp': epoch + ESTIMATE_TTL_DAYS * 86400,
+            ':one': 1
         }
-        
-        # Helper to convert floats to Decimal for DynamoDB
-        from decimal import Decimal
-        def float_to_decimal(obj):
-            if isinstance(obj, float):
-                return Decimal(str(obj))
-            if isinstance(obj, dict):
-                return {k: float_to_decimal(v) for k, v in obj.items()}
-            return obj
-            
-        table.put_item(Item=float_to_decimal(item))
+        update = (
+            "SET #ts = if_not_exists(#ts, :ts), time_bucket = if_not_exists(time_bucket, :bucket), "
+            "last_seen_at = :ts, estimated_price = :price, neighborhood = :nb, "
+            "input_features = :features, coordinates = :coords, feature_hash = :hash, "
+            "model_version = :model, expires_at = :exp"
+        )
+        if user_id:
+            update += ", user_id = :uid"
+            values[':uid'] = user_id
+        if owner_key:
+            # Sparse owner_index GSI; get_history looks it up by the same hash
+            update += ", owner_key = :owner"
+            values[':owner'] = owner_key
+
+        table.update_item(
+            Key={'estimate_id': f"{digest}#{model_version}#{window}"},
+            UpdateExpression=update + " ADD hit_count :one",
+            ExpressionAttributeNames={'#ts': 'timestamp'},
+            ExpressionAttributeValues=to_dynamo(values)
+        )
         
     except Exception as e:
         print(f"Error saving to DynamoDB: {e}")
 
-# --- 6. Main Handler ---
+# --- 6. Feature Vector Construction ---
+
+CBD_COORD = (41.387, 2.170)
+
+def build_features(body, geocode=True):
+    """
+    Resolve location and build the model input for one request.
+    Callers that already know the coordinates (e.g. bulk imports) pass
+    latitude/longitude and skip the Nominatim round trip.
+    """
+    address = body.get('address')
+    sqm = float(body.get('sqm', 80))
+
+    # 1. Resolve Location
+    neighborhood = None
+    lat, lon = 0.0, 0.0
+    if body.get('latitude') and body.get('longitude'):
+        lat, lon = float(body['latitude']), float(body['longitude'])
+        neighborhood = find_nearest_neighborhood(lat, lon)
+    elif address and geocode:
+        coords = get_coordinates(address)
+        if coords:
+            lat, lon = coords
+            neighborhood = find_nearest_neighborhood(lat, lon)
+
+    if not neighborhood:
+        neighborhood = body.get('neighborhood', "la Dreta de l'Eixample")
+
+    nb_info = NEIGHBORHOOD_MAP.get(neighborhood, {})
+    district = nb_info.get('district', "2")
+
+    # 2. Feature Calculation
+    if lat and lon:
+        dist_center_km = haversine_km(lat, lon, CBD_COORD[0], CBD_COORD[1])
+    else:
+        dist_center_km = 1.5
+
+    heuristics = get_heuristics(dist_center_km, district)
+
+    # 3. Construct Input Vector
+    if not metadata or 'feature_columns' not in metadata:
+        raise ValueError("Model metadata not available.")
+
+    feature_cols = metadata['feature_columns']
+
+    nb_map = metadata.get('neighborhood_map', {})
+    floor_map = metadata.get('floor_plan_map', {})
+    build_map = metadata.get('building_type_map', {})
+    cond_map = metadata.get('condition_map', {})
+    mat_map = metadata.get('material_map', {})
+
+    def encode(val, mapping, default_key='Unknown'):
+        return float(mapping.get(val, mapping.get(default_key, 0)))
+
+    input_data = {
+        'neighborhood_encoded': encode(neighborhood, nb_map),
+        'sqm': sqm,
+        'bedrooms': float(body.get('bedrooms', 2)),
+        'bathrooms': float(body.get('bathrooms', 1)),
+        'floor': 2.0,
+        'year_built': 1990.0,
+        'renovation_years_ago': 5.0,
+        'condition_encoded': encode('Good', cond_map),
+        'material_encoded': encode('Standard', mat_map),
+        'floor_plan_encoded': encode('Traditional', floor_map),
+        'building_type_encoded': encode('Condo', build_map),
+        'has_elevator': 1.0 if body.get('has_elevator') else 0.0,
+        'has_ac': 1.0 if body.get('has_ac') else 0.0,
+        'has_fireplace': 0.0,
+        'has_balcony': 0.0,
+        'has_terrace': 1.0 if body.get('has_terrace') else 0.0,
+        'terrace_sqm': 15.0 if body.get('has_terrace') else 0.0,
+        'parking_spots': 0.0,
+        'has_pool': 1.0 if body.get('has_pool') else 0.0,
+        'has_gym': 0.0,
+        'has_doorman': 0.0,
+        'hoa_monthly_eur': 100.0,
+        'property_tax_rate_pct': 1.0,
+        'distance_cbd_km': dist_center_km,
+        'distance_metro_min': heuristics['distance_metro_min'],
+        'walk_score': heuristics['walk_score'],
+        'safety_score': heuristics['safety_score'],
+        'amenities_score': heuristics['amenities_score'],
+        # Extra metadata for frontend/DB (not used in prediction)
+        'address': address
+    }
+
+    input_vector = [input_data.get(col, 0.0) for col in feature_cols]
+
+    return {
+        'input_data': input_data,
+        'input_vector': input_vector,
+        'neighborhood': neighborhood,
+        'nb_info': nb_info,
+        'sqm': sqm,
+        'lat': lat,
+        'lon': lon
+    }
+
+def predict_many(features):
+    """Single model call for a list of build_features() results."""
+    if model:
+        return list(model.predict([f['input_vector'] for f in features]))
+    return [f['nb_info'].get('price_2025_eur_sqm', 4000) * f['sqm'] for f in features]
+
+def handle_batch(requests):
+    """
+    Batch mode ({"batch": [...]}): one predict() call for all rows, no
+    geocoding for rows that carry coordinates, and no estimate history writes.
+    Returns results in request order; rows that fail carry an "error".
+    """
+    results = [None] * len(requests)
+    prepared, positions = [], []
+    for i, req in enumerate(requests):
+        try:
+            prepared.append(build_features(req, geocode=False))
+            positions.append(i)
+        except Exception as e:
+            results[i] = {'error': str(e)}
+
+    predictions = predict_many(prepared) if prepared else []
+    for i, f, prediction in zip(positions, prepared, predictions):
+        # Per row, like the build_features loop: a zero or non-finite sqm fails its
+        # own row instead of the whole batch
+        try:
+            results[i] = {
+                'estimated_price': round(float(prediction), 0),
+                'price_per_sqm': round(float(prediction) / f['sqm'], 0),
+                'inferred_neighborhood': f['neighborhood']
+            }
+        except Exception as e:
+            results[i] = {'error': str(e)}
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'results': results,
+            'model_used': 'RandomForest (Online)' if model else 'Fallback (Rule-Based)'
+        })
+    }
+
+# --- 7. Main Handler ---
 
 def lambda_handler(event, context):
     load_model_resources()
@@ -177,95 +367,20 @@ def lambda_handler(event, context):
         else:
             body = event
 
-        address = body.get('address')
-        sqm = float(body.get('sqm', 80))
-        
-        # 1. Resolve Location
-        neighborhood = None
-        lat, lon = 0.0, 0.0
-        if address:
-            coords = get_coordinates(address)
-            if coords:
-                lat, lon = coords
-                neighborhood = find_nearest_neighborhood(lat, lon)
-        
-        if not neighborhood:
-            neighborhood = body.get('neighborhood', "la Dreta de l'Eixample")
-            
-        nb_info = NEIGHBORHOOD_MAP.get(neighborhood, {})
-        district = nb_info.get('district', "2")
-        
-        # 2. Feature Calculation
-        CBD_COORD = (41.387, 2.170)
-        if lat and lon:
-            dist_center_km = haversine_km(lat, lon, CBD_COORD[0], CBD_COORD[1])
-        else:
-            dist_center_km = 1.5
-            
-        heuristics = get_heuristics(dist_center_km, district)
-        
-        # 3. Construct Input Vector
-        if not metadata or 'feature_columns' not in metadata:
-            raise ValueError("Model metadata not available.")
-            
-        feature_cols = metadata['feature_columns']
-        input_vector = []
-        
-        nb_map = metadata.get('neighborhood_map', {})
-        floor_map = metadata.get('floor_plan_map', {})
-        build_map = metadata.get('building_type_map', {})
-        cond_map = metadata.get('condition_map', {})
-        mat_map = metadata.get('material_map', {})
-        
-        def encode(val, mapping, default_key='Unknown'):
-            return float(mapping.get(val, mapping.get(default_key, 0)))
-            
-        input_data = {
-            'neighborhood_encoded': encode(neighborhood, nb_map),
-            'sqm': sqm,
-            'bedrooms': float(body.get('bedrooms', 2)),
-            'bathrooms': float(body.get('bathrooms', 1)),
-            'floor': 2.0,
-            'year_built': 1990.0,
-            'renovation_years_ago': 5.0,
-            'condition_encoded': encode('Good', cond_map),
-            'material_encoded': encode('Standard', mat_map),
-            'floor_plan_encoded': encode('Traditional', floor_map),
-            'building_type_encoded': encode('Condo', build_map),
-            'has_elevator': 1.0 if body.get('has_elevator') else 0.0,
-            'has_ac': 1.0 if body.get('has_ac') else 0.0,
-            'has_fireplace': 0.0,
-            'has_balcony': 0.0,
-            'has_terrace': 1.0 if body.get('has_terrace') else 0.0,
-            'terrace_sqm': 15.0 if body.get('has_terrace') else 0.0,
-            'parking_spots': 0.0,
-            'has_pool': 1.0 if body.get('has_pool') else 0.0,
-            'has_gym': 0.0,
-            'has_doorman': 0.0,
-            'hoa_monthly_eur': 100.0,
-            'property_tax_rate_pct': 1.0,
-            'distance_cbd_km': dist_center_km,
-            'distance_metro_min': heuristics['distance_metro_min'],
-            'walk_score': heuristics['walk_score'],
-            'safety_score': heuristics['safety_score'],
-            'amenities_score': heuristics['amenities_score'],
-            # Extra metadata for frontend/DB (not used in prediction)
-            'address': address 
-        }
-        
-        for col in feature_cols:
-            val = input_data.get(col, 0.0)
-            input_vector.append(val)
-            
+        if isinstance(body.get('batch'), list):
+            return handle_batch(body['batch'])
+
+        features = build_features(body)
+        input_data = features['input_data']
+        neighborhood = features['neighborhood']
+        lat, lon = features['lat'], features['lon']
+        sqm = features['sqm']
+
         # 4. Predict
-        if model:
-            prediction = model.predict([input_vector])[0]
-        else:
-            base = nb_info.get('price_2025_eur_sqm', 4000)
-            prediction = base * sqm
+        prediction = predict_many([features])[0]
             
         # 5. Save to DB
-        save_to_dynamodb(prediction, input_data, neighborhood, lat, lon)
+        save_to_dynamodb(prediction, input_data, neighborhood, lat, lon, body.get('user_id'), body.get('history_token'))
             
         return {
             'statusCode': 200,
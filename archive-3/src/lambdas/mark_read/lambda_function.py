@@ -0,0 +1,120 @@
+import json
+import os
+import boto3
+from datetime import datetime
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer
+
+# Provided by the common layer
+from ddb_json import dumps
+from push import publish, conversation_topic
+
+# Marks a conversation read for one user:
+#   - resets their unread_count and stamps last_read_at
+#   - stamps other_read_at on the other participant's entry (read receipt)
+#   - bumps updated_at on both entries, so their other clients' delta sync
+#     (get_conversations ?since=) picks the change up
+#   - subtracts the cleared count from their unread#<user_id> badge counter
+# all in one transaction, guarded on the unread_count that was read, so a
+# message arriving in between makes it retry instead of skewing the badge.
+
+MAX_ATTEMPTS = 3
+
+dynamodb_client = boto3.client('dynamodb')
+serializer = TypeSerializer()
+
+def typed(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def mark_read(user_id, conversation_id):
+    """Returns the number of messages cleared, or None if the conversation is unknown."""
+    table_name = os.environ['USER_CONVERSATIONS_TABLE']
+    key = typed({'user_id': user_id, 'conversation_id': conversation_id})
+
+    receipt = True
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        item = dynamodb_client.get_item(TableName=table_name, Key=key, ConsistentRead=True).get('Item')
+        if not item:
+            return None
+        unread = int(item.get('unread_count', {}).get('N', '0'))
+        now = datetime.utcnow().isoformat() + "Z"
+
+        transaction = [{
+            'Update': {
+                'TableName': table_name,
+                'Key': key,
+                'UpdateExpression': "SET unread_count = :zero, last_read_at = :now, updated_at = :now",
+                'ConditionExpression': "unread_count = :seen OR attribute_not_exists(unread_count)",
+                'ExpressionAttributeValues': typed({':zero': 0, ':now': now, ':seen': unread})
+            }
+        }]
+        other_user_id = item.get('other_user_id', {}).get('S')
+        if other_user_id and receipt:
+            transaction.append({
+                'Update': {
+                    'TableName': table_name,
+                    'Key': typed({'user_id': other_user_id, 'conversation_id': conversation_id}),
+                    'UpdateExpression': "SET other_read_at = :now, updated_at = :now",
+                    'ConditionExpression': "attribute_exists(user_id)",
+                    'ExpressionAttributeValues': typed({':now': now})
+                }
+            })
+        if unread:
+            transaction.append({
+                'Update': {
+                    'TableName': os.environ['COUNTER_TABLE_NAME'],
+                    'Key': typed({'counter_id': f"unread#{user_id}"}),
+                    'UpdateExpression': "ADD unread_total :dec",
+                    'ExpressionAttributeValues': typed({':dec': -unread})
+                }
+            })
+
+        try:
+            dynamodb_client.transact_write_items(TransactItems=transaction)
+            return unread
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException' or attempt == MAX_ATTEMPTS:
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            if receipt and len(reasons) > 1 and reasons[1].get('Code') == 'ConditionalCheckFailed':
+                # The other participant has no entry; retry without the receipt
+                receipt = False
+            # Otherwise a new message changed unread_count (or a conflict): re-read and retry
+
+def lambda_handler(event, context):
+    try:
+        # Handle CORS preflight
+        if event.get("requestContext", {}).get("http", {}).get("method") == "OPTIONS":
+            return build_response({"message": "ok"})
+
+        body = json.loads(event.get("body", "{}"))
+        user_id = body.get("user_id")
+        conversation_id = body.get("conversation_id")
+
+        if not user_id or not conversation_id:
+            return build_response({"error": "user_id and conversation_id are required"}, 400)
+
+        cleared = mark_read(user_id, conversation_id)
+        if cleared is None:
+            return build_response({"error": "Conversation not found"}, 404)
+
+        # Read receipt for the other participant's open chat window (best effort)
+        try:
+            publish(conversation_topic(conversation_id), 'read', {
+                'conversation_id': conversation_id,
+                'user_id': user_id
+            })
+        except Exception as e:
+            print(f"Push failed: {e}")
+
+        return build_response({'success': True, 'cleared': cleared})
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return build_response({'error': str(e)}, 500)
+
+def build_response(payload, status_code=200):
+    return {
+        'statusCode': status_code,
+        'body': dumps(payload)
+    }
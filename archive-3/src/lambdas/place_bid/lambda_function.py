@@ -1,16 +1,126 @@
 import json
 import os
+import time
+import random
 import boto3
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from botocore.exceptions import ClientError
 
-# Helper for Decimal serialization
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+# Provided by the common layer
+from ddb_json import dumps, from_dynamodb
+from push import publish, listing_topic
+
+MAX_ATTEMPTS = int(os.environ.get('BID_MAX_ATTEMPTS', 3))
+RETRYABLE_REASONS = {'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'}
+
+dynamodb_client = boto3.client('dynamodb')
+
+class BidRejected(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+def build_transaction(listing_id, created_at, bidder_id, amount, timestamp):
+    """Bid insert + listing update, applied together or not at all."""
+    return [
+        {
+            'Put': {
+                'TableName': os.environ['BIDS_TABLE_NAME'],
+                'Item': {
+                    'listing_id': {'S': listing_id},
+                    'timestamp': {'S': timestamp},
+                    'bidder_id': {'S': bidder_id},
+                    'amount': {'N': str(amount)}
+                },
+                'ConditionExpression': 'attribute_not_exists(listing_id)'
+            }
+        },
+        {
+            'Update': {
+                'TableName': os.environ['LISTINGS_TABLE_NAME'],
+                'Key': {'listing_id': {'S': listing_id}, 'created_at': {'S': created_at}},
+                'UpdateExpression': (
+                    'SET current_highest_bid = :amt, highest_bidder_id = :uid, '
+                    'bid_count = if_not_exists(bid_count, :zero) + :one'
+                ),
+                # The checks place_bid used to do after a get_item, now evaluated
+                # atomically with the write so concurrent bids cannot both pass.
+                # With no bid yet, the amount must reach the starting bid (or
+                # the price when there is none). The end time is compared as
+                # the normalized UTC auction_close_at (see auctions.py), which
+                # orders correctly as a string, unlike a raw auction_end_time
+                # with an offset; close_auctions removes it when it sets the
+                # status to closed.
+                'ConditionExpression': (
+                    'attribute_exists(listing_id) AND sale_type = :auction '
+                    'AND (current_highest_bid < :amt '
+                    'OR ((attribute_not_exists(current_highest_bid) OR attribute_type(current_highest_bid, :null_type)) '
+                    'AND (starting_bid <= :amt '
+                    'OR ((attribute_not_exists(starting_bid) OR attribute_type(starting_bid, :null_type)) '
+                    'AND (attribute_not_exists(price) OR price <= :amt))))) '
+                    'AND (attribute_not_exists(auction_status) OR auction_status <> :closed) '
+                    'AND (attribute_not_exists(auction_close_at) OR auction_close_at > :now)'
+                ),
+                'ExpressionAttributeValues': {
+                    ':amt': {'N': str(amount)},
+                    ':uid': {'S': bidder_id},
+                    ':zero': {'N': '0'},
+                    ':one': {'N': '1'},
+                    ':auction': {'S': 'auction'},
+                    ':null_type': {'S': 'NULL'},
+                    ':closed': {'S': 'closed'},
+                    ':now': {'S': timestamp}
+                },
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+            }
+        }
+    ]
+
+def explain_rejection(listing, now):
+    """Turn the listing returned by a failed condition into a client error."""
+    if not listing:
+        return BidRejected(404, 'Listing not found')
+    if listing.get('sale_type') != 'auction':
+        return BidRejected(400, 'Not an auction')
+    if listing.get('auction_status') == 'closed':
+        return BidRejected(400, 'Auction ended')
+    close_at = listing.get('auction_close_at')
+    if close_at and now >= close_at:
+        return BidRejected(400, 'Auction ended')
+    if listing.get('current_highest_bid') is not None:
+        return BidRejected(400, f"Bid must be higher than {listing['current_highest_bid']}")
+    minimum = listing.get('starting_bid') if listing.get('starting_bid') is not None else listing.get('price', 0)
+    return BidRejected(400, f'Bid must be at least {minimum}')
+
+def place_bid(listing_id, created_at, bidder_id, amount):
+    """One TransactWriteItems round trip; retried only on transient conflicts."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        timestamp = datetime.utcnow().isoformat()
+        try:
+            dynamodb_client.transact_write_items(
+                TransactItems=build_transaction(listing_id, created_at, bidder_id, amount, timestamp)
+            )
+            return timestamp
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            bid_reason = reasons[0] if reasons else {}
+            listing_reason = reasons[1] if len(reasons) > 1 else {}
+
+            if listing_reason.get('Code') == 'ConditionalCheckFailed':
+                raise explain_rejection(from_dynamodb(listing_reason.get('Item')), timestamp)
+
+            # Transient conflicts, or a same-microsecond bid on this listing
+            # (retried with a fresh timestamp)
+            retryable = (
+                bid_reason.get('Code') == 'ConditionalCheckFailed'
+                or any(r.get('Code') in RETRYABLE_REASONS for r in reasons)
+            )
+            if not retryable or attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0, 0.02 * 2 ** attempt))
 
 def lambda_handler(event, context):
     if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
@@ -25,74 +135,42 @@ def lambda_handler(event, context):
         }
 
     try:
-        listings_table_name = os.environ.get('LISTINGS_TABLE_NAME')
-        bids_table_name = os.environ.get('BIDS_TABLE_NAME')
-        
-        dynamodb = boto3.resource('dynamodb')
-        listings_table = dynamodb.Table(listings_table_name)
-        bids_table = dynamodb.Table(bids_table_name)
-
         body = json.loads(event.get('body', '{}'))
         listing_id = body.get('listing_id')
         created_at = body.get('created_at')
         bidder_id = body.get('bidder_id')
-        amount = Decimal(str(body.get('amount', 0)))
+        try:
+            amount = Decimal(str(body.get('amount', 0)))
+        except InvalidOperation:
+            amount = Decimal(0)
+        # json.loads accepts NaN and Infinity, which DynamoDB cannot store
+        if not amount.is_finite():
+            amount = Decimal(0)
 
         if not listing_id or not created_at or not bidder_id or amount <= 0:
             return {'statusCode': 400, 'body': json.dumps({'error': 'Invalid input'})}
 
-        # 1. Get current listing state
-        resp = listings_table.get_item(
-            Key={'listing_id': listing_id, 'created_at': created_at}
-        )
-        item = resp.get('Item')
-        
-        if not item:
-            return {'statusCode': 404, 'body': json.dumps({'error': 'Listing not found'})}
-
-        if item.get('sale_type') != 'auction':
-            return {'statusCode': 400, 'body': json.dumps({'error': 'Not an auction'})}
-
-        # Check time
-        auction_end = item.get('auction_end_time')
-        if auction_end and datetime.utcnow().isoformat() > auction_end:
-            return {'statusCode': 400, 'body': json.dumps({'error': 'Auction ended'})}
-
-        # Check amount
-        current_price = item.get('current_highest_bid') or item.get('starting_bid') or item.get('price', 0)
-        if amount <= current_price:
-            return {'statusCode': 400, 'body': json.dumps({'error': f'Bid must be higher than {current_price}'})}
-
-        # 2. Place Bid (Transaction ideally, but simple update for now)
-        # We record the bid first
-        timestamp = datetime.utcnow().isoformat()
-        bids_table.put_item(
-            Item={
+        try:
+            timestamp = place_bid(listing_id, created_at, bidder_id, amount)
+        except BidRejected as e:
+            return {'statusCode': e.status_code, 'body': json.dumps({'error': str(e)})}
+
+        # Live update for everyone watching the auction (best effort)
+        try:
+            publish(listing_topic(listing_id), 'bid', {
                 'listing_id': listing_id,
-                'timestamp': timestamp,
+                'amount': amount,
                 'bidder_id': bidder_id,
-                'amount': amount
-            }
-        )
-
-        # 3. Update Listing
-        listings_table.update_item(
-            Key={'listing_id': listing_id, 'created_at': created_at},
-            UpdateExpression="SET current_highest_bid = :amt, highest_bidder_id = :uid, bid_count = if_not_exists(bid_count, :start) + :inc",
-            ExpressionAttributeValues={
-                ':amt': amount,
-                ':uid': bidder_id,
-                ':start': 0,
-                ':inc': 1
-            }
-        )
+                'timestamp': timestamp
+            })
+        except Exception as e:
+            print(f"Push failed: {e}")
 
         return {
             'statusCode': 200,
-            'body': json.dumps({'success': True, 'new_price': amount}, cls=DecimalEncoder)
+            'body': dumps({'success': True, 'new_price': amount})
         }
 
     except Exception as e:
         print(f"Error: {e}")
         return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
-
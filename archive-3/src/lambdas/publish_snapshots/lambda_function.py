@@ -0,0 +1,172 @@
+import os
+import gzip
+import hashlib
+import re
+import boto3
+from datetime import datetime
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+
+# Provided by the common layer
+from ddb_json import dumps_bytes
+from search_index import all_facets, merge_sorted
+
+# Publishes static, gzip-compressed listing snapshots to the frontend bucket:
+#   <prefix>/manifest.json                 - page count, totals, generation time
+#   <prefix>/pages/page-0001.json ...      - newest-first listing cards
+#   <prefix>/neighborhoods/index.json      - neighborhood -> file + count
+#   <prefix>/neighborhoods/<slug>.json     - cards for one neighborhood
+# Only listings still on offer are published (no closed or ended auctions),
+# and cards leave out PRIVATE_FIELDS such as the owner's id.
+#
+# index_listings flags the snapshot dirty whenever listings change; this
+# function runs on a short schedule and only rebuilds when the flag is set,
+# so bursts of writes collapse into one publish per interval (debounce).
+
+SNAPSHOT_ID = 'listing_snapshot'
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))
+PREFIX = os.environ.get('SNAPSHOT_PREFIX', 'data/listings').strip('/')
+CACHE_CONTROL = os.environ.get('CACHE_CONTROL', 'public, max-age=60')
+PRIVATE_FIELDS = ('facet', 'owner_id')
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
+
+def slugify(name):
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    # Keep accented names distinct after the ASCII fold
+    return f"{slug}-{hashlib.md5(name.encode('utf-8')).hexdigest()[:6]}"
+
+def claim_dirty_flag(counter_table):
+    """Atomically clear the dirty flag; False if there is nothing to publish."""
+    try:
+        counter_table.update_item(
+            Key={'counter_id': SNAPSHOT_ID},
+            UpdateExpression="SET dirty = :f, published_at = :now",
+            ConditionExpression="dirty = :t",
+            ExpressionAttributeValues={':t': True, ':f': False, ':now': datetime.utcnow().isoformat()}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def mark_dirty(counter_table):
+    counter_table.update_item(
+        Key={'counter_id': SNAPSHOT_ID},
+        UpdateExpression="SET dirty = :t",
+        ExpressionAttributeValues={':t': True}
+    )
+
+def is_active(card, now):
+    if card.get('sale_type') != 'auction':
+        return True
+    if card.get('auction_status') == 'closed':
+        return False
+    return not card.get('auction_end_time') or card['auction_end_time'] > now
+
+def load_cards(now):
+    """Active listing cards, newest first, merged from the search index 'all' shards."""
+    table = dynamodb.Table(os.environ['SEARCH_INDEX_TABLE'])
+    shards = []
+    for facet in all_facets():
+        kwargs = {
+            'IndexName': 'created_at_index',
+            'KeyConditionExpression': Key('facet').eq(facet),
+            'ScanIndexForward': False,
+        }
+        cards = []
+        while True:
+            response = table.query(**kwargs)
+            for item in response.get('Items', []):
+                if not is_active(item, now):
+                    continue
+                for field in PRIVATE_FIELDS:
+                    item.pop(field, None)
+                cards.append(item)
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        shards.append(cards)
+    return merge_sorted(shards, 'created_at', descending=True)
+
+def build_objects(cards, generated_at):
+    """Map of S3 key -> JSON payload for a full snapshot."""
+    objects = {}
+    pages = [cards[i:i + PAGE_SIZE] for i in range(0, len(cards), PAGE_SIZE)] or [[]]
+    for n, page in enumerate(pages, start=1):
+        objects[f"{PREFIX}/pages/page-{n:04d}.json"] = {'page': n, 'listings': page}
+
+    by_neighborhood = {}
+    for card in cards:
+        by_neighborhood.setdefault(card.get('neighborhood', 'Unknown'), []).append(card)
+
+    neighborhood_index = {}
+    for name, nb_cards in by_neighborhood.items():
+        key = f"{PREFIX}/neighborhoods/{slugify(name)}.json"
+        objects[key] = {'neighborhood': name, 'listings': nb_cards}
+        neighborhood_index[name] = {'file': key, 'count': len(nb_cards)}
+    objects[f"{PREFIX}/neighborhoods/index.json"] = neighborhood_index
+
+    objects[f"{PREFIX}/manifest.json"] = {
+        'generated_at': generated_at,
+        'total': len(cards),
+        'page_size': PAGE_SIZE,
+        'pages': [f"{PREFIX}/pages/page-{n:04d}.json" for n in range(1, len(pages) + 1)],
+        'neighborhoods': f"{PREFIX}/neighborhoods/index.json"
+    }
+    return objects
+
+def existing_etags(bucket):
+    etags = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{PREFIX}/"):
+        for obj in page.get('Contents', []):
+            etags[obj['Key']] = obj['ETag'].strip('"')
+    return etags
+
+def publish(bucket, objects):
+    """Upload changed objects only and delete ones no longer in the snapshot."""
+    current = existing_etags(bucket)
+    uploaded = 0
+    for key, payload in objects.items():
+        raw = dumps_bytes(payload)
+        # mtime=0 keeps the gzip bytes (and so the ETag) stable for equal content
+        body = gzip.compress(raw, compresslevel=9, mtime=0)
+        if current.get(key) == hashlib.md5(body).hexdigest():
+            continue
+        s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType='application/json',
+            ContentEncoding='gzip',
+            CacheControl=CACHE_CONTROL
+        )
+        uploaded += 1
+
+    stale = [k for k in current if k not in objects]
+    for i in range(0, len(stale), 1000):
+        s3.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': k} for k in stale[i:i + 1000]]})
+
+    return uploaded, len(stale)
+
+def lambda_handler(event, context):
+    counter_table = dynamodb.Table(os.environ['COUNTER_TABLE_NAME'])
+
+    if not event.get('force') and not claim_dirty_flag(counter_table):
+        return {'published': False}
+
+    try:
+        now = datetime.utcnow().isoformat()
+        cards = load_cards(now)
+        objects = build_objects(cards, now)
+        uploaded, deleted = publish(os.environ['FRONTEND_BUCKET'], objects)
+    except Exception:
+        # Leave the snapshot dirty so the next run retries
+        mark_dirty(counter_table)
+        raise
+
+    print(f"Published {len(cards)} listings: {uploaded} objects uploaded, {deleted} deleted")
+    return {'published': True, 'listings': len(cards), 'uploaded': uploaded, 'deleted': deleted}
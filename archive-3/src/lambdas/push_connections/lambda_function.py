@@ -0,0 +1,71 @@
+import json
+import os
+import time
+import boto3
+from boto3.dynamodb.conditions import Key
+
+# Provided by the common layer
+from push import TOPIC_PREFIXES
+
+# WebSocket API routes for the live push channel.
+#   $connect       optional ?topics=listing#<id>,conversation#<id>
+#   subscribe      {"action": "subscribe", "topics": [...]}
+#   unsubscribe    {"action": "unsubscribe", "topics": [...]}
+#   $disconnect    drops every subscription of the connection
+# Subscriptions are (topic, connection_id) items; writers fan out with
+# push.publish. They expire with the API Gateway connection limit (2 hours).
+
+MAX_TOPICS = int(os.environ.get('MAX_TOPICS_PER_CONNECTION', 20))
+SUBSCRIPTION_TTL = 2 * 60 * 60
+
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.environ['PUSH_SUBSCRIPTIONS_TABLE'])
+
+def valid_topics(topics):
+    if isinstance(topics, str):
+        topics = topics.split(',')
+    return [t for t in (topics or []) if isinstance(t, str) and t.startswith(TOPIC_PREFIXES)][:MAX_TOPICS]
+
+def subscribe(connection_id, topics):
+    expires_at = int(time.time()) + SUBSCRIPTION_TTL
+    with table.batch_writer(overwrite_by_pkeys=['topic', 'connection_id']) as batch:
+        for topic in topics:
+            batch.put_item(Item={'topic': topic, 'connection_id': connection_id, 'expires_at': expires_at})
+
+def unsubscribe(connection_id, topics):
+    with table.batch_writer(overwrite_by_pkeys=['topic', 'connection_id']) as batch:
+        for topic in topics:
+            batch.delete_item(Key={'topic': topic, 'connection_id': connection_id})
+
+def connection_topics(connection_id):
+    resp = table.query(
+        IndexName='connection_id_index',
+        KeyConditionExpression=Key('connection_id').eq(connection_id)
+    )
+    return [item['topic'] for item in resp['Items']]
+
+def lambda_handler(event, context):
+    ctx = event.get('requestContext', {})
+    route = ctx.get('routeKey')
+    connection_id = ctx.get('connectionId')
+
+    try:
+        if route == '$connect':
+            params = event.get('queryStringParameters') or {}
+            subscribe(connection_id, valid_topics(params.get('topics')))
+        elif route == '$disconnect':
+            unsubscribe(connection_id, connection_topics(connection_id))
+        else:
+            body = json.loads(event.get('body') or '{}')
+            topics = valid_topics(body.get('topics'))
+            if body.get('action') == 'unsubscribe':
+                unsubscribe(connection_id, topics)
+            else:
+                current = connection_topics(connection_id)
+                subscribe(connection_id, topics[:max(0, MAX_TOPICS - len(current))])
+
+        return {'statusCode': 200, 'body': ''}
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
@@ -0,0 +1,57 @@
+import os
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+
+# Provided by the common layer
+from rollups import Rollup
+
+# Feeds the hourly/daily analytics rollups from the favorites and bids
+# table streams:
+#   favorites INSERT -> favorites, favorites REMOVE -> unfavorites
+#   bids INSERT      -> bids
+# Each listing's neighborhood is looked up once per batch, and the whole
+# batch is flushed as one ADD per touched (series, bucket). Views are rolled
+# up by aggregate_views.
+
+dynamodb = boto3.resource('dynamodb')
+deserializer = TypeDeserializer()
+
+def deserialize(image):
+    return {k: deserializer.deserialize(v) for k, v in image.items()} if image else None
+
+def interaction(record):
+    """(listing_id, timestamp, metric) for a stream record, or None if it isn't counted."""
+    is_bid = f":table/{os.environ['BIDS_TABLE_NAME']}/" in record.get('eventSourceARN', '')
+    change = record['dynamodb']
+    if record['eventName'] == 'INSERT':
+        item = deserialize(change['NewImage'])
+        metric = 'bids' if is_bid else 'favorites'
+        return item['listing_id'], item.get('timestamp') or change['ApproximateCreationDateTime'], metric
+    if record['eventName'] == 'REMOVE' and not is_bid:
+        keys = deserialize(change['Keys'])
+        return keys['listing_id'], change['ApproximateCreationDateTime'], 'unfavorites'
+    return None
+
+def neighborhoods(listing_ids):
+    listings_table = dynamodb.Table(os.environ['LISTINGS_TABLE_NAME'])
+    found = {}
+    for listing_id in listing_ids:
+        resp = listings_table.query(
+            KeyConditionExpression=Key('listing_id').eq(listing_id),
+            ProjectionExpression='neighborhood',
+            Limit=1
+        )
+        found[listing_id] = resp['Items'][0].get('neighborhood') if resp['Items'] else None
+    return found
+
+def lambda_handler(event, context):
+    events = [e for e in map(interaction, event.get('Records', [])) if e]
+    by_listing = neighborhoods({listing_id for listing_id, _, _ in events})
+
+    rollup = Rollup()
+    for listing_id, timestamp, metric in events:
+        rollup.add(listing_id, by_listing[listing_id], timestamp, metric)
+    written = rollup.flush(dynamodb.Table(os.environ['LISTING_STATS_TABLE']))
+
+    return {'processed': len(event.get('Records', [])), 'counted': len(events), 'writes': written}
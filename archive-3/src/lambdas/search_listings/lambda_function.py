@@ -0,0 +1,263 @@
+import json
+import os
+import boto3
+from decimal import Decimal, InvalidOperation
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+
+# Provided by the common layer
+from pagination import encode_cursor, decode_cursor
+from ddb_json import dumps
+from search_index import all_facets
+
+# Faceted listing search over the index maintained by index_listings.
+# The most selective facet (neighborhood, then AI status) picks the
+# partition and the sort key picks its LSI, so only that facet is read.
+# Unfaceted searches read every all#<n> shard in sort order and merge them;
+# their cursor holds one resume key per shard.
+
+SORT_INDEXES = {
+    'price': 'price_index',
+    'price_per_sqm': 'price_per_sqm_index',
+    'created_at': 'created_at_index',
+    'diff_pct': 'diff_pct_index',
+}
+VALID_STATUSES = {'Good Deal', 'Fair Price', 'Overpriced', 'Pending', 'Unknown'}
+NUMERIC_SORTS = {'price', 'price_per_sqm', 'diff_pct'}
+VALID_SALE_TYPES = {'fixed', 'auction'}
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+MAX_READS_PER_PAGE = 5
+
+dynamodb = boto3.resource('dynamodb')
+
+def parse_number(params, name):
+    if params.get(name) in (None, ''):
+        return None
+    try:
+        number = Decimal(params[name])
+    except InvalidOperation:
+        raise ValueError(f'{name} must be a number')
+    # Decimal accepts NaN and Infinity, which DynamoDB rejects
+    if not number.is_finite():
+        raise ValueError(f'{name} must be a number')
+    return number
+
+def parse_filters(params):
+    filters = {
+        'neighborhood': params.get('neighborhood') or None,
+        'status': params.get('status') or None,
+        'sale_type': params.get('sale_type') or None,
+        'min_price': parse_number(params, 'min_price'),
+        'max_price': parse_number(params, 'max_price'),
+        'min_bedrooms': parse_number(params, 'min_bedrooms'),
+        'min_sqm': parse_number(params, 'min_sqm'),
+        'sort': params.get('sort', 'created_at'),
+        'order': params.get('order', 'desc'),
+    }
+    if filters['status'] and filters['status'] not in VALID_STATUSES:
+        raise ValueError(f"status must be one of {sorted(VALID_STATUSES)}")
+    if filters['sale_type'] and filters['sale_type'] not in VALID_SALE_TYPES:
+        raise ValueError(f"sale_type must be one of {sorted(VALID_SALE_TYPES)}")
+    if filters['sort'] not in SORT_INDEXES:
+        raise ValueError(f"sort must be one of {sorted(SORT_INDEXES)}")
+    if filters['order'] not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    return filters
+
+def choose_facet(filters):
+    """The facet partition to read, or None for every listing (all shards)."""
+    if filters['neighborhood']:
+        return f"nb#{filters['neighborhood']}"
+    if filters['status']:
+        return f"status#{filters['status']}"
+    return None
+
+def build_query(filters, facet):
+    """Query on the sort key's LSI, with price bounds pushed into the key condition when possible."""
+    key_condition = Key('facet').eq(facet)
+    conditions = []
+
+    min_price, max_price = filters['min_price'], filters['max_price']
+    if filters['sort'] == 'price' and (min_price is not None or max_price is not None):
+        if min_price is not None and max_price is not None:
+            key_condition = key_condition & Key('price').between(min_price, max_price)
+        elif min_price is not None:
+            key_condition = key_condition & Key('price').gte(min_price)
+        else:
+            key_condition = key_condition & Key('price').lte(max_price)
+    else:
+        if min_price is not None:
+            conditions.append(Attr('price').gte(min_price))
+        if max_price is not None:
+            conditions.append(Attr('price').lte(max_price))
+
+    if filters['status'] and not facet.startswith('status#'):
+        conditions.append(Attr('status').eq(filters['status']))
+    if filters['sale_type']:
+        conditions.append(Attr('sale_type').eq(filters['sale_type']))
+    if filters['min_bedrooms'] is not None:
+        conditions.append(Attr('bedrooms').gte(filters['min_bedrooms']))
+    if filters['min_sqm'] is not None:
+        conditions.append(Attr('sqm').gte(filters['min_sqm']))
+
+    kwargs = {
+        'IndexName': SORT_INDEXES[filters['sort']],
+        'KeyConditionExpression': key_condition,
+        'ScanIndexForward': filters['order'] == 'asc',
+    }
+    if conditions:
+        filter_expr = conditions[0]
+        for condition in conditions[1:]:
+            filter_expr = filter_expr & condition
+        kwargs['FilterExpression'] = filter_expr
+    return kwargs
+
+def query_facet(table, kwargs, limit):
+    """One facet: returns (cards, LastEvaluatedKey to resume from)."""
+    # Residual filters can thin out a read, so keep reading until the page
+    # is full. Limit never exceeds what is still needed, which keeps the
+    # cursor exact.
+    results, last_key = [], None
+    for _ in range(MAX_READS_PER_PAGE):
+        response = table.query(Limit=limit - len(results), **kwargs)
+        results.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or len(results) >= limit:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+    return results, last_key
+
+def query_all_shards(table, filters, limit, positions):
+    """
+    Every listing: merges the all#<n> shards, each read in sort order.
+    positions maps shard -> resume key ({} = from the start); shards missing
+    from it are exhausted. Returns (cards, positions for the next page).
+    """
+    sort = filters['sort']
+    descending = filters['order'] == 'desc'
+    shards = {
+        facet: {'position': position, 'next': position, 'buffer': [], 'more': True}
+        for facet, position in positions.items()
+    }
+
+    results, reads = [], 0
+    budget = MAX_READS_PER_PAGE * max(len(shards), 1)
+    while len(results) < limit:
+        for facet, shard in shards.items():
+            while not shard['buffer'] and shard['more'] and reads < budget:
+                kwargs = build_query(filters, facet)
+                if shard['next']:
+                    kwargs['ExclusiveStartKey'] = shard['next']
+                response = table.query(Limit=limit - len(results), **kwargs)
+                reads += 1
+                shard['buffer'] = response.get('Items', [])
+                shard['next'] = response.get('LastEvaluatedKey')
+                shard['more'] = bool(shard['next'])
+                if not shard['buffer']:
+                    # Everything read was filtered out: resume after it
+                    shard['position'] = shard['next']
+
+        # A shard we could not read (budget spent) might hold the next card
+        if any(not s['buffer'] and s['more'] for s in shards.values()):
+            break
+        heads = [s for s in shards.values() if s['buffer']]
+        if not heads:
+            break
+        pick = max if descending else min
+        shard = pick(heads, key=lambda s: s['buffer'][0][sort])
+        card = shard['buffer'].pop(0)
+        results.append(card)
+        if shard['buffer']:
+            shard['position'] = {'facet': card['facet'], 'listing_id': card['listing_id'], sort: card[sort]}
+        else:
+            shard['position'] = shard['next']
+
+    return results, {f: s['position'] for f, s in shards.items() if s['position'] is not None}
+
+def check_start_key(key, facet, sort):
+    """A resume key must be a key of the sort's LSI, within the facet being read."""
+    if not isinstance(key, dict) or set(key) != {'facet', 'listing_id', sort}:
+        raise ValueError('Invalid cursor')
+    if key['facet'] != facet or not isinstance(key['listing_id'], str):
+        raise ValueError('Invalid cursor')
+    value = key[sort]
+    if sort in NUMERIC_SORTS:
+        if not isinstance(value, Decimal) or not value.is_finite():
+            raise ValueError('Invalid cursor')
+    elif not isinstance(value, str):
+        raise ValueError('Invalid cursor')
+    return key
+
+def parse_facet_cursor(cursor, facet, sort):
+    return check_start_key(decode_cursor(cursor), facet, sort)
+
+def parse_shard_cursor(cursor, sort):
+    state = decode_cursor(cursor)
+    shards = state.get('shards') if isinstance(state, dict) else None
+    if not isinstance(shards, dict) or not set(shards) <= set(all_facets()):
+        raise ValueError('Invalid cursor')
+    for facet, position in shards.items():
+        # {} = shard not started yet
+        if position != {}:
+            check_start_key(position, facet, sort)
+    return shards
+
+def lambda_handler(event, context):
+    if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Allow-Headers': '*'
+            },
+            'body': ''
+        }
+
+    try:
+        params = event.get('queryStringParameters', {}) or {}
+        try:
+            filters = parse_filters(params)
+            limit = max(1, min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+            facet = choose_facet(filters)
+            if facet:
+                kwargs = build_query(filters, facet)
+                if params.get('cursor'):
+                    kwargs['ExclusiveStartKey'] = parse_facet_cursor(params['cursor'], facet, filters['sort'])
+            elif params.get('cursor'):
+                positions = parse_shard_cursor(params['cursor'], filters['sort'])
+            else:
+                positions = {shard: {} for shard in all_facets()}
+        except ValueError as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+        table = dynamodb.Table(os.environ['SEARCH_INDEX_TABLE'])
+
+        try:
+            if facet:
+                results, last_key = query_facet(table, kwargs, limit)
+            else:
+                results, positions = query_all_shards(table, filters, limit, positions)
+                last_key = {'shards': positions} if positions else None
+        except ClientError as e:
+            # A well-formed cursor DynamoDB still rejects as a start key
+            if params.get('cursor') and e.response['Error']['Code'] == 'ValidationException':
+                return {'statusCode': 400, 'body': json.dumps({'error': 'Invalid cursor'})}
+            raise
+
+        for item in results:
+            item.pop('facet', None)
+
+        return {
+            'statusCode': 200,
+            'body': dumps({
+                'listings': results,
+                'count': len(results),
+                'next_cursor': encode_cursor(last_key)
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key, Attr
+
+# Provided by the common layer
+from geo import GEO_CELL_PRECISION, covering_cells, geo_attributes, haversine_km, radius_bbox
+from ddb_json import dumps
+
+GEO_INDEX = 'geo_cell_index'
+# Larger radii would need more than geo.MAX_QUERY_CELLS partition-level cells
+MAX_RADIUS_KM = float(os.environ.get('MAX_RADIUS_KM', 7))
+MAX_RESULTS = 200
+QUERY_WORKERS = 8
+
+# boto3 resources are not thread-safe: one session per query worker
+_local = threading.local()
+
+def worker_table():
+    if not hasattr(_local, 'table'):
+        _local.table = boto3.session.Session().resource('dynamodb').Table(os.environ.get('TABLE_NAME'))
+    return _local.table
+
+def query_cell(table, cell):
+    """All listings whose geohash starts with `cell` (one partition, a key range)."""
+    condition = Key('geo_cell').eq(cell[:GEO_CELL_PRECISION])
+    if len(cell) > GEO_CELL_PRECISION:
+        condition = condition & Key('geohash').begins_with(cell)
+
+    kwargs = {'IndexName': GEO_INDEX, 'KeyConditionExpression': condition}
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def backfill(table):
+    """Add geohash/geo_cell to listings written before the geo index (one-off)."""
+    updated = 0
+    kwargs = {
+        'FilterExpression': Attr('geohash').not_exists(),
+        'ProjectionExpression': 'listing_id, created_at, coordinates'
+    }
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            attributes = geo_attributes(item.get('coordinates'))
+            if not attributes:
+                continue
+            table.update_item(
+                Key={'listing_id': item['listing_id'], 'created_at': item['created_at']},
+                UpdateExpression="SET geohash = :gh, geo_cell = :cell",
+                ConditionExpression="attribute_exists(listing_id)",
+                ExpressionAttributeValues={':gh': attributes['geohash'], ':cell': attributes['geo_cell']}
+            )
+            updated += 1
+        if 'LastEvaluatedKey' not in response:
+            return updated
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def parse_area(params):
+    """Return (bbox, centre, radius_km) from radius or bounding-box parameters."""
+    if params.get('radius_km') is not None:
+        lat, lon = float(params['lat']), float(params['lon'])
+        radius_km = float(params['radius_km'])
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError(f'radius_km must be in (0, {MAX_RADIUS_KM}]')
+        return radius_bbox(lat, lon, radius_km), (lat, lon), radius_km
+
+    bbox = tuple(float(params[k]) for k in ('min_lat', 'min_lon', 'max_lat', 'max_lon'))
+    if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+        raise ValueError('min_lat/min_lon must not exceed max_lat/max_lon')
+    centre = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+    if haversine_km(bbox[0], bbox[1], bbox[2], bbox[3]) > 2 * MAX_RADIUS_KM:
+        raise ValueError('Bounding box too large')
+    return bbox, centre, None
+
+def lambda_handler(event, context):
+    if event.get('backfill'):
+        return {'updated': backfill(boto3.resource('dynamodb').Table(os.environ.get('TABLE_NAME')))}
+
+    if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Allow-Headers': '*'
+            },
+            'body': ''
+        }
+
+    try:
+        params = event.get('queryStringParameters', {}) or {}
+        try:
+            bbox, centre, radius_km = parse_area(params)
+            limit = min(int(params.get('limit', 50)), MAX_RESULTS)
+            cells = covering_cells(*bbox)
+        except (KeyError, ValueError) as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': f'Invalid search area: {e}'})}
+
+        with ThreadPoolExecutor(max_workers=QUERY_WORKERS) as pool:
+            per_cell = list(pool.map(lambda cell: list(query_cell(worker_table(), cell)), cells))
+
+        # Cells only approximate the area: post-filter on exact position
+        results = []
+        for items in per_cell:
+            for item in items:
+                coords = item.get('coordinates') or {}
+                lat = float(coords.get('lat', 0))
+                lon = float(coords.get('lon', coords.get('lng', 0)))
+                distance = haversine_km(centre[0], centre[1], lat, lon)
+                if radius_km is not None:
+                    if distance > radius_km:
+                        continue
+                elif not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
+                    continue
+                item['distance_km'] = round(distance, 3)
+                results.append(item)
+
+        results.sort(key=lambda x: x['distance_km'])
+        results = results[:limit]
+
+        return {
+            'statusCode': 200,
+            'body': dumps({
+                'listings': results,
+                'count': len(results),
+                'cells_queried': len(cells)
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
@@ -1,12 +1,114 @@
 import json
 import os
+import time
 import boto3
 from datetime import datetime
-from decimal import Decimal
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer
 
-dynamodb = boto3.resource('dynamodb')
-conversations_table = dynamodb.Table(os.environ['CONVERSATIONS_TABLE'])
-user_conversations_table = dynamodb.Table(os.environ['USER_CONVERSATIONS_TABLE'])
+# Provided by the common layer
+from ddb_json import dumps
+from push import publish, conversation_topic, user_topic
+
+MAX_ATTEMPTS = 3
+# Messages move to the S3 archive (archive_messages) once the TTL expires
+HOT_DAYS = int(os.environ.get('MESSAGE_HOT_DAYS', 90))
+PREVIEW_LENGTH = 120
+RETRYABLE_REASONS = {'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'}
+
+dynamodb_client = boto3.client('dynamodb')
+serializer = TypeSerializer()
+
+def typed(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def index_update(user_id, conversation_id, other_user_id, timestamp, message,
+                 sender_id, listing_id, listing_address, listing_neighborhood, is_sender):
+    """Upsert of one participant's (user_id, conversation_id) index item."""
+    update = (
+        "SET other_user_id = :other, listing_id = :lid, listing_address = :addr, "
+        "listing_neighborhood = :nb, last_message_timestamp = :ts, last_message = :preview, "
+        "last_sender_id = :sender, updated_at = :ts"
+    )
+    values = {
+        ':other': other_user_id,
+        ':lid': listing_id,
+        ':addr': listing_address,
+        ':nb': listing_neighborhood,
+        ':ts': timestamp,
+        ':preview': message[:PREVIEW_LENGTH],
+        ':sender': sender_id
+    }
+    if is_sender:
+        update += ", unread_count = if_not_exists(unread_count, :zero)"
+        values[':zero'] = 0
+    else:
+        update += " ADD unread_count :one"
+        values[':one'] = 1
+
+    return {
+        'Update': {
+            'TableName': os.environ['USER_CONVERSATIONS_TABLE'],
+            'Key': typed({'user_id': user_id, 'conversation_id': conversation_id}),
+            'UpdateExpression': update,
+            'ExpressionAttributeValues': typed(values)
+        }
+    }
+
+def unread_total_update(user_id):
+    """Recipient's total-unread badge counter (read by get_unread_count)."""
+    return {
+        'Update': {
+            'TableName': os.environ['COUNTER_TABLE_NAME'],
+            'Key': typed({'counter_id': f"unread#{user_id}"}),
+            'UpdateExpression': "ADD unread_total :one",
+            'ExpressionAttributeValues': typed({':one': 1})
+        }
+    }
+
+def write_message(conversation_id, sender_id, owner_id, message, listing_id, listing_address, listing_neighborhood):
+    """Message, both participants' index entries and the badge counter in one transaction."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        shared = dict(
+            conversation_id=conversation_id, timestamp=timestamp, message=message, sender_id=sender_id,
+            listing_id=listing_id, listing_address=listing_address, listing_neighborhood=listing_neighborhood
+        )
+        try:
+            dynamodb_client.transact_write_items(TransactItems=[
+                {
+                    'Put': {
+                        'TableName': os.environ['CONVERSATIONS_TABLE'],
+                        'Item': typed({
+                            'conversation_id': conversation_id,
+                            'timestamp': timestamp,
+                            'sender_id': sender_id,
+                            'message': message,
+                            'listing_id': listing_id,
+                            'listing_address': listing_address,
+                            'listing_neighborhood': listing_neighborhood,
+                            'expires_at': int(time.time()) + HOT_DAYS * 86400
+                        }),
+                        'ConditionExpression': 'attribute_not_exists(conversation_id)'
+                    }
+                },
+                index_update(user_id=sender_id, other_user_id=owner_id, is_sender=True, **shared),
+                index_update(user_id=owner_id, other_user_id=sender_id, is_sender=False, **shared),
+                unread_total_update(owner_id)
+            ])
+            return timestamp
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            # Conflicts, or another message in this conversation in the same
+            # microsecond (retried with a fresh timestamp)
+            retryable = any(
+                r.get('Code') in RETRYABLE_REASONS or r.get('Code') == 'ConditionalCheckFailed'
+                for r in reasons
+            )
+            if not retryable or attempt == MAX_ATTEMPTS:
+                raise
 
 def lambda_handler(event, context):
     try:
@@ -15,7 +117,7 @@ def lambda_handler(event, context):
             return build_response({"message": "ok"})
 
         body = json.loads(event.get("body", "{}"))
-        
+
         # Extract parameters
         sender_id = body.get("sender_id")
         listing_id = body.get("listing_id")
@@ -23,119 +125,49 @@ def lambda_handler(event, context):
         message = body.get("message", "").strip()
         listing_address = body.get("listing_address", "")
         listing_neighborhood = body.get("listing_neighborhood", "")
-        
+
         # Validation
         if not all([sender_id, listing_id, owner_id, message]):
             return build_response({"error": "Missing required fields"}, 400)
-        
+        if sender_id == owner_id:
+            return build_response({"error": "Cannot message yourself"}, 400)
+
         # Create conversation_id (sorted to ensure consistency)
         participants = sorted([sender_id, owner_id])
         conversation_id = f"listing_{listing_id}_{participants[0]}_{participants[1]}"
-        
-        timestamp = datetime.utcnow().isoformat() + "Z"
-        
-        # Store message in conversations table
-        conversations_table.put_item(Item={
-            'conversation_id': conversation_id,
-            'timestamp': timestamp,
-            'sender_id': sender_id,
-            'message': message,
-            'listing_id': listing_id,
-            'listing_address': listing_address,
-            'listing_neighborhood': listing_neighborhood
-        })
-        
-        # Update user_conversations index for sender
-        update_user_conversation(
-            user_id=sender_id,
-            conversation_id=conversation_id,
-            other_user_id=owner_id,
-            timestamp=timestamp,
-            listing_address=listing_address,
-            listing_neighborhood=listing_neighborhood,
-            is_sender=True
-        )
-        
-        # Update user_conversations index for recipient
-        update_user_conversation(
-            user_id=owner_id,
-            conversation_id=conversation_id,
-            other_user_id=sender_id,
-            timestamp=timestamp,
-            listing_address=listing_address,
-            listing_neighborhood=listing_neighborhood,
-            is_sender=False
+
+        # Store the message and update both participants' conversation index
+        timestamp = write_message(
+            conversation_id, sender_id, owner_id, message,
+            listing_id, listing_address, listing_neighborhood
         )
-        
+
+        # Live delivery to open chat windows and the recipient's inbox (best effort)
+        try:
+            pushed = {
+                'conversation_id': conversation_id,
+                'timestamp': timestamp,
+                'sender_id': sender_id,
+                'message': message,
+                'listing_id': listing_id
+            }
+            publish(conversation_topic(conversation_id), 'message', pushed)
+            publish(user_topic(owner_id), 'message', pushed)
+        except Exception as e:
+            print(f"Push failed: {e}")
+
         return build_response({
             'success': True,
             'conversation_id': conversation_id,
             'timestamp': timestamp
         })
-        
+
     except Exception as e:
         print(f"Error: {e}")
         return build_response({'error': str(e)}, 500)
 
-def update_user_conversation(user_id, conversation_id, other_user_id, timestamp, 
-                             listing_address, listing_neighborhood, is_sender):
-    """Update or create user conversation index entry"""
-    try:
-        # Try to get existing conversation
-        response = user_conversations_table.get_item(
-            Key={
-                'user_id': user_id,
-                'last_message_timestamp': timestamp
-            }
-        )
-        
-        # Check if conversation exists for this user
-        existing = None
-        try:
-            query_response = user_conversations_table.query(
-                KeyConditionExpression='user_id = :uid',
-                FilterExpression='conversation_id = :cid',
-                ExpressionAttributeValues={
-                    ':uid': user_id,
-                    ':cid': conversation_id
-                },
-                Limit=1
-            )
-            if query_response['Items']:
-                existing = query_response['Items'][0]
-        except:
-            pass
-        
-        # Delete old entry if exists (to update timestamp)
-        if existing:
-            user_conversations_table.delete_item(
-                Key={
-                    'user_id': user_id,
-                    'last_message_timestamp': existing['last_message_timestamp']
-                }
-            )
-        
-        # Create new entry with updated timestamp
-        unread_count = 0 if is_sender else (existing.get('unread_count', 0) + 1 if existing else 1)
-        
-        user_conversations_table.put_item(Item={
-            'user_id': user_id,
-            'last_message_timestamp': timestamp,
-            'conversation_id': conversation_id,
-            'other_user_id': other_user_id,
-            'listing_address': listing_address,
-            'listing_neighborhood': listing_neighborhood,
-            'unread_count': unread_count
-        })
-        
-    except Exception as e:
-        print(f"Error updating user conversation: {e}")
-        # Don't fail the whole request if index update fails
-        pass
-
 def build_response(payload, status_code=200):
     return {
         'statusCode': status_code,
-        'body': json.dumps(payload, default=str)
+        'body': dumps(payload)
     }
-
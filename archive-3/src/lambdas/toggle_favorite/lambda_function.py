@@ -2,7 +2,129 @@ import json
 import os
 import boto3
 from datetime import datetime
+from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer
+
+# A favorite and the listing's favorite_count change together in one
+# transaction: adding is a put conditioned on the favorite not existing,
+# removing a delete conditioned on it existing (and having been counted), so
+# double clicks and concurrent tabs can't double-count. A toggle tries the add first and falls
+# back to the remove when the favorite is already there. Clients can send
+# "favorited": true/false instead to set the state idempotently.
+
+MAX_ATTEMPTS = 3
+
+dynamodb = boto3.resource('dynamodb')
+dynamodb_client = boto3.client('dynamodb')
+serializer = TypeSerializer()
+
+def typed(values):
+    return {k: serializer.serialize(v) for k, v in values.items()}
+
+def resolve_created_at(listing_id):
+    response = dynamodb.Table(os.environ['LISTINGS_TABLE_NAME']).query(
+        KeyConditionExpression=Key('listing_id').eq(listing_id),
+        ProjectionExpression='created_at',
+        Limit=1
+    )
+    return response['Items'][0]['created_at'] if response['Items'] else None
+
+def count_update(listing_id, created_at, delta):
+    return {
+        'Update': {
+            'TableName': os.environ['LISTINGS_TABLE_NAME'],
+            'Key': typed({'listing_id': listing_id, 'created_at': created_at}),
+            'UpdateExpression': "ADD favorite_count :d",
+            'ConditionExpression': "attribute_exists(listing_id)",
+            'ExpressionAttributeValues': typed({':d': delta})
+        }
+    }
+
+class ListingNotFound(Exception):
+    pass
+
+def cancellation_codes(error):
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        raise error
+    return [r.get('Code') for r in error.response.get('CancellationReasons', [])]
+
+def add_favorite(user_id, listing_id, created_at):
+    """False if the favorite already exists."""
+    try:
+        dynamodb_client.transact_write_items(TransactItems=[
+            {
+                'Put': {
+                    'TableName': os.environ['TABLE_NAME'],
+                    'Item': typed({
+                        'user_id': user_id,
+                        'listing_id': listing_id,
+                        'created_at': created_at,
+                        'timestamp': datetime.utcnow().isoformat(),
+                        'counted': True
+                    }),
+                    'ConditionExpression': "attribute_not_exists(listing_id)"
+                }
+            },
+            count_update(listing_id, created_at, 1)
+        ])
+        return True
+    except ClientError as e:
+        codes = cancellation_codes(e)
+        if codes[0] == 'ConditionalCheckFailed':
+            return False
+        if len(codes) > 1 and codes[1] == 'ConditionalCheckFailed':
+            raise ListingNotFound()
+        raise
+
+def remove_favorite(user_id, listing_id, created_at):
+    """False if there was no favorite to remove."""
+    key = {'user_id': user_id, 'listing_id': listing_id}
+    try:
+        dynamodb_client.transact_write_items(TransactItems=[
+            {
+                'Delete': {
+                    'TableName': os.environ['TABLE_NAME'],
+                    'Key': typed(key),
+                    'ConditionExpression': "attribute_exists(counted)"
+                }
+            },
+            count_update(listing_id, created_at, -1)
+        ])
+        return True
+    except ClientError as e:
+        if 'ConditionalCheckFailed' not in cancellation_codes(e):
+            raise
+
+    # Favorites saved before favorite_count existed (or whose listing is
+    # gone) were never counted: delete without touching the count
+    try:
+        dynamodb.Table(os.environ['TABLE_NAME']).delete_item(
+            Key=key,
+            ConditionExpression="attribute_exists(listing_id)"
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+def set_favorite(user_id, listing_id, created_at, favorited):
+    """Returns the resulting state; favorited=None toggles."""
+    if favorited is True:
+        add_favorite(user_id, listing_id, created_at)
+        return True
+    if favorited is False:
+        remove_favorite(user_id, listing_id, created_at)
+        return False
+
+    for _ in range(MAX_ATTEMPTS):
+        if add_favorite(user_id, listing_id, created_at):
+            return True
+        if remove_favorite(user_id, listing_id, created_at):
+            return False
+        # Removed by another request between the two attempts
+    raise RuntimeError('Favorite state kept changing; try again')
 
 def lambda_handler(event, context):
     # CORS Preflight
@@ -18,44 +140,25 @@ def lambda_handler(event, context):
         }
 
     try:
-        table_name = os.environ.get('TABLE_NAME')
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
-
         body = json.loads(event.get('body', '{}'))
         user_id = body.get('user_id')
         listing_id = body.get('listing_id')
+        created_at = body.get('created_at')  # listing sort key, for hydrated favorites
+        favorited = body.get('favorited')
 
         if not user_id or not listing_id:
             return {'statusCode': 400, 'body': json.dumps({'error': 'Missing user_id or listing_id'})}
+        if favorited is not None and not isinstance(favorited, bool):
+            return {'statusCode': 400, 'body': json.dumps({'error': 'favorited must be true or false'})}
 
-        # Check if already exists
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'listing_id': listing_id
-            }
-        )
+        created_at = created_at or resolve_created_at(listing_id)
+        if not created_at:
+            return {'statusCode': 404, 'body': json.dumps({'error': 'Listing not found'})}
 
-        if 'Item' in response:
-            # Remove favorite
-            table.delete_item(
-                Key={
-                    'user_id': user_id,
-                    'listing_id': listing_id
-                }
-            )
-            is_favorited = False
-        else:
-            # Add favorite
-            table.put_item(
-                Item={
-                    'user_id': user_id,
-                    'listing_id': listing_id,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-            )
-            is_favorited = True
+        try:
+            is_favorited = set_favorite(user_id, listing_id, created_at, favorited)
+        except ListingNotFound:
+            return {'statusCode': 404, 'body': json.dumps({'error': 'Listing not found'})}
 
         return {
             'statusCode': 200,
@@ -72,4 +175,3 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
-
@@ -1,8 +1,35 @@
+import hashlib
 import json
 import os
 import boto3
 from datetime import datetime
-from botocore.exceptions import ClientError
+
+# Page views are only enqueued here; aggregate_views folds each SQS batch
+# into one ADD per listing, so a popular listing no longer takes a write
+# per page view.
+
+def enqueue_view(message):
+    """SQS in AWS; without a queue (local/dev), a fire-and-forget invoke of the aggregator."""
+    queue_url = os.environ.get('VIEW_QUEUE_URL')
+    if queue_url:
+        boto3.client('sqs').send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
+        return
+
+    aggregator_func = os.environ.get('VIEW_AGGREGATOR_FUNC')
+    if aggregator_func:
+        boto3.client('lambda').invoke(
+            FunctionName=aggregator_func,
+            InvocationType='Event',
+            Payload=json.dumps({'views': [message]})
+        )
+
+def anonymous_visitor(event):
+    """Stable pseudonymous id for a signed-out visitor (hashed IP + user agent), or None."""
+    http = event.get('requestContext', {}).get('http', {})
+    if not http.get('sourceIp'):
+        return None
+    fingerprint = f"{http['sourceIp']}|{http.get('userAgent', '')}"
+    return 'anon#' + hashlib.sha256(fingerprint.encode()).hexdigest()[:20]
 
 def lambda_handler(event, context):
     if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
@@ -17,67 +44,17 @@ def lambda_handler(event, context):
         }
 
     try:
-        listings_table_name = os.environ.get('LISTINGS_TABLE_NAME')
-        views_table_name = os.environ.get('VIEWS_TABLE_NAME')
-        
-        dynamodb = boto3.resource('dynamodb')
-        listings_table = dynamodb.Table(listings_table_name)
-        views_table = dynamodb.Table(views_table_name)
-
         body = json.loads(event.get('body', '{}'))
         listing_id = body.get('listing_id')
-        created_at = body.get('created_at') # Required for PK
-        viewer_id = body.get('viewer_id')
 
         if not listing_id:
             return {'statusCode': 400, 'body': json.dumps({'error': 'Missing listing_id'})}
-            
-        # Fallback: if created_at is missing, we must Query to find it (expensive but safe)
-        if not created_at:
-            resp = listings_table.query(
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('listing_id').eq(listing_id)
-            )
-            if not resp['Items']:
-                return {'statusCode': 404, 'body': json.dumps({'error': 'Listing not found'})}
-            created_at = resp['Items'][0]['created_at']
 
-        # 1. Record view (same logic)
-        timestamp = datetime.utcnow().isoformat()
-        is_unique = False
-        
-        try:
-            views_table.put_item(
-                Item={
-                    'listing_id': listing_id,
-                    'viewer_id': viewer_id or f'anon_{timestamp}', # Ensure unique SK if anonymous
-                    'timestamp': timestamp
-                },
-                ConditionExpression='attribute_not_exists(viewer_id)'
-            )
-            is_unique = True
-        except ClientError as e:
-            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
-                pass # Already viewed
-            else:
-                # If anonymous, we might want to count it as unique? 
-                # For now, assuming viewer_id is consistent for users.
-                pass
-
-        # 2. Update counters
-        update_expr = "SET view_count = if_not_exists(view_count, :start) + :inc"
-        expr_values = {':inc': 1, ':start': 0}
-        
-        if is_unique:
-            update_expr += ", unique_view_count = if_not_exists(unique_view_count, :start) + :inc"
-
-        listings_table.update_item(
-            Key={
-                'listing_id': listing_id,
-                'created_at': created_at
-            },
-            UpdateExpression=update_expr,
-            ExpressionAttributeValues=expr_values
-        )
+        enqueue_view({
+            'listing_id': listing_id,
+            'viewer_id': body.get('viewer_id') or anonymous_visitor(event),
+            'viewed_at': datetime.utcnow().isoformat()
+        })
 
         return {'statusCode': 200, 'body': json.dumps({'success': True})}
 
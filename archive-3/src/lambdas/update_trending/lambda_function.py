@@ -0,0 +1,143 @@
+import os
+import time
+import boto3
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+
+# Provided by the common layer
+from ddb_json import to_dynamo
+from trending import (
+    CITYWIDE, board_key, listing_key, decayed, points, expires_at, merge_board
+)
+
+# Maintains the trending table from the listing_stats stream (hourly
+# listing buckets written by the analytics rollups):
+#   listing#<id>         decayed score, scored_at, neighborhood
+#   top#all              citywide board: top listings with their cards
+#   top#nb#<name>        per-neighborhood board
+# Each batch turns bucket deltas into weighted score deltas, updates the
+# touched listings' scores, then re-ranks each affected board with one
+# versioned read-modify-write. get_trending serves a board with one GetItem.
+
+MAX_ATTEMPTS = 5
+METRICS = ['views', 'favorites', 'unfavorites', 'bids']
+CARD_FIELDS = [
+    'listing_id', 'created_at', 'address', 'neighborhood', 'price', 'features',
+    'sale_type', 'auction_end_time', 'current_highest_bid', 'bid_count'
+]
+
+dynamodb = boto3.resource('dynamodb')
+deserializer = TypeDeserializer()
+
+def deserialize(image):
+    return {k: deserializer.deserialize(v) for k, v in image.items()} if image else {}
+
+def score_deltas(records, now):
+    """{listing_id: (points decayed to now, neighborhood)} from hourly listing bucket changes."""
+    deltas = {}
+    for record in records:
+        if record.get('eventName') not in ('INSERT', 'MODIFY'):
+            continue
+        change = record['dynamodb']
+        new, old = deserialize(change.get('NewImage')), deserialize(change.get('OldImage'))
+        if not new.get('series', '').startswith('listing#') or not new.get('bucket', '').startswith('h#'):
+            continue
+        delta = points({m: new.get(m, 0) - old.get(m, 0) for m in METRICS})
+        if not delta:
+            continue
+        listing_id = new['series'][len('listing#'):]
+        current, _ = deltas.get(listing_id, (0, None))
+        at = change.get('ApproximateCreationDateTime', now)
+        deltas[listing_id] = (current + decayed(delta, at, now), new.get('neighborhood'))
+    return deltas
+
+def update_score(table, listing_id, delta, neighborhood, now):
+    """Add delta to the listing's decayed score; returns the new score."""
+    for _ in range(MAX_ATTEMPTS):
+        item = table.get_item(Key={'key': listing_key(listing_id)}, ConsistentRead=True).get('Item') or {}
+        score = decayed(item.get('score', 0), item.get('scored_at', now), now) + delta
+        try:
+            table.put_item(
+                Item=to_dynamo({
+                    'key': listing_key(listing_id),
+                    'score': round(score, 4),
+                    'scored_at': int(now),
+                    'neighborhood': neighborhood or item.get('neighborhood'),
+                    'expires_at': expires_at(score, now),
+                    'version': item.get('version', 0) + 1
+                }),
+                ConditionExpression="attribute_not_exists(#k) OR version = :v",
+                ExpressionAttributeNames={'#k': 'key'},
+                ExpressionAttributeValues={':v': item.get('version', 0)}
+            )
+            return score
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    raise RuntimeError(f"Could not update trending score for {listing_id}")
+
+def load_cards(listing_ids, cache):
+    listings_table = dynamodb.Table(os.environ['LISTINGS_TABLE_NAME'])
+    names = {f"#f{i}": f for i, f in enumerate(CARD_FIELDS)}
+    for listing_id in listing_ids:
+        if listing_id in cache:
+            continue
+        resp = listings_table.query(
+            KeyConditionExpression=Key('listing_id').eq(listing_id),
+            ProjectionExpression=', '.join(names),
+            ExpressionAttributeNames=names,
+            Limit=1
+        )
+        cache[listing_id] = resp['Items'][0] if resp['Items'] else None
+    return cache
+
+def update_board(table, key, updates, now, cards):
+    for _ in range(MAX_ATTEMPTS):
+        board = table.get_item(Key={'key': key}, ConsistentRead=True).get('Item') or {}
+        entries = merge_board(board.get('entries', []), board.get('scored_at', now), updates, now)
+
+        # Refresh the cards of touched listings that made the board
+        load_cards([e['listing_id'] for e in entries if e['listing_id'] in updates], cards)
+        entries = [
+            {**e, 'card': cards[e['listing_id']]} if e['listing_id'] in updates else e
+            for e in entries
+            if e['listing_id'] not in updates or cards.get(e['listing_id'])
+        ]
+        for entry in entries:
+            entry['score'] = round(entry['score'], 4)
+
+        try:
+            table.put_item(
+                Item=to_dynamo({
+                    'key': key,
+                    'entries': entries,
+                    'scored_at': int(now),
+                    'version': board.get('version', 0) + 1
+                }),
+                ConditionExpression="attribute_not_exists(#k) OR version = :v",
+                ExpressionAttributeNames={'#k': 'key'},
+                ExpressionAttributeValues={':v': board.get('version', 0)}
+            )
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    raise RuntimeError(f"Could not update trending board {key}")
+
+def lambda_handler(event, context):
+    table = dynamodb.Table(os.environ['TRENDING_TABLE'])
+    now = time.time()
+
+    boards = {}
+    for listing_id, (delta, neighborhood) in score_deltas(event.get('Records', []), now).items():
+        score = update_score(table, listing_id, delta, neighborhood, now)
+        keys = [CITYWIDE] + ([board_key(neighborhood)] if neighborhood else [])
+        for key in keys:
+            boards.setdefault(key, {})[listing_id] = {'score': score}
+
+    cards = {}
+    for key, updates in boards.items():
+        update_board(table, key, updates, now, cards)
+
+    return {'processed': len(event.get('Records', [])), 'boards': len(boards)}
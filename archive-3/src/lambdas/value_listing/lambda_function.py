@@ -0,0 +1,98 @@
+import json
+import os
+import boto3
+from botocore.exceptions import ClientError
+
+# Provided by the common layer
+from geo import geo_attributes
+from ddb_json import to_dynamo
+
+# Asynchronous AI valuation for new listings.
+# Triggered by the valuation SQS queue (batch of Records) or, locally, by a
+# direct invoke with a single valuation request as the event.
+
+lambda_client = boto3.client('lambda')
+dynamodb = boto3.resource('dynamodb')
+
+def run_inference(inference_payload):
+    response = lambda_client.invoke(
+        FunctionName=os.environ['INFERENCE_FUNC'],
+        InvocationType='RequestResponse',
+        Payload=json.dumps(inference_payload)
+    )
+    inference_result = json.loads(response['Payload'].read())
+    if 'body' not in inference_result:
+        return {}
+    return json.loads(inference_result['body'])
+
+def classify(asking_price, ai_price):
+    diff_pct = ((asking_price - ai_price) / ai_price) * 100
+    if diff_pct > 10:
+        status = "Overpriced"
+    elif diff_pct < -10:
+        status = "Good Deal"
+    else:
+        status = "Fair Price"
+    return status, diff_pct
+
+def value_listing(request):
+    """Run inference for one listing and write the result onto its item."""
+    result = run_inference(request['inference_payload'])
+    ai_price = result.get('estimated_price')
+
+    if ai_price:
+        status, diff_pct = classify(float(request['asking_price']), ai_price)
+    else:
+        status, diff_pct = "Unknown", None
+
+    update_expr = "SET ai_valuation = :v"
+    expr_values = {
+        ':v': to_dynamo({
+            'estimated_price': float(ai_price) if ai_price else None,
+            'status': status,
+            'diff_pct': diff_pct
+        })
+    }
+
+    # Inference geocodes the address; keep those coordinates so the listing
+    # lands in the geo index.
+    coords = result.get('details', {}).get('coordinates') or {}
+    geo = geo_attributes(coords) if coords.get('lat') and coords.get('lon') else {}
+    if request.get('needs_geocode') and geo:
+        update_expr += ", coordinates = :c, geohash = :gh, geo_cell = :gc"
+        expr_values.update({
+            ':c': to_dynamo({'lat': float(coords['lat']), 'lon': float(coords['lon'])}),
+            ':gh': geo['geohash'],
+            ':gc': geo['geo_cell']
+        })
+
+    table = dynamodb.Table(os.environ['TABLE_NAME'])
+    try:
+        table.update_item(
+            Key={'listing_id': request['listing_id'], 'created_at': request['created_at']},
+            UpdateExpression=update_expr,
+            ConditionExpression="attribute_exists(listing_id)",
+            ExpressionAttributeValues=expr_values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"Listing {request['listing_id']} no longer exists, skipping valuation")
+
+    return status
+
+def lambda_handler(event, context):
+    # Direct invoke (local stand-in / fire-and-forget fallback)
+    if 'Records' not in event:
+        return {'status': value_listing(event)}
+
+    # SQS batch: report only the failed messages so the rest are not retried
+    failures = []
+    for record in event['Records']:
+        try:
+            value_listing(json.loads(record['body']))
+        except Exception as e:
+            print(f"Valuation failed for message {record.get('messageId')}: {e}")
+            failures.append({'itemIdentifier': record['messageId']})
+
+    return {'batchItemFailures': failures}
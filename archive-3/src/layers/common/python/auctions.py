@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+# Auction close index helpers shared by the listing writers and the
+# close_auctions sweeper. Open auctions carry two sparse attributes that key
+# the listings "auction_close_index":
+#   auction_close_bucket - UTC hour the auction ends in ("2026-10-19T14")
+#   auction_close_at     - normalized UTC end time (sort key)
+# Closing an auction removes both, so the index only ever holds open auctions
+# and each sweep reads just the buckets that have come due.
+
+BUCKET_FORMAT = '%Y-%m-%dT%H'
+BUCKET_STEP = timedelta(hours=1)
+
+def parse_end_time(value):
+    """Naive UTC datetime for an ISO end time (with or without offset/Z), or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def bucket_for(moment):
+    return moment.strftime(BUCKET_FORMAT)
+
+def buckets_between(start_bucket, end_bucket):
+    """Every hour bucket from start_bucket to end_bucket, inclusive."""
+    current = datetime.strptime(start_bucket, BUCKET_FORMAT)
+    end = datetime.strptime(end_bucket, BUCKET_FORMAT)
+    buckets = []
+    while current <= end:
+        buckets.append(bucket_for(current))
+        current += BUCKET_STEP
+    return buckets
+
+def auction_attributes(sale_type, auction_end_time, now=None):
+    """Close-index attributes for a new listing, or {} if it is not a timed auction."""
+    if sale_type != 'auction':
+        return {}
+    ends_at = parse_end_time(auction_end_time)
+    if ends_at is None:
+        return {}
+    now = now or datetime.utcnow()
+    # An end time already in the past goes into the current bucket, which the
+    # sweeper has not passed yet, so it still gets closed.
+    return {
+        'auction_status': 'open',
+        'auction_close_bucket': bucket_for(max(ends_at, now)),
+        'auction_close_at': ends_at.isoformat()
+    }
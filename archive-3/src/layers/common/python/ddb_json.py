@@ -0,0 +1,136 @@
+import base64
+import json
+import os
+from decimal import Decimal
+
+# Shared DynamoDB <-> JSON codec for all handlers.
+#
+#   dumps(obj)            boto3 item(s) -> JSON string. Decimals (and sets,
+#                         binaries) are converted inline by the serializer, so
+#                         the payload is walked exactly once.
+#   dumps_bytes(obj)      same, as UTF-8 bytes (for compression / hashing)
+#   from_dynamodb(item)   low-level AttributeValue map (client API, streams)
+#                         -> native JSON types directly, without Decimals
+#   to_native(obj)        boto3 item -> plain Python types (when not serializing)
+#   to_dynamo(obj)        request data -> boto3-safe values (float -> Decimal)
+#   loads(s)              parse JSON
+#
+# The backend is orjson when it is importable (see
+# scripts/create_common_layer_deps.sh) and the stdlib json module otherwise;
+# JSON_BACKEND=json forces the stdlib. scripts/bench_json_codec.py compares
+# both against the per-lambda helpers this module replaces.
+
+try:
+    from boto3.dynamodb.types import Binary
+except ImportError:  # local tools without boto3
+    Binary = None
+
+_orjson = None
+if os.environ.get('JSON_BACKEND', 'auto') != 'json':
+    try:
+        import orjson as _orjson
+    except ImportError:
+        _orjson = None
+
+BACKEND = 'orjson' if _orjson else 'json'
+
+_MAX_SAFE_INT = 2 ** 53
+
+def _number(d):
+    # float() is much cheaper than Decimal arithmetic; fall back to exact
+    # conversion only for integers outside the float-safe range.
+    f = float(d)
+    if f.is_integer():
+        return int(f) if -_MAX_SAFE_INT < f < _MAX_SAFE_INT else int(d)
+    return f
+
+def _default(obj):
+    """Serializer hook: only called for values JSON cannot encode natively."""
+    if isinstance(obj, Decimal):
+        return _number(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if Binary is not None and isinstance(obj, Binary):
+        return base64.b64encode(obj.value).decode('ascii')
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if _orjson:
+    def dumps_bytes(obj):
+        return _orjson.dumps(obj, default=_default)
+
+    def dumps(obj):
+        return _orjson.dumps(obj, default=_default).decode('utf-8')
+
+    def loads(s):
+        return _orjson.loads(s)
+else:
+    def dumps(obj):
+        return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps_bytes(obj):
+        return dumps(obj).encode('utf-8')
+
+    def loads(s):
+        return json.loads(s)
+
+def _parse_number(s):
+    if '.' in s or 'e' in s or 'E' in s:
+        f = float(s)
+        return int(f) if f.is_integer() and -_MAX_SAFE_INT < f < _MAX_SAFE_INT else f
+    return int(s)
+
+def _from_attribute(av):
+    (kind, value), = av.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return _parse_number(value)
+    if kind == 'M':
+        return {k: _from_attribute(v) for k, v in value.items()}
+    if kind == 'L':
+        return [_from_attribute(v) for v in value]
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'SS':
+        return list(value)
+    if kind == 'NS':
+        return [_parse_number(v) for v in value]
+    if kind == 'B':
+        return base64.b64encode(value).decode('ascii') if isinstance(value, (bytes, bytearray)) else value
+    if kind == 'BS':
+        return [base64.b64encode(v).decode('ascii') if isinstance(v, (bytes, bytearray)) else v for v in value]
+    raise TypeError(f"Unknown DynamoDB type: {kind}")
+
+def from_dynamodb(item):
+    """Low-level AttributeValue map ({'price': {'N': '1'}}) -> native dict."""
+    if item is None:
+        return None
+    return {k: _from_attribute(v) for k, v in item.items()}
+
+def to_native(obj):
+    if isinstance(obj, dict):
+        return {k: to_native(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_native(v) for v in obj]
+    if isinstance(obj, Decimal):
+        return _number(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return [to_native(v) for v in obj]
+    if Binary is not None and isinstance(obj, Binary):
+        return base64.b64encode(obj.value).decode('ascii')
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode('ascii')
+    return obj
+
+def to_dynamo(obj):
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    if isinstance(obj, dict):
+        return {k: to_dynamo(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_dynamo(v) for v in obj]
+    return obj
@@ -0,0 +1,105 @@
+import math
+
+# Geohash helpers shared by the listing writers and the nearby-search lambda.
+# Listings store their full geohash plus a coarse "geo_cell" prefix, which is
+# the partition key of the listings geo index.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+GEO_CELL_PRECISION = 5   # ~4.9 x 4.9 km cells (index partition key)
+MAX_SEARCH_PRECISION = 7  # ~150 x 150 m cells (begins_with on the sort key)
+MAX_QUERY_CELLS = 20      # cell queries per search (run concurrently)
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, val = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if val >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+def cell_size(precision):
+    """(lat_degrees, lon_degrees) spanned by one cell at this precision."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def geo_attributes(coordinates):
+    """Index attributes for a listing's coordinates ({'lat', 'lon'}), or {} if unknown."""
+    if not coordinates:
+        return {}
+    lat = coordinates.get('lat')
+    lon = coordinates.get('lon', coordinates.get('lng'))
+    if lat is None or lon is None:
+        return {}
+    geohash = encode(float(lat), float(lon))
+    return {'geohash': geohash, 'geo_cell': geohash[:GEO_CELL_PRECISION]}
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    R = 6371
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+def radius_bbox(lat, lon, radius_km):
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle."""
+    dlat = radius_km / 111.32
+    dlon = radius_km / (111.32 * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def cells_for_bbox(min_lat, min_lon, max_lat, max_lon, precision):
+    """All geohash cells at `precision` intersecting the bounding box."""
+    lat_step, lon_step = cell_size(precision)
+    lat_start = math.floor((min_lat + 90) / lat_step) * lat_step - 90
+    lon_start = math.floor((min_lon + 180) / lon_step) * lon_step - 180
+    cells = set()
+    lat = lat_start
+    while lat <= max_lat:
+        lon = lon_start
+        while lon <= max_lon:
+            # Encode the cell centre so float edges never land in a neighbour
+            cells.add(encode(lat + lat_step / 2, lon + lon_step / 2, precision))
+            lon += lon_step
+        lat += lat_step
+    return cells
+
+def search_precision(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_QUERY_CELLS):
+    """
+    Finest precision (GEO_CELL_PRECISION..MAX_SEARCH_PRECISION) whose
+    worst-case cover of a box this size stays within `max_cells` queries.
+    """
+    height, width = max_lat - min_lat, max_lon - min_lon
+    precision = GEO_CELL_PRECISION
+    for p in range(GEO_CELL_PRECISION + 1, MAX_SEARCH_PRECISION + 1):
+        lat_step, lon_step = cell_size(p)
+        # A box spans at most floor(size / step) + 2 cells per axis
+        worst = (math.floor(height / lat_step) + 2) * (math.floor(width / lon_step) + 2)
+        if worst > max_cells:
+            break
+        precision = p
+    return precision
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_QUERY_CELLS):
+    """
+    Cells covering the box at the precision picked from its size, at most
+    `max_cells` of them. Raises ValueError for boxes that would need more
+    partition-level (GEO_CELL_PRECISION) cells than that.
+    """
+    precision = search_precision(min_lat, min_lon, max_lat, max_lon, max_cells)
+    cells = cells_for_bbox(min_lat, min_lon, max_lat, max_lon, precision)
+    if len(cells) > max_cells:
+        raise ValueError('Search area too large')
+    return sorted(cells)
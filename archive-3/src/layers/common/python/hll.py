@@ -0,0 +1,60 @@
+import hashlib
+import math
+import zlib
+
+# HyperLogLog sketches for approximate unique counts (listing viewers).
+# A sketch is 2^PRECISION one-byte registers; adding the same value twice is
+# a no-op and two sketches merge with a register-wise max, so redelivered
+# events and concurrent writers never inflate the count. With PRECISION 12
+# the standard error is ~1.6% at any cardinality, in at most 4 KB.
+#
+# Stored in DynamoDB as a zlib-compressed Binary attribute: sketches of
+# little-viewed listings are mostly zero registers and shrink to a few
+# dozen bytes.
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+HASH_BITS = 64
+RANK_BITS = HASH_BITS - PRECISION
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+def new():
+    return bytearray(REGISTERS)
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+def add(sketch, value):
+    """Add one value in place; True if a register changed."""
+    x = _hash(value)
+    index = x >> RANK_BITS
+    rank = RANK_BITS - (x & ((1 << RANK_BITS) - 1)).bit_length() + 1
+    if rank > sketch[index]:
+        sketch[index] = rank
+        return True
+    return False
+
+def merge(*sketches):
+    """Union of several sketches as a new sketch."""
+    return bytearray(map(max, *sketches)) if len(sketches) > 1 else bytearray(sketches[0])
+
+def count(sketch):
+    """Estimated number of distinct values added."""
+    estimate = ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -r for r in sketch)
+    zeros = sketch.count(0)
+    # Small-range correction (linear counting); 64-bit hashes need no large-range one
+    if estimate <= 2.5 * REGISTERS and zeros:
+        estimate = REGISTERS * math.log(REGISTERS / zeros)
+    return int(round(estimate))
+
+def to_bytes(sketch):
+    return zlib.compress(bytes(sketch), 9)
+
+def from_bytes(data):
+    """Sketch from a stored attribute (bytes or boto3 Binary); empty when missing."""
+    if data is None:
+        return new()
+    sketch = bytearray(zlib.decompress(getattr(data, 'value', data)))
+    if len(sketch) != REGISTERS:
+        raise ValueError(f"Sketch has {len(sketch)} registers, expected {REGISTERS}")
+    return sketch
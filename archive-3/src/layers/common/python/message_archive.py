@@ -0,0 +1,74 @@
+import gzip
+
+from ddb_json import dumps_bytes, loads
+
+# Cold tier for chat messages. archive_messages writes the messages the
+# conversations table TTL expires as gzip JSON-lines segments:
+#   <prefix>/<conversation_id>/<first_ts>__<last_ts>.jsonl.gz
+# Keys sort by time within a conversation, so get_messages can find the
+# segments older than a point with one LIST. TTL deletes are not strictly
+# ordered and stream batches can be retried, so segments may overlap; readers
+# merge them and de-duplicate on the message timestamp.
+#
+# Each conversation with archived messages also has a marker item in the
+# counters table (archive#<conversation_id>, archived_until = newest archived
+# timestamp), so readers only go to S3 for conversations that have a cold tier.
+
+PREFIX = 'archive/messages'
+SUFFIX = '.jsonl.gz'
+
+def marker_key(conversation_id):
+    return {'counter_id': f"archive#{conversation_id}"}
+
+def segment_key(conversation_id, messages, prefix=PREFIX):
+    return f"{prefix}/{conversation_id}/{messages[0]['timestamp']}__{messages[-1]['timestamp']}{SUFFIX}"
+
+def parse_segment_key(key):
+    """(first_ts, last_ts) of a segment object key."""
+    name = key.rsplit('/', 1)[-1][:-len(SUFFIX)]
+    first, _, last = name.partition('__')
+    return first, last
+
+def encode_segment(messages):
+    lines = b'\n'.join(dumps_bytes(m) for m in messages)
+    # mtime=0 keeps the bytes (and ETag) stable when a batch is retried
+    return gzip.compress(lines, compresslevel=9, mtime=0)
+
+def decode_segment(body):
+    return [loads(line) for line in gzip.decompress(body).splitlines() if line]
+
+def list_segments(s3, bucket, conversation_id, prefix=PREFIX):
+    keys = []
+    kwargs = {'Bucket': bucket, 'Prefix': f"{prefix}/{conversation_id}/"}
+    while True:
+        resp = s3.list_objects_v2(**kwargs)
+        keys += [obj['Key'] for obj in resp.get('Contents', []) if obj['Key'].endswith(SUFFIX)]
+        if not resp.get('IsTruncated'):
+            return keys
+        kwargs['ContinuationToken'] = resp['NextContinuationToken']
+
+def read_before(s3, bucket, conversation_id, before, limit, prefix=PREFIX):
+    """
+    Up to `limit` archived messages older than `before`, oldest first, and
+    whether older archived messages remain. Segments are fetched newest
+    first and only until the page is complete.
+    """
+    segments = sorted(
+        (k for k in list_segments(s3, bucket, conversation_id, prefix) if parse_segment_key(k)[0] < before),
+        key=lambda k: parse_segment_key(k)[1],
+        reverse=True
+    )
+
+    found = {}
+    while segments:
+        # Once the page is full, a segment ending before its oldest message
+        # can't contribute (later segments end even earlier)
+        if len(found) >= limit and parse_segment_key(segments[0])[1] < sorted(found)[-limit]:
+            break
+        body = s3.get_object(Bucket=bucket, Key=segments.pop(0))['Body'].read()
+        for message in decode_segment(body):
+            if message['timestamp'] < before:
+                found[message['timestamp']] = message
+
+    ordered = [found[ts] for ts in sorted(found)]
+    return ordered[-limit:], len(ordered) > limit or bool(segments)
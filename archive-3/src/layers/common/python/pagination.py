@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Opaque pagination cursors wrapping DynamoDB's LastEvaluatedKey.
+# Numbers round-trip as Decimal so numeric index keys stay valid for boto3.
+# Also the sync token handed out by delta-sync (`since`) endpoints.
+
+def _number(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def encode_cursor(last_key):
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, default=_number, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        return json.loads(raw, parse_float=Decimal, parse_int=Decimal)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def sync_token(latest, since=None, lag_seconds=10):
+    """
+    Delta-sync position for `since` queries over server-assigned ISO
+    timestamps: the newest one delivered, held back to lag_seconds ago.
+    Concurrent writers stamp before they commit, so a write can become
+    visible after a newer one was already served; everything inside the
+    lag is sent again on the next poll (clients dedupe) instead of skipped.
+    """
+    settled = (datetime.utcnow() - timedelta(seconds=lag_seconds)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    candidates = [t for t in (latest and min(latest, settled), since) if t]
+    return max(candidates) if candidates else None
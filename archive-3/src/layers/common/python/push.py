@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ddb_json import dumps_bytes
+
+# Push fan-out shared by the writers (place_bid, send_message).
+#
+#   publish(topic, event_type, data)   deliver to every connection subscribed
+#                                      to the topic; returns the count sent
+#
+# Topics are "listing#<id>" (bids), "conversation#<id>" (messages) and
+# "user#<id>" (inbox updates). In AWS, subscriptions live in the
+# push-subscriptions table (written by the push_connections WebSocket lambda)
+# and messages go out through the API Gateway management API. Without
+# PUSH_ENDPOINT (local runs, load tests) a process-local hub stands in, with
+# callbacks as subscribers.
+
+MAX_FANOUT_WORKERS = int(os.environ.get('PUSH_FANOUT_WORKERS', 16))
+
+def listing_topic(listing_id):
+    return f"listing#{listing_id}"
+
+def conversation_topic(conversation_id):
+    return f"conversation#{conversation_id}"
+
+def user_topic(user_id):
+    return f"user#{user_id}"
+
+TOPIC_PREFIXES = ('listing#', 'conversation#', 'user#')
+
+class LocalHub:
+    """In-process stand-in for the WebSocket API."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(topic, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def send(self, topic, payload):
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, ()))
+        for callback in callbacks:
+            callback(payload)
+        return len(callbacks)
+
+class ApiGatewayHub:
+    """Subscriptions from DynamoDB, delivery through the WebSocket management API."""
+
+    def __init__(self, endpoint, table_name):
+        import boto3
+        self.client = boto3.client('apigatewaymanagementapi', endpoint_url=endpoint)
+        self.table = boto3.resource('dynamodb').Table(table_name)
+        self.pool = ThreadPoolExecutor(max_workers=MAX_FANOUT_WORKERS)
+
+    def connections(self, topic):
+        from boto3.dynamodb.conditions import Key
+        query = {
+            'KeyConditionExpression': Key('topic').eq(topic),
+            'ProjectionExpression': 'connection_id'
+        }
+        while True:
+            resp = self.table.query(**query)
+            for item in resp['Items']:
+                yield item['connection_id']
+            if 'LastEvaluatedKey' not in resp:
+                return
+            query['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+    def _post(self, topic, connection_id, payload):
+        try:
+            self.client.post_to_connection(ConnectionId=connection_id, Data=payload)
+            return True
+        except self.client.exceptions.GoneException:
+            # Closed without a clean $disconnect
+            self.table.delete_item(Key={'topic': topic, 'connection_id': connection_id})
+            return False
+
+    def send(self, topic, payload):
+        futures = [self.pool.submit(self._post, topic, cid, payload) for cid in self.connections(topic)]
+        return sum(1 for f in futures if f.result())
+
+_hub = None
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        endpoint = os.environ.get('PUSH_ENDPOINT')
+        table_name = os.environ.get('PUSH_SUBSCRIPTIONS_TABLE')
+        _hub = ApiGatewayHub(endpoint, table_name) if endpoint and table_name else LocalHub()
+    return _hub
+
+def publish(topic, event_type, data):
+    # Serialized once, shared by every connection
+    payload = dumps_bytes({
+        'topic': topic,
+        'type': event_type,
+        'data': data,
+        'sent_at': time.time()
+    })
+    return get_hub().send(topic, payload)
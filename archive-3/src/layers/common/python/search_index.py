@@ -0,0 +1,39 @@
+import hashlib
+import heapq
+import os
+from decimal import Decimal, InvalidOperation
+
+# Partitions (facets) of the listing search index, shared by its writer
+# (index_listings) and readers (search_listings, publish_snapshots):
+#   all#<n>              - every listing, spread over ALL_SHARDS partitions
+#   nb#<neighborhood>    - per neighborhood
+#   status#<ai status>   - per AI valuation status ("Good Deal", ...)
+# The table has LSIs, so each facet is one item collection capped at 10 GB
+# and one partition's write throughput; "every listing" is therefore split
+# by a stable hash of listing_id, and read back by merging the shards'
+# already-sorted pages. Changing ALL_SHARDS moves listings between shards:
+# rebuild the index (empty the table, then run the index_listings backfill).
+
+ALL_SHARDS = int(os.environ.get('SEARCH_ALL_SHARDS', 8))
+LEGACY_ALL = 'all'
+
+def all_facet(listing_id):
+    digest = hashlib.md5(str(listing_id).encode('utf-8')).digest()
+    return f"all#{int.from_bytes(digest[:4], 'big') % ALL_SHARDS}"
+
+def all_facets():
+    return [f"all#{n}" for n in range(ALL_SHARDS)]
+
+def index_number(value):
+    """Decimal for an N-typed index key, or None if the value isn't a finite number."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    return number if number.is_finite() else None
+
+def merge_sorted(pages, sort_key, descending=False):
+    """Merge per-shard item lists, each already ordered by sort_key, into one."""
+    return list(heapq.merge(*pages, key=lambda item: item[sort_key], reverse=descending))
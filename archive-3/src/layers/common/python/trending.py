@@ -0,0 +1,57 @@
+import math
+import os
+
+# Exponentially time-decayed "hot right now" scores.
+# Each interaction adds WEIGHTS[metric] to a listing's score, and scores
+# halve every HALF_LIFE_HOURS. A score is stored with the time it was last
+# brought up to date (scored_at) and decayed lazily: decayed(score, t0, t1).
+#
+# Decay multiplies every score by the same factor, so it never changes the
+# order of listings that receive no events. A top-K board therefore only
+# has to re-rank the listings touched by a batch, and a listing off the
+# board can only climb back on by receiving events. Boards keep STORED_K
+# entries (more than they serve) so unfavorites pushing a listing down
+# cannot leave a hole that an unseen listing should have filled.
+
+HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 6))
+WEIGHTS = {'views': 1, 'favorites': 5, 'unfavorites': -5, 'bids': 10}
+TOP_K = 20
+STORED_K = 2 * TOP_K
+# Below this a listing is no longer trending; its score item expires
+MIN_SCORE = 0.5
+
+CITYWIDE = 'top#all'
+
+def board_key(neighborhood=None):
+    return f"top#nb#{neighborhood}" if neighborhood else CITYWIDE
+
+def listing_key(listing_id):
+    return f"listing#{listing_id}"
+
+def decayed(score, scored_at, now):
+    """Score brought forward from scored_at to now (epoch seconds)."""
+    return float(score) * 0.5 ** ((float(now) - float(scored_at)) / (HALF_LIFE_HOURS * 3600))
+
+def points(metrics):
+    """Weighted score delta for {metric: count}."""
+    return sum(WEIGHTS.get(metric, 0) * n for metric, n in metrics.items())
+
+def expires_at(score, now):
+    """When a score decays below MIN_SCORE (TTL for score items)."""
+    if score <= MIN_SCORE:
+        return int(now)
+    return int(now + HALF_LIFE_HOURS * 3600 * math.log2(score / MIN_SCORE))
+
+def merge_board(entries, scored_at, updates, now, k=STORED_K):
+    """
+    Board entries decayed to now with the updated listings re-ranked.
+    `updates` maps listing_id -> {'score': current score, ...extra fields}.
+    """
+    board = {e['listing_id']: {**e, 'score': decayed(e['score'], scored_at, now)} for e in entries}
+    for listing_id, update in updates.items():
+        if update['score'] > MIN_SCORE:
+            board[listing_id] = {**board.get(listing_id, {}), **update, 'listing_id': listing_id}
+        else:
+            board.pop(listing_id, None)
+    ranked = sorted(board.values(), key=lambda e: e['score'], reverse=True)
+    return [e for e in ranked if e['score'] > MIN_SCORE][:k]
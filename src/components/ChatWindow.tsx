@@ -5,6 +5,7 @@ import { Input } from "@/components/ui/input";
 import { ScrollArea } from "@/components/ui/scroll-area";
 import { Card } from "@/components/ui/card";
 import { getUserId } from "@/utils/session";
+import { mergeMessages } from "@/utils/sync";
 import { toast } from "sonner";
 
 interface Message {
@@ -28,6 +29,7 @@ const ChatWindow = ({ conversationId, listingAddress, otherUserId, onClose }: Ch
   const [isLoading, setIsLoading] = useState(false);
   const [isSending, setIsSending] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const syncTokenRef = useRef<string | null>(null);
   const currentUserId = getUserId();
 
   // Auto-scroll to bottom
@@ -36,13 +38,19 @@ const ChatWindow = ({ conversationId, listingAddress, otherUserId, onClose }: Ch
   }, [messages]);
 
   // Fetch messages
+  // After the first load only messages newer than the sync token are fetched
   const fetchMessages = async () => {
-    setIsLoading(true);
+    const since = syncTokenRef.current;
+    if (!since) setIsLoading(true);
     try {
       const API_URL = "https://2rzk4kbrnzdugyjvhqgmwmy6du0zgrun.lambda-url.us-east-1.on.aws/";
-      const response = await fetch(`${API_URL}?conversation_id=${encodeURIComponent(conversationId)}`);
+      const params = new URLSearchParams({ conversation_id: conversationId });
+      if (since) params.set("since", since);
+      const response = await fetch(`${API_URL}?${params}`);
       const data = await response.json();
-      setMessages(data.messages || []);
+      const incoming: Message[] = data.messages || [];
+      setMessages((prev) => (since ? mergeMessages(prev, incoming) : incoming));
+      if (data.sync_token) syncTokenRef.current = data.sync_token;
     } catch (error) {
       console.error("Failed to load messages:", error);
       toast.error("Failed to load messages");
@@ -53,6 +61,7 @@ const ChatWindow = ({ conversationId, listingAddress, otherUserId, onClose }: Ch
 
   // Poll for new messages every 10 seconds
   useEffect(() => {
+    syncTokenRef.current = null;
     fetchMessages();
     const interval = setInterval(fetchMessages, 10000);
     return () => clearInterval(interval);
@@ -10,6 +10,7 @@ import { toast } from "sonner";
 import MapDisplay from "./MapDisplay";
 import EmailReport from "./EmailReport";
 import AddressAutocomplete from "./AddressAutocomplete";
+import { getHistoryToken, getUserId } from "@/utils/session";
 
 const EstimatorForm = () => {
   const [address, setAddress] = useState("");
@@ -40,7 +41,9 @@ const EstimatorForm = () => {
         has_elevator: hasElevator,
         has_pool: hasPool,
         has_ac: hasAC,
-        has_terrace: hasTerrace
+        has_terrace: hasTerrace,
+        user_id: getUserId(),
+        history_token: getHistoryToken()
       };
 
       // API URL from Terraform Output
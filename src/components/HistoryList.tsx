@@ -2,22 +2,33 @@ import { useEffect, useState } from "react";
 import { Clock } from "lucide-react";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { ScrollArea } from "@/components/ui/scroll-area";
+import { Button } from "@/components/ui/button";
+
+const HISTORY_URL = "https://rzkqhvnq64ral5k7o2pzjzt6qu0koibd.lambda-url.us-east-1.on.aws/";
 
 const HistoryList = () => {
     const [history, setHistory] = useState<any[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-    useEffect(() => {
-        const fetchHistory = async () => {
-            try {
-                const res = await fetch("https://rzkqhvnq64ral5k7o2pzjzt6qu0koibd.lambda-url.us-east-1.on.aws/");
-                const data = await res.json();
-                if (Array.isArray(data)) {
-                    setHistory(data);
-                }
-            } catch (e) {
-                console.error("Failed to load history", e);
+    const fetchHistory = async (cursor?: string) => {
+        try {
+            const url = cursor ? `${HISTORY_URL}?cursor=${encodeURIComponent(cursor)}` : HISTORY_URL;
+            const res = await fetch(url);
+            const data = await res.json();
+            if (Array.isArray(data.estimates)) {
+                setHistory(prev => {
+                    if (!cursor) return data.estimates;
+                    const seen = new Set(prev.map(item => item.estimate_id));
+                    return [...prev, ...data.estimates.filter((item: any) => !seen.has(item.estimate_id))];
+                });
+                setNextCursor(data.next_cursor || null);
             }
-        };
+        } catch (e) {
+            console.error("Failed to load history", e);
+        }
+    };
+
+    useEffect(() => {
         fetchHistory();
     }, []);
 
@@ -50,6 +61,11 @@ const HistoryList = () => {
                                 </div>
                             </div>
                         ))}
+                        {nextCursor && (
+                            <Button variant="ghost" size="sm" className="w-full" onClick={() => fetchHistory(nextCursor)}>
+                                Load more
+                            </Button>
+                        )}
                     </div>
                 </ScrollArea>
             </CardContent>
@@ -56,6 +56,8 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
   const [listings, setListings] = useState<Listing[]>([]);
   const [filteredListings, setFilteredListings] = useState<Listing[]>([]);
   const [isLoading, setIsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [selectedListing, setSelectedListing] = useState<Listing | null>(null);
   const [detailOpen, setDetailOpen] = useState(false);
   const [showFavoritesOnly, setShowFavoritesOnly] = useState(false);
@@ -75,30 +77,40 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
   const userId = getUserId();
   const { favorites, toggleFavorite } = useFavorites(userId);
 
-  useEffect(() => {
-    const fetchListings = async () => {
-      try {
-        let API_URL = "https://esi7gy463qji75j7qf53jhmyku0flswq.lambda-url.us-east-1.on.aws/";
-        if (ownerId) {
-          API_URL += `?owner_id=${encodeURIComponent(ownerId)}`;
-        }
-        
-        const response = await fetch(API_URL);
-        if (!response.ok) throw new Error("Failed to fetch listings");
-        const data = await response.json();
-        setListings(data);
-        setFilteredListings(data);
-      } catch (error) {
-        console.error("Error:", error);
-        toast.error("Could not load listings");
-      } finally {
-        setIsLoading(false);
+  const fetchListings = async (cursor?: string) => {
+    try {
+      let API_URL = "https://esi7gy463qji75j7qf53jhmyku0flswq.lambda-url.us-east-1.on.aws/?limit=100";
+      if (ownerId) {
+        API_URL += `&owner_id=${encodeURIComponent(ownerId)}`;
+      }
+      if (cursor) {
+        API_URL += `&cursor=${encodeURIComponent(cursor)}`;
       }
-    };
 
+      const response = await fetch(API_URL);
+      if (!response.ok) throw new Error("Failed to fetch listings");
+      const data = await response.json();
+      setListings(prev => cursor ? [...prev, ...data.listings] : data.listings);
+      setNextCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error("Error:", error);
+      toast.error("Could not load listings");
+    } finally {
+      setIsLoading(false);
+      setIsLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
     fetchListings();
   }, [ownerId]);
 
+  const loadMore = () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    fetchListings(nextCursor);
+  };
+
   // Apply Filters
   useEffect(() => {
     let result = listings;
@@ -395,7 +407,7 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
                           className="text-slate-400 hover:text-red-500 hover:bg-red-50 -mt-1 -mr-2"
                           onClick={(e) => {
                             e.stopPropagation();
-                            toggleFavorite(listing.listing_id);
+                            toggleFavorite(listing.listing_id, listing.created_at);
                           }}
                        >
                           <Heart className={`w-5 h-5 ${favorites.has(listing.listing_id) ? "fill-red-500 text-red-500" : ""}`} />
@@ -472,6 +484,14 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
               ))}
             </div>
           )}
+
+          {nextCursor && (
+            <div className="flex justify-center mt-8">
+              <Button variant="outline" onClick={loadMore} disabled={isLoadingMore}>
+                {isLoadingMore ? "Loading..." : "Load more listings"}
+              </Button>
+            </div>
+          )}
         </div>
       </section>
 
@@ -482,7 +502,7 @@ const ListingList = ({ onNavigateToMessages, ownerId }: ListingListProps = {}) =
           onClose={() => setDetailOpen(false)}
           onMessageOwner={onNavigateToMessages}
           isFavorite={favorites.has(selectedListing.listing_id)}
-          onToggleFavorite={() => toggleFavorite(selectedListing.listing_id)}
+          onToggleFavorite={() => toggleFavorite(selectedListing.listing_id, selectedListing.created_at)}
         />
       )}
     </>
@@ -5,6 +5,7 @@ import { Input } from "@/components/ui/input";
 import { ScrollArea } from "@/components/ui/scroll-area";
 import { Skeleton } from "@/components/ui/skeleton";
 import { getUserId } from "@/utils/session";
+import { fetchDelta, mergeConversations, mergeMessages } from "@/utils/sync";
 import { toast } from "sonner";
 
 interface Conversation {
@@ -37,6 +38,8 @@ const MessagesApp = ({ onBack }: MessagesAppProps = {}) => {
   const [isLoading, setIsLoading] = useState(true);
   const [isSending, setIsSending] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const conversationsTokenRef = useRef<string | null>(null);
+  const messagesTokenRef = useRef<{ conversationId: string; token: string } | null>(null);
   const currentUserId = getUserId();
 
   // Auto-scroll to bottom
@@ -44,13 +47,16 @@ const MessagesApp = ({ onBack }: MessagesAppProps = {}) => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
-  // Fetch conversations
+  // Fetch conversations (only changed ones after the first load)
   const fetchConversations = async () => {
+    const since = conversationsTokenRef.current;
     try {
       const API_URL = "https://rciq66ft3mr6wb4o3t43jbwuwm0iqslg.lambda-url.us-east-1.on.aws/";
-      const response = await fetch(`${API_URL}?user_id=${encodeURIComponent(currentUserId)}`);
-      const data = await response.json();
-      setConversations(data.conversations || []);
+      const params = new URLSearchParams({ user_id: currentUserId });
+      if (since) params.set("since", since);
+      const { items: incoming, syncToken } = await fetchDelta<Conversation>(API_URL, params, "conversations");
+      setConversations((prev) => (since ? mergeConversations(prev, incoming) : incoming));
+      if (syncToken) conversationsTokenRef.current = syncToken;
     } catch (error) {
       console.error("Failed to load conversations:", error);
       toast.error("Failed to load conversations");
@@ -61,11 +67,15 @@ const MessagesApp = ({ onBack }: MessagesAppProps = {}) => {
 
   // Fetch messages for selected conversation
   const fetchMessages = async (conversationId: string) => {
+    const synced = messagesTokenRef.current;
+    const since = synced && synced.conversationId === conversationId ? synced.token : null;
     try {
       const API_URL = "https://2rzk4kbrnzdugyjvhqgmwmy6du0zgrun.lambda-url.us-east-1.on.aws/";
-      const response = await fetch(`${API_URL}?conversation_id=${encodeURIComponent(conversationId)}`);
-      const data = await response.json();
-      setMessages(data.messages || []);
+      const params = new URLSearchParams({ conversation_id: conversationId });
+      if (since) params.set("since", since);
+      const { items: incoming, syncToken } = await fetchDelta<Message>(API_URL, params, "messages");
+      setMessages((prev) => (since ? mergeMessages(prev, incoming) : incoming));
+      if (syncToken) messagesTokenRef.current = { conversationId, token: syncToken };
     } catch (error) {
       console.error("Failed to load messages:", error);
       toast.error("Failed to load messages");
@@ -1,9 +1,10 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { MessageCircle, MapPin, Clock } from "lucide-react";
 import { Card, CardContent } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { Skeleton } from "@/components/ui/skeleton";
 import { getUserId } from "@/utils/session";
+import { fetchDelta, mergeConversations } from "@/utils/sync";
 import ChatWindow from "./ChatWindow";
 import { toast } from "sonner";
 
@@ -21,14 +22,19 @@ const MessagesTab = () => {
   const [conversations, setConversations] = useState<Conversation[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [selectedConversation, setSelectedConversation] = useState<Conversation | null>(null);
+  const syncTokenRef = useRef<string | null>(null);
   const currentUserId = getUserId();
 
+  // After the first load only conversations with newer messages are fetched
   const fetchConversations = async () => {
+    const since = syncTokenRef.current;
     try {
       const API_URL = "https://rciq66ft3mr6wb4o3t43jbwuwm0iqslg.lambda-url.us-east-1.on.aws/";
-      const response = await fetch(`${API_URL}?user_id=${encodeURIComponent(currentUserId)}`);
-      const data = await response.json();
-      setConversations(data.conversations || []);
+      const params = new URLSearchParams({ user_id: currentUserId });
+      if (since) params.set("since", since);
+      const { items: incoming, syncToken } = await fetchDelta<Conversation>(API_URL, params, "conversations");
+      setConversations((prev) => (since ? mergeConversations(prev, incoming) : incoming));
+      if (syncToken) syncTokenRef.current = syncToken;
     } catch (error) {
       console.error("Failed to load conversations:", error);
       toast.error("Failed to load conversations");
@@ -38,6 +44,7 @@ const MessagesTab = () => {
   };
 
   useEffect(() => {
+    syncTokenRef.current = null;
     fetchConversations();
     // Poll for new conversations every 15 seconds
     const interval = setInterval(fetchConversations, 15000);
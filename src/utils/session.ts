@@ -4,6 +4,7 @@
  */
 
 const USER_ID_KEY = 'bcn_user_id';
+const HISTORY_TOKEN_KEY = 'bcn_history_token';
 
 /**
  * Generate a UUID v4 compatible string
@@ -44,12 +45,34 @@ export const getUserId = (): string => {
   }
 };
 
+/**
+ * Get or create the private token that keys this browser's valuation history.
+ * Unlike the user ID it is never shown to other users, so only this browser
+ * can list its estimates (get_history ?history_token=)
+ */
+export const getHistoryToken = (): string => {
+  try {
+    let token = localStorage.getItem(HISTORY_TOKEN_KEY);
+
+    if (!token) {
+      token = `${generateUUID()}${generateUUID()}`.replace(/-/g, '');
+      localStorage.setItem(HISTORY_TOKEN_KEY, token);
+    }
+
+    return token;
+  } catch (error) {
+    console.error("Error accessing localStorage or generating token:", error);
+    return `${generateUUID()}${generateUUID()}`.replace(/-/g, '');
+  }
+};
+
 /**
  * Clear user session (for testing/debugging)
  */
 export const clearSession = (): void => {
   try {
     localStorage.removeItem(USER_ID_KEY);
+    localStorage.removeItem(HISTORY_TOKEN_KEY);
   } catch (e) {
     console.error("Error clearing session:", e);
   }
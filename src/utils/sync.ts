@@ -0,0 +1,51 @@
+/**
+ * Delta Sync Helpers for Messaging
+ * Merge `since=<sync_token>` responses into the data the client already has
+ */
+
+/**
+ * Fetch a `since` delta, following next_cursor to the last page (which
+ * carries the sync_token); without `since` only the first page is fetched
+ */
+export const fetchDelta = async <T>(
+  url: string,
+  params: URLSearchParams,
+  key: string
+): Promise<{ items: T[]; syncToken: string | null }> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  let data: Record<string, unknown>;
+  do {
+    if (cursor) params.set("cursor", cursor);
+    const response = await fetch(`${url}?${params}`);
+    data = await response.json();
+    items.push(...((data[key] as T[]) || []));
+    cursor = params.has("since") ? (data.next_cursor as string | null) : null;
+  } while (cursor);
+  return { items, syncToken: (data.sync_token as string | null) ?? null };
+};
+
+/**
+ * Add newer messages, skipping any already shown. A message that committed
+ * late can arrive after newer ones, so the result is kept in time order
+ */
+export const mergeMessages = <T extends { timestamp: string }>(current: T[], incoming: T[]): T[] => {
+  if (incoming.length === 0) return current;
+  const seen = new Set(current.map((m) => m.timestamp));
+  return [...current, ...incoming.filter((m) => !seen.has(m.timestamp))].sort((a, b) =>
+    a.timestamp.localeCompare(b.timestamp)
+  );
+};
+
+/**
+ * Replace changed conversations and keep the list newest first
+ */
+export const mergeConversations = <T extends { conversation_id: string; last_message_timestamp: string }>(
+  current: T[],
+  incoming: T[]
+): T[] => {
+  if (incoming.length === 0) return current;
+  const byId = new Map(current.map((c) => [c.conversation_id, c]));
+  incoming.forEach((c) => byId.set(c.conversation_id, c));
+  return [...byId.values()].sort((a, b) => b.last_message_timestamp.localeCompare(a.last_message_timestamp));
+};